@@ -1,6 +1,11 @@
 import click
 
+from bdbt.cli.ethereum_backfill_plan import ethereum_backfill_plan
+from bdbt.cli.ethereum_benchmark import ethereum_benchmark
 from bdbt.cli.ethereum_codegen import ethereum_codegen
+from bdbt.cli.ethereum_decode import ethereum_decode
+from bdbt.cli.ethereum_decode_metrics import ethereum_decode_metrics
+from bdbt.cli.ethereum_synthetic_data import ethereum_synthetic_data
 from bdbt.cli.export_added_nft_metadata import export_added_nft_metadata
 from bdbt.cli.export_all_nft_metadata import export_all_nft_metadata
 from bdbt.logging_utils import logging_basic_config
@@ -17,6 +22,11 @@ def cli(ctx):
 
 # ethereum module
 cli.add_command(ethereum_codegen, "ethereum_codegen")
+cli.add_command(ethereum_backfill_plan, "ethereum_backfill_plan")
+cli.add_command(ethereum_decode, "ethereum_decode")
+cli.add_command(ethereum_benchmark, "ethereum_benchmark")
+cli.add_command(ethereum_decode_metrics, "ethereum_decode_metrics")
+cli.add_command(ethereum_synthetic_data, "ethereum_synthetic_data")
 
 # external module
 cli.add_command(export_all_nft_metadata, "export_all_nft_metadata")
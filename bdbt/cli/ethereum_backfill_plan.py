@@ -0,0 +1,50 @@
+import json
+import os
+from pathlib import Path
+
+import click
+
+from bdbt.ethereum.dbt.backfill_planner import BackfillPlanner
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest
+
+MODEL_SCOPES = ['added', 'added_or_changed', 'all']
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('-d', '--dbt-dir', default=Path.cwd(), show_default=True, type=str,
+              help='The absolute path for the dbt project.')
+@click.option('-s', '--dt-start', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='The first dt to backfill.')
+@click.option('-e', '--dt-end', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='The last dt to backfill.')
+@click.option('-m', '--models', default='added', show_default=True, type=click.Choice(MODEL_SCOPES),
+              help='Backfill the models added / added or changed by the last codegen, or all models.')
+@click.option('--max-models-per-batch', default=50, show_default=True, type=int,
+              help='The maximum number of models in a dbt invocation.')
+@click.option('--json-output', default=False, show_default=True, is_flag=True,
+              help='Print the batches as json instead of the dbt commands.')
+def ethereum_backfill_plan(
+        dt_start,
+        dt_end,
+        dbt_dir: str = Path.cwd(),
+        models: str = 'added',
+        max_models_per_batch: int = 50,
+        json_output: bool = False
+) -> None:
+    codegen_dir = os.path.join(dbt_dir, 'models', 'codegen')
+    manifest = CodegenManifest.load(os.path.join(codegen_dir, 'codegen_manifest.json'))
+
+    model_names = None
+    if models != 'all':
+        with open(os.path.join(codegen_dir, 'codegen_changes.json'), 'r') as f:
+            changes = json.load(f)
+        model_names = changes['added'] if models == 'added' else changes['added'] + changes['changed']
+
+    batches = BackfillPlanner(max_models_per_batch=max_models_per_batch) \
+        .plan(manifest, dt_start.date(), dt_end.date(), model_names)
+
+    if json_output:
+        click.echo(json.dumps([{'models': list(i.models), 'vars': i.dbt_vars} for i in batches], indent=2))
+    else:
+        for batch in batches:
+            click.echo(batch.dbt_command)
@@ -0,0 +1,86 @@
+import tempfile
+from pathlib import Path
+
+import click
+
+from bdbt.ethereum.decode.parquet_decode_job import load_contracts
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import UDFMode
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('-d', '--dbt-dir', default=Path.cwd(), show_default=True, type=str,
+              help='The absolute path for the dbt project, the contracts are loaded from its contracts folder.')
+@click.option('-p', '--projects', default=None, type=str,
+              help='The comma separated projects to run, all projects by default.')
+@click.option('-c', '--contracts', default=None, type=str,
+              help='The comma separated contract names to run, all contracts of the projects by default.')
+@click.option('-l', '--logs', multiple=True, type=click.Path(exists=True),
+              help='The parquet files or folders of the raw logs with the columns of stg_logs, repeatable.')
+@click.option('-t', '--traces', multiple=True, type=click.Path(exists=True),
+              help='The parquet files or folders of the raw traces with the columns of stg_traces, repeatable.')
+@click.option('-o', '--output-dir', default=None, type=str,
+              help='The folder of the outputs of the models, a temporary folder by default.')
+@click.option('--decoder', default='python', show_default=True, type=click.Choice(['python', 'jar']),
+              help='Decode by the python UDFs, or by the java UDFs in the jar built by the codegen.')
+@click.option('--udf-jar', default=None, type=click.Path(exists=True),
+              help='The jar built by the codegen, it is required by the jar decoder.')
+@click.option('--udf-mode', default=UDFMode.CLASS.value, show_default=True,
+              type=click.Choice([i.value for i in UDFMode]),
+              help='The udf mode of the jar, the python decoder only supports the class mode.')
+@click.option('--single-decode', default=False, show_default=True, is_flag=True,
+              help='Decode the data in a lateral view to guarantee the UDF is evaluated once per row.')
+@click.option('--dt', default=None, type=str,
+              help='Only decode the dt like the incremental runs, all data is decoded by default.')
+@click.option('-m', '--master', default='local[*]', show_default=True, type=str,
+              help='The master of the Spark session.')
+def ethereum_benchmark(
+        dbt_dir: str = Path.cwd(),
+        projects: str = None,
+        contracts: str = None,
+        logs=(),
+        traces=(),
+        output_dir: str = None,
+        decoder: str = 'python',
+        udf_jar: str = None,
+        udf_mode: str = UDFMode.CLASS.value,
+        single_decode: bool = False,
+        dt: str = None,
+        master: str = 'local[*]'
+) -> None:
+    if not logs and not traces:
+        raise click.UsageError('--logs or --traces is required.')
+
+    # pyspark is only in the dev extra
+    from pyspark.sql import SparkSession
+    from bdbt.ethereum.dbt.spark.spark_benchmark import SparkModelBenchmark, UDFDecoder
+    from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator
+
+    selected = load_contracts(dbt_dir, projects.split(',') if projects else None)
+    if contracts:
+        names = contracts.split(',')
+        selected = [i for i in selected if i[1].name in names]
+
+    spark = SparkSession.builder \
+        .master(master) \
+        .appName('ethereum_benchmark') \
+        .config('spark.ui.enabled', 'false') \
+        .getOrCreate()
+    try:
+        with tempfile.TemporaryDirectory() as tempdir:
+            generator = SparkDbtCodeGenerator(
+                remote_workspace=tempdir, single_decode=single_decode, udf_mode=UDFMode(udf_mode))
+            benchmark = SparkModelBenchmark(
+                spark, generator, output_dir or tempdir, UDFDecoder(decoder), udf_jar, dt)
+            benchmark.load_sources(logs, traces)
+            results = benchmark.run(selected)
+    finally:
+        spark.stop()
+
+    click.echo(f'{"model":<64} {"rows":>10} {"wall(s)":>9} {"rows/s":>10} {"tasks":>6} '
+               f'{"task(s)":>9} {"cpu(s)":>9} {"files":>6} {"avg file":>10}')
+    for i in results:
+        task_seconds = f'{i.task_seconds:.2f}' if i.task_seconds is not None else '-'
+        task_cpu_seconds = f'{i.task_cpu_seconds:.2f}' if i.task_cpu_seconds is not None else '-'
+        click.echo(f'{i.model_name:<64} {i.rows:>10} {i.wall_seconds:>9.2f} {i.rows_per_second:>10.0f} '
+                   f'{i.tasks:>6} {task_seconds:>9} {task_cpu_seconds:>9} {i.output_files:>6} '
+                   f'{i.avg_file_bytes:>10}')
@@ -1,9 +1,12 @@
 from pathlib import Path
+from typing import Optional, List
 
 import click
 
 from bdbt.ethereum.dbt.dbt_generator import DbtGenerator
-from bdbt.global_type import Database
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import UDFJarLayout, UDFMode, load_model_stats
+from bdbt.global_type import Database, LayoutOptions
+from bdbt.profiler import PhaseProfiler, ProfileFormat, ProfileMode
 
 
 @click.command(context_settings=dict(help_option_names=['-h', '--help']))
@@ -13,11 +16,128 @@ from bdbt.global_type import Database
               help='The absolute path for remote workspace that will store external dependencies.')
 @click.option('-d', '--database', default=Database.SPARK.value, show_default=True, type=str,
               help='The database to work for, like: spark, big_query, snowflake...')
+@click.option('--udf-jar-layout', default=UDFJarLayout.SINGLE.value, show_default=True,
+              type=click.Choice([i.value for i in UDFJarLayout]),
+              help='[spark] Package all UDFs into one jar, or one thin jar per project / shard on top of a base jar.')
+@click.option('--udf-jar-shards', default=16, show_default=True, type=int,
+              help='[spark] The number of thin jars when the UDF jar layout is shard.')
+@click.option('--udf-mode', default=UDFMode.CLASS.value, show_default=True,
+              type=click.Choice([i.value for i in UDFMode]),
+              help='[spark] Generate one java class for every model, or one schema resource read by a few fixed '
+                   'classes, the build time of the table mode does not grow with the number of models.')
+@click.option('--wide-int-as-string', default=False, show_default=True, is_flag=True,
+              help='[spark, duckdb] Keep the integers which may have more than 38 digits (e.g. uint256) as string '
+                   'instead of decimal(38, 0).')
+@click.option('--single-decode', default=False, show_default=True, is_flag=True,
+              help='[spark] Decode the data in a lateral view to guarantee the UDF is evaluated once per row.')
+@click.option('--sort-by', default=None, type=str,
+              help='[spark, duckdb] The columns to sort the rows within every file (or table), split with commas, '
+                   'e.g. contract_address,evt_block_number.')
+@click.option('--parquet-compression', default=None, type=str,
+              help='[spark] The parquet codec of the tables, e.g. zstd.')
+@click.option('--parquet-row-group-size', default=None, type=int,
+              help='[spark] The parquet row group size in bytes.')
+@click.option('--bloom-filter-columns', default=None, type=str,
+              help='[spark] The columns to write parquet bloom filters, split with commas.')
+@click.option('--target-file-size', default=None, type=int,
+              help='[spark] The target file size in bytes, the rows are rebalanced by the adaptive execution.')
+@click.option('--session-tuning', default=False, show_default=True, is_flag=True,
+              help='[spark] Set the shuffle partitions and the adaptive execution confs of every model '
+                   'by the size class of its contract.')
+@click.option('--model-stats', default=None, type=str,
+              help='[spark] A json file of model name -> {"daily_bytes": N, "conf": {...}} to tune the session '
+                   'confs of the models more precisely than the size class, it implies --session-tuning.')
+@click.option('--decode-metrics', default=False, show_default=True, is_flag=True,
+              help='[spark] Count the rows, the failures, the input bytes and the time of every UDF in the executor '
+                   'logs, they are summarized by `bdbt ethereum_decode_metrics`.')
+@click.option('--shared-event-min-contracts', default=0, show_default=True, type=int,
+              help='Decode the events with the same signature emitted by at least N contracts (e.g. ERC20 Transfer) '
+                   'in one shared model, the models of the contracts become views over it, 0 disables it.')
+@click.option('--consolidated-event-max-daily-bytes', default=0, show_default=True, type=int,
+              help='Decode the events whose models scan at most N bytes per dt in --model-stats into one '
+                   'consolidated model per project, the models of the events become views over it, 0 disables it. '
+                   'The events in "consolidated_events" of the contracts are consolidated regardless of this option, '
+                   'on every database which supports it (spark), the others log a warning and skip it.')
+@click.option('--version-cutover-dt', default=None, type=str,
+              help='The first dt decoded by the new versions of the changed models of the versioned contracts, '
+                   'today by default.')
+@click.option('--profile', default=False, show_default=True, is_flag=True,
+              help='Record the wall time, the cpu time and the peak memory of every codegen phase.')
+@click.option('--profile-output', default='codegen_profile.json', show_default=True, type=str,
+              help='The file to write the profile.')
+@click.option('--profile-format', default=ProfileFormat.JSON.value, show_default=True,
+              type=click.Choice([i.value for i in ProfileFormat]),
+              help='Write the profile as json, or as a chrome trace which can be opened in chrome://tracing.')
+@click.option('--profile-phase', default=None, type=str,
+              help='Profile the phase (e.g. transform_abi, gen_models) by cProfile or tracemalloc additionally, '
+                   'the stats are written beside the profile output.')
+@click.option('--profile-mode', default=ProfileMode.CPROFILE.value, show_default=True,
+              type=click.Choice([i.value for i in ProfileMode]),
+              help='The profiler of the profile phase.')
 def ethereum_codegen(
         dbt_dir: str = Path.cwd(),
         remote_dir_url: str = 's3a://ifcrypto/blockchain-dbt/jars',
         database: str = Database.SPARK.value,
+        udf_jar_layout: str = UDFJarLayout.SINGLE.value,
+        udf_jar_shards: int = 16,
+        udf_mode: str = UDFMode.CLASS.value,
+        wide_int_as_string: bool = False,
+        single_decode: bool = False,
+        sort_by: Optional[str] = None,
+        parquet_compression: Optional[str] = None,
+        parquet_row_group_size: Optional[int] = None,
+        bloom_filter_columns: Optional[str] = None,
+        target_file_size: Optional[int] = None,
+        session_tuning: bool = False,
+        model_stats: Optional[str] = None,
+        decode_metrics: bool = False,
+        shared_event_min_contracts: int = 0,
+        consolidated_event_max_daily_bytes: int = 0,
+        version_cutover_dt: Optional[str] = None,
+        profile: bool = False,
+        profile_output: str = 'codegen_profile.json',
+        profile_format: str = ProfileFormat.JSON.value,
+        profile_phase: Optional[str] = None,
+        profile_mode: str = ProfileMode.CPROFILE.value,
 ) -> None:
     database_obj = Database(database)
-    generator = DbtGenerator(database=database_obj, remote_dir_url=remote_dir_url, dbt_dir=dbt_dir)
+    stats = load_model_stats(model_stats) if model_stats is not None else None
+    codegen_options = {}
+    if database_obj == Database.SPARK:
+        codegen_options['jar_layout'] = UDFJarLayout(udf_jar_layout)
+        codegen_options['jar_shards'] = udf_jar_shards
+        codegen_options['udf_mode'] = UDFMode(udf_mode)
+        codegen_options['wide_int_as_string'] = wide_int_as_string
+        codegen_options['single_decode'] = single_decode
+        codegen_options['layout'] = LayoutOptions(
+            sort_by=_split(sort_by),
+            compression=parquet_compression,
+            row_group_size=parquet_row_group_size,
+            bloom_filter_columns=_split(bloom_filter_columns),
+            target_file_size=target_file_size
+        )
+        codegen_options['session_tuning'] = session_tuning or model_stats is not None
+        codegen_options['model_stats'] = stats
+        codegen_options['decode_metrics'] = decode_metrics
+    elif database_obj == Database.DUCKDB:
+        codegen_options['wide_int_as_string'] = wide_int_as_string
+        codegen_options['layout'] = LayoutOptions(sort_by=_split(sort_by))
+
+    profiler = PhaseProfiler(enabled=profile, profile_phase=profile_phase, profile_mode=ProfileMode(profile_mode))
+    generator = DbtGenerator(
+        database=database_obj,
+        remote_dir_url=remote_dir_url,
+        dbt_dir=dbt_dir,
+        codegen_options=codegen_options,
+        shared_event_min_contracts=shared_event_min_contracts,
+        profiler=profiler,
+        version_cutover_dt=version_cutover_dt,
+        consolidated_event_max_daily_bytes=consolidated_event_max_daily_bytes,
+        model_daily_bytes={k: v.daily_bytes for k, v in (stats or {}).items() if v.daily_bytes is not None}
+    )
     generator.gen_all()
+    profiler.dump(profile_output, ProfileFormat(profile_format))
+
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    return [i.strip() for i in value.split(',') if i.strip()] if value is not None else None
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import click
+
+from bdbt.ethereum.decode.parquet_decode_job import DecodeRouter, ParquetDecodeJob, load_contracts
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('-d', '--dbt-dir', default=Path.cwd(), show_default=True, type=str,
+              help='The absolute path for the dbt project, the contracts are loaded from its contracts folder.')
+@click.option('-p', '--projects', default=None, type=str,
+              help='The comma separated projects to decode, all projects by default.')
+@click.option('-l', '--logs', multiple=True, type=click.Path(exists=True),
+              help='The parquet files or folders of the raw logs with the columns of stg_logs, repeatable.')
+@click.option('-t', '--traces', multiple=True, type=click.Path(exists=True),
+              help='The parquet files or folders of the raw traces with the columns of stg_traces, repeatable.')
+@click.option('-o', '--output-dir', required=True, type=str,
+              help='The folder of the decoded datasets, one dataset for every model partitioned by dt.')
+@click.option('-w', '--workers', default=None, type=int,
+              help='The number of the decode processes, the number of the cpus by default.')
+@click.option('--exact-types', default=False, show_default=True, is_flag=True,
+              help='Keep the decoded values in the exact Arrow types (e.g. uint64, decimal256, fixed size binaries) '
+                   'instead of the types of the Spark models, the wide integers are not truncated to decimal(38, 0).')
+@click.option('--wide-int-as-decimal', default=False, show_default=True, is_flag=True,
+              help='With --exact-types, keep the integers with more than 76 digits (e.g. uint256) as decimal256 '
+                   'instead of the fixed size binaries, the values out of the range are null.')
+def ethereum_decode(
+        output_dir: str,
+        dbt_dir: str = Path.cwd(),
+        projects: str = None,
+        logs=(),
+        traces=(),
+        workers: int = None,
+        exact_types: bool = False,
+        wide_int_as_decimal: bool = False
+) -> None:
+    if not logs and not traces:
+        raise click.UsageError('--logs or --traces is required.')
+
+    contracts = load_contracts(dbt_dir, projects.split(',') if projects else None)
+    job = ParquetDecodeJob(DecodeRouter(contracts), output_dir, workers, exact_types, wide_int_as_decimal)
+    stats = job.run(logs, traces)
+    click.echo(f'{stats.rows} rows read, {stats.decoded_rows} rows decoded, {stats.failed_rows} rows failed.')
@@ -0,0 +1,45 @@
+import os
+
+import click
+
+from bdbt.ethereum.dbt.spark.decode_metrics import parse_decode_metrics
+
+
+def _read_lines(paths):
+    for path in paths:
+        files = [os.path.join(root, i) for root, _, names in os.walk(path) for i in sorted(names)] \
+            if os.path.isdir(path) else [path]
+        for filepath in files:
+            with open(filepath, 'r', errors='replace') as f:
+                yield from f
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.argument('logs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--sort-by', default='time', show_default=True,
+              type=click.Choice(['time', 'failures', 'failure-ratio', 'rows']),
+              help='The order of the UDFs, the largest first.')
+@click.option('-n', '--top', default=None, type=int,
+              help='Only print the first N UDFs.')
+def ethereum_decode_metrics(
+        logs=(),
+        sort_by: str = 'time',
+        top: int = None
+) -> None:
+    """
+    Summarize the decode counters in the executor logs (files or folders) of the models generated with
+    --decode-metrics.
+    """
+    results = parse_decode_metrics(_read_lines(logs))
+    if sort_by == 'failures':
+        results.sort(key=lambda i: -i.failures)
+    elif sort_by == 'failure-ratio':
+        results.sort(key=lambda i: -i.failure_ratio)
+    elif sort_by == 'rows':
+        results.sort(key=lambda i: -i.rows)
+
+    click.echo(f'{"udf":<64} {"rows":>12} {"failures":>10} {"fail %":>7} {"bytes/row":>10} {"ns/row":>10} '
+               f'{"time(s)":>9} {"jvms":>5}')
+    for i in results[:top]:
+        click.echo(f'{i.udf:<64} {i.rows:>12} {i.failures:>10} {i.failure_ratio * 100:>7.2f} '
+                   f'{i.bytes_per_row:>10.0f} {i.nanos_per_row:>10.0f} {i.decode_nanos / 1e9:>9.2f} {i.jvms:>5}')
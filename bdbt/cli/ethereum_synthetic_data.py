@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import click
+
+from bdbt.ethereum.decode.parquet_decode_job import load_contracts
+from bdbt.ethereum.synthetic.chain_data_generator import SyntheticChainDataGenerator
+from bdbt.global_type import Contract
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('-d', '--dbt-dir', default=None, type=str,
+              help='The absolute path for the dbt project, the contracts are loaded from its contracts folder.')
+@click.option('-p', '--projects', default=None, type=str,
+              help='The comma separated projects of the dbt project, all projects by default.')
+@click.option('-a', '--abi', 'abi_files', multiple=True, type=click.Path(exists=True),
+              help='The JSON ABI files, every file is a contract named by the file name without address, repeatable.')
+@click.option('-o', '--output-dir', required=True, type=str,
+              help='The folder of the data, the logs and the traces are written into its logs and traces folders.')
+@click.option('--logs-rows', default=0, show_default=True, type=int, help='The number of the logs.')
+@click.option('--traces-rows', default=0, show_default=True, type=int, help='The number of the traces.')
+@click.option('--rows-per-file', default=1000000, show_default=True, type=int,
+              help='The max number of the rows in every parquet file.')
+@click.option('--seed', default=0, show_default=True, type=int, help='The seed of the random values.')
+@click.option('--contract-skew', default=1.0, show_default=True, type=float,
+              help='The zipf exponent of the rows across the contracts in the given order, 0 is uniform.')
+@click.option('--schema-skew', default=1.0, show_default=True, type=float,
+              help='The zipf exponent of the rows across the events / calls of every contract, 0 is uniform.')
+@click.option('--noise-ratio', default=0.0, show_default=True, type=float,
+              help='The ratio of the rows emitted by the unknown contracts.')
+@click.option('--failed-call-ratio', default=0.05, show_default=True, type=float,
+              help='The ratio of the reverted traces.')
+@click.option('--start-dt', default='2022-01-01', show_default=True, type=str, help='The dt of the first block.')
+def ethereum_synthetic_data(
+        output_dir: str,
+        dbt_dir: str = None,
+        projects: str = None,
+        abi_files=(),
+        logs_rows: int = 0,
+        traces_rows: int = 0,
+        rows_per_file: int = 1000000,
+        seed: int = 0,
+        contract_skew: float = 1.0,
+        schema_skew: float = 1.0,
+        noise_ratio: float = 0.0,
+        failed_call_ratio: float = 0.05,
+        start_dt: str = '2022-01-01'
+) -> None:
+    contracts = load_contracts(dbt_dir, projects.split(',') if projects else None) if dbt_dir else []
+    for abi_file in abi_files:
+        with open(abi_file, 'r') as f:
+            contracts.append(('synthetic', Contract.from_dicts(
+                {'name': Path(abi_file).stem, 'materialize': 'increment', 'abi': json.loads(f.read())})))
+    if not contracts:
+        raise click.UsageError('--dbt-dir or --abi is required.')
+
+    generator = SyntheticChainDataGenerator(
+        contracts,
+        seed=seed,
+        contract_skew=contract_skew,
+        schema_skew=schema_skew,
+        noise_ratio=noise_ratio,
+        failed_call_ratio=failed_call_ratio,
+        start_dt=start_dt
+    )
+    generator.write(output_dir, logs_rows, traces_rows, rows_per_file)
+    click.echo(f'{logs_rows} logs and {traces_rows} traces of {len(contracts)} contracts written into {output_dir}.')
@@ -1,34 +1,109 @@
-from dataclasses import dataclass
+import inspect
+import weakref
+from dataclasses import dataclass, field
+from types import MappingProxyType
 from typing import (
     Optional,
     List,
-    Dict,
+    Mapping,
+    Sequence,
+    Tuple,
+    Any,
 )
 
 from bdbt.ethereum.abi.abi_type import ABIEvent, ABICall
 from bdbt.ethereum.exceptions import ABITypeNotValid
 
 
-@dataclass
-class ABIDataType:
+class _FlyweightMeta(type):
+    """
+    Intern the instances by their constructor arguments, calling a class with the same arguments
+    returns the same (immutable) instance, so the type trees of the huge ABIs are shared instead of copied.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._signature = inspect.signature(cls.__init__)
+        cls._instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        bound = cls._signature.bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        key = cls._intern_key(*list(bound.arguments.values())[1:])
+
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            object.__setattr__(instance, '_key', key)
+            object.__setattr__(instance, '_hash', hash((cls, key)))
+            instance = cls._instances.setdefault(key, instance)
+        return instance
+
+
+class _Flyweight(metaclass=_FlyweightMeta):
+    __slots__ = ('_key', '_hash', '__weakref__')
+
+    @classmethod
+    def _intern_key(cls, *args) -> Tuple:
+        return args
+
+    def _init_attrs(self, **attrs: Any) -> None:
+        for name, value in attrs.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} is immutable.')
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Unpickling goes through the constructor again, so the instances keep interned in the other process.
+        return self.__class__, self._ctor_args()
+
+    def _ctor_args(self) -> Tuple:
+        return tuple(getattr(self, name) for name in list(self._signature.parameters)[1:])
+
+    def __repr__(self):
+        args = ', '.join(f'{name}={getattr(self, name)!r}' for name in list(self._signature.parameters)[1:])
+        return f'{self.__class__.__name__}({args})'
+
+
+class ABIDataType(_Flyweight):
     """
     Follow by: https://docs.soliditylang.org/en/v0.8.11/abi-spec.html#types
     """
-    canonical_type: Optional[str] = None
+    __slots__ = ('canonical_type',)
+
+    def __init__(self, canonical_type: Optional[str] = None):
+        self._init_attrs(canonical_type=canonical_type)
 
 
 class ABIIntType(ABIDataType):
+    __slots__ = ('bit_length', 'unsigned')
+
     def __init__(self, bit_length: int, unsigned: bool):
         if bit_length > 256 or bit_length <= 0 or bit_length % 8 != 0:
             raise ABITypeNotValid(
                 'The bit length of the integer type must less than or equal to 256, more than 0 and divisible by 8.')
 
         super(ABIIntType, self).__init__(canonical_type=f'{"u" if unsigned else ""}int{bit_length}')
-        self.bit_length = bit_length
-        self.unsigned = unsigned
+        self._init_attrs(bit_length=bit_length, unsigned=unsigned)
 
 
 class ABIStringType(ABIDataType):
+    __slots__ = ()
+
     def __init__(self):
         super(ABIStringType, self).__init__(canonical_type='string')
 
@@ -37,17 +112,22 @@ class ABIAddressType(ABIDataType):
     """
     The address type equivalent to uint160 in the document, but we will transform to HexString to show.
     """
+    __slots__ = ()
 
     def __init__(self):
         super(ABIAddressType, self).__init__(canonical_type='address')
 
 
 class ABIBoolType(ABIDataType):
+    __slots__ = ()
+
     def __init__(self):
         super(ABIBoolType, self).__init__(canonical_type='bool')
 
 
 class ABIFixedType(ABIDataType):
+    __slots__ = ('bit_length', 'scale', 'unsigned')
+
     def __init__(self, bit_length: int, scale: int, unsigned: bool):
         if bit_length > 256 or bit_length < 8 or bit_length % 8 != 0:
             raise ABITypeNotValid(
@@ -58,25 +138,27 @@ class ABIFixedType(ABIDataType):
                 'The scale of the fixed type must less than or equal to 80 and more than 0.')
 
         super(ABIFixedType, self).__init__(canonical_type=f'{"u" if unsigned else ""}fixed{bit_length}x{scale}')
-        self.bit_length = bit_length
-        self.scale = scale
-        self.unsigned = unsigned
+        self._init_attrs(bit_length=bit_length, scale=scale, unsigned=unsigned)
 
 
 class ABIByteType(ABIDataType):
+    __slots__ = ()
+
     def __init__(self):
         super(ABIByteType, self).__init__(canonical_type='byte')
 
 
 class ABIArrayType(ABIDataType):
+    __slots__ = ('length', 'element_type')
+
     def __init__(self, canonical_type: str, element_type: ABIDataType, length: int):
         super(ABIArrayType, self).__init__(canonical_type=canonical_type)
-
-        self.length = length
-        self.element_type = element_type
+        self._init_attrs(length=length, element_type=element_type)
 
 
 class ABIBytesType(ABIArrayType):
+    __slots__ = ('dynamic',)
+
     def __init__(self, length: int, dynamic: bool):
         if length > 32 or length <= 0:
             raise ABITypeNotValid(
@@ -87,11 +169,12 @@ class ABIBytesType(ABIArrayType):
             element_type=ABIByteType(),
             length=length
         )
-
-        self.dynamic = dynamic
+        self._init_attrs(dynamic=dynamic)
 
 
 class ABIFunctionType(ABIArrayType):
+    __slots__ = ()
+
     def __init__(self):
         super(ABIFunctionType, self).__init__(
             canonical_type='function',
@@ -101,20 +184,45 @@ class ABIFunctionType(ABIArrayType):
 
 
 class ABITupleType(ABIDataType):
-    def __init__(self, element_fields: List['ABIField']):
+    __slots__ = ('element_fields',)
+
+    def __init__(self, element_fields: Sequence['ABIField']):
         super().__init__(canonical_type='tuple')
+        self._init_attrs(element_fields=tuple(element_fields))
 
-        self.element_fields = element_fields
+    @classmethod
+    def _intern_key(cls, element_fields: Sequence['ABIField']) -> Tuple:
+        return tuple(element_fields),
 
-    def add(self, field: 'ABIField'):
-        self.element_fields.append(field)
+    def add(self, field: 'ABIField') -> 'ABITupleType':
+        """
+        The tuple type is shared by every field using it, so adding a field returns a new tuple type.
+        """
+        return ABITupleType(self.element_fields + (field,))
 
 
-@dataclass
-class ABIField:
-    name: str
-    ftype: ABIDataType
-    metadata: Optional[Dict[str, any]] = None
+class ABIField(_Flyweight):
+    __slots__ = ('name', 'ftype', 'metadata')
+
+    def __init__(self, name: str, ftype: ABIDataType, metadata: Optional[Mapping[str, Any]] = None):
+        self._init_attrs(
+            name=name,
+            ftype=ftype,
+            metadata=MappingProxyType(dict(metadata)) if metadata is not None else None
+        )
+
+    @classmethod
+    def _intern_key(cls, name: str, ftype: ABIDataType, metadata: Optional[Mapping[str, Any]]) -> Tuple:
+        return name, ftype, tuple(sorted(metadata.items())) if metadata is not None else None
+
+    def _ctor_args(self) -> Tuple:
+        return self.name, self.ftype, dict(self.metadata) if self.metadata is not None else None
+
+    def rename(self, name: str) -> 'ABIField':
+        """
+        Return the field with another name, the type tree is shared with this field.
+        """
+        return ABIField(name, self.ftype, self.metadata)
 
 
 @dataclass
@@ -122,6 +230,8 @@ class ABIEventSchema:
     name: str
     inputs: List[ABIField]
     raw_schema: ABIEvent
+    # the topic of the event, it's filled by the transformer
+    selector: Optional[str] = field(default=None, compare=False)
 
     @property
     def is_empty(self):
@@ -134,6 +244,8 @@ class ABICallSchema:
     inputs: List[ABIField]
     outputs: List[ABIField]
     raw_schema: ABICall
+    # the 4 bytes selector of the function, it's filled by the transformer
+    selector: Optional[str] = field(default=None, compare=False)
 
     @property
     def is_empty(self):
@@ -0,0 +1,168 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIDataType,
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType,
+    ABIArrayType,
+    ABIField,
+    ABIEventSchema,
+    ABICallSchema
+)
+from bdbt.ethereum.exceptions import ABIDecodeError
+
+WORD_SIZE = 32
+
+
+def is_dynamic(atype: ABIDataType) -> bool:
+    if isinstance(atype, ABIBytesType):
+        return atype.dynamic
+    elif isinstance(atype, ABIStringType):
+        return True
+    elif isinstance(atype, ABIFunctionType):
+        return False
+    elif isinstance(atype, ABIArrayType):
+        return atype.length < 0 or is_dynamic(atype.element_type)
+    elif isinstance(atype, ABITupleType):
+        return any(is_dynamic(i.ftype) for i in atype.element_fields)
+    return False
+
+
+def head_size(atype: ABIDataType) -> int:
+    """
+    The size of the type in the head of the enclosing tuple, the dynamic types only keep their offsets in the head.
+    """
+    if is_dynamic(atype):
+        return WORD_SIZE
+    elif isinstance(atype, (ABIBytesType, ABIFunctionType)):
+        return WORD_SIZE
+    elif isinstance(atype, ABIArrayType):
+        return atype.length * head_size(atype.element_type)
+    elif isinstance(atype, ABITupleType):
+        return sum(head_size(i.ftype) for i in atype.element_fields)
+    return WORD_SIZE
+
+
+class ABIDecoder:
+    """
+    Decode the ABI encoded data into the python values, follow by:
+    https://docs.soliditylang.org/en/v0.8.11/abi-spec.html#formal-specification-of-the-encoding
+
+    The integers are int, the fixed numbers are Decimal, the addresses are the lower case hex strings,
+    the bytes and the functions are bytes, the arrays are lists and the tuples are dicts.
+    """
+
+    def decode_fields(self, fields: Sequence[ABIField], data: bytes) -> Dict[str, Any]:
+        """
+        Decode the fields encoded as a tuple, e.g. the inputs of a call.
+        """
+        values = self._decode_tuple([i.ftype for i in fields], data, 0)
+        return {field.name: value for field, value in zip(fields, values)}
+
+    def decode_event(self, event: ABIEventSchema, topics: Sequence[Union[str, bytes]], data: bytes) -> Dict[str, Any]:
+        """
+        The indexed fields are decoded from the topics, the others from the data.
+        The indexed dynamic fields are None, their topics are the hashes of the values.
+
+        :param topics: all topics of the log, the first one is the selector unless the event is anonymous
+        """
+        topics = [bytes.fromhex(i[2:] if i.startswith('0x') else i) if isinstance(i, str) else i for i in topics]
+        indexed_topics = iter(topics if event.raw_schema.anonymous else topics[1:])
+
+        indexed_fields = [i for i in event.inputs if self._is_indexed(i)]
+        if len(topics) - (not event.raw_schema.anonymous) != len(indexed_fields):
+            raise ABIDecodeError(f'{event.name} has {len(indexed_fields)} indexed fields, but the log has '
+                                 f'{len(topics)} topics.')
+
+        values = self.decode_fields([i for i in event.inputs if not self._is_indexed(i)], data)
+        for field in indexed_fields:
+            topic = next(indexed_topics)
+            values[field.name] = None if is_dynamic(field.ftype) or not isinstance(
+                field.ftype, (ABIIntType, ABIFixedType, ABIAddressType, ABIBoolType, ABIBytesType, ABIFunctionType)
+            ) else self._decode(field.ftype, topic, 0)
+
+        return {i.name: values[i.name] for i in event.inputs}
+
+    def decode_call(self, call: ABICallSchema, input_data: bytes, output_data: Optional[bytes]) -> Dict[str, Any]:
+        """
+        :param input_data: the input of the trace, it starts with the selector
+        :param output_data: the outputs are None if it's None or empty, e.g. the call is reverted
+        """
+        if len(input_data) < 4:
+            raise ABIDecodeError(f'the input of {call.name} is shorter than the selector.')
+
+        values = self.decode_fields(call.inputs, input_data[4:])
+        if output_data:
+            values.update(self.decode_fields(call.outputs, output_data))
+        else:
+            values.update({i.name: None for i in call.outputs})
+        return values
+
+    @staticmethod
+    def _is_indexed(field: ABIField) -> bool:
+        return field.metadata is not None and field.metadata.get('indexed', False)
+
+    def _decode_tuple(self, types: Sequence[ABIDataType], data: bytes, start: int) -> List[Any]:
+        values = []
+        position = start
+        for atype in types:
+            if is_dynamic(atype):
+                values.append(self._decode(atype, data, start + self._read_uint(data, position)))
+                position += WORD_SIZE
+            else:
+                values.append(self._decode(atype, data, position))
+                position += head_size(atype)
+        return values
+
+    def _decode(self, atype: ABIDataType, data: bytes, start: int) -> Any:
+        if isinstance(atype, ABIIntType):
+            return int.from_bytes(self._read_word(data, start), 'big', signed=not atype.unsigned)
+        elif isinstance(atype, ABIAddressType):
+            return '0x' + self._read_word(data, start)[12:].hex()
+        elif isinstance(atype, ABIBoolType):
+            return self._read_word(data, start) != bytes(WORD_SIZE)
+        elif isinstance(atype, ABIFixedType):
+            value = int.from_bytes(self._read_word(data, start), 'big', signed=not atype.unsigned)
+            return Decimal(f'{value}e-{atype.scale}')
+        elif isinstance(atype, ABIStringType):
+            return self._read_dynamic_bytes(data, start).decode('utf-8', errors='replace')
+        elif isinstance(atype, ABIBytesType):
+            if atype.dynamic:
+                return self._read_dynamic_bytes(data, start)
+            return self._read_word(data, start)[:atype.length]
+        elif isinstance(atype, ABIFunctionType):
+            return self._read_word(data, start)[:atype.length]
+        elif isinstance(atype, ABIArrayType):
+            if atype.length < 0:
+                length = self._read_uint(data, start)
+                # every element takes one word at least, the length can't be more than the remaining words
+                if length > (len(data) - start) // WORD_SIZE:
+                    raise ABIDecodeError(f'the length {length} of {atype.canonical_type} is out of the data.')
+                return self._decode_tuple([atype.element_type] * length, data, start + WORD_SIZE)
+            return self._decode_tuple([atype.element_type] * atype.length, data, start)
+        elif isinstance(atype, ABITupleType):
+            values = self._decode_tuple([i.ftype for i in atype.element_fields], data, start)
+            return {field.name: value for field, value in zip(atype.element_fields, values)}
+        raise ABIDecodeError(f'{atype.canonical_type} is not a supported type.')
+
+    @staticmethod
+    def _read_word(data: bytes, start: int) -> bytes:
+        if start < 0 or start + WORD_SIZE > len(data):
+            raise ABIDecodeError(f'the word at {start} is out of the data of {len(data)} bytes.')
+        return data[start:start + WORD_SIZE]
+
+    def _read_uint(self, data: bytes, start: int) -> int:
+        return int.from_bytes(self._read_word(data, start), 'big')
+
+    def _read_dynamic_bytes(self, data: bytes, start: int) -> bytes:
+        length = self._read_uint(data, start)
+        if start + WORD_SIZE + length > len(data):
+            raise ABIDecodeError(f'the {length} bytes at {start} are out of the data of {len(data)} bytes.')
+        return data[start + WORD_SIZE:start + WORD_SIZE + length]
@@ -0,0 +1,134 @@
+from decimal import Decimal
+from typing import Any, List, Mapping, Sequence, Tuple
+
+from eth_utils import keccak
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIDataType,
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType,
+    ABIArrayType,
+    ABIField,
+    ABIEventSchema,
+    ABICallSchema
+)
+from bdbt.ethereum.abi.abi_decoder import is_dynamic, WORD_SIZE
+from bdbt.ethereum.abi.utils import event_selector, call_selector
+from bdbt.ethereum.exceptions import ABIEncodeError
+
+
+class ABIEncoder:
+    """
+    Encode the python values into the ABI encoded data, it's the inverse of `ABIDecoder`,
+    the values are in the same form as the decoded values.
+    """
+
+    def encode_fields(self, fields: Sequence[ABIField], values: Mapping[str, Any]) -> bytes:
+        """
+        Encode the fields as a tuple, e.g. the inputs of a call.
+        """
+        return self._encode_tuple([i.ftype for i in fields], [values[i.name] for i in fields])
+
+    def encode_event(self, event: ABIEventSchema, values: Mapping[str, Any]) -> Tuple[List[str], bytes]:
+        """
+        The indexed fields are encoded into the topics, the dynamic ones are the hashes of the values.
+
+        :return: the hex topics starting with the selector unless the event is anonymous, and the data
+        """
+        topics = [] if event.raw_schema.anonymous else [event_selector(event)]
+        for field in event.inputs:
+            if self._is_indexed(field):
+                topic = self._encode(field.ftype, values[field.name])
+                topics.append('0x' + (keccak(topic) if self._is_hashed_topic(field.ftype) else topic).hex())
+
+        data = self.encode_fields([i for i in event.inputs if not self._is_indexed(i)], values)
+        return topics, data
+
+    def encode_call(self, call: ABICallSchema, values: Mapping[str, Any]) -> Tuple[bytes, bytes]:
+        """
+        :return: the input starting with the selector, and the output
+        """
+        selector = bytes.fromhex(call_selector(call)[2:])
+        return selector + self.encode_fields(call.inputs, values), self.encode_fields(call.outputs, values)
+
+    @staticmethod
+    def _is_indexed(field: ABIField) -> bool:
+        return field.metadata is not None and field.metadata.get('indexed', False)
+
+    @staticmethod
+    def _is_hashed_topic(atype: ABIDataType) -> bool:
+        # only the elementary values fit in one topic, the topics of the others are the hashes of their encodings
+        if isinstance(atype, ABIBytesType):
+            return atype.dynamic
+        elif isinstance(atype, ABIFunctionType):
+            return False
+        return isinstance(atype, (ABIStringType, ABIArrayType, ABITupleType))
+
+    def _encode_tuple(self, types: Sequence[ABIDataType], values: Sequence[Any]) -> bytes:
+        encoded = [self._encode(atype, value) for atype, value in zip(types, values)]
+        # the dynamic values are in the tail, the head keeps their offsets from the start of the tuple
+        head_length = sum(WORD_SIZE if is_dynamic(atype) else len(i) for atype, i in zip(types, encoded))
+        heads, tails = [], []
+        offset = head_length
+        for atype, value in zip(types, encoded):
+            if is_dynamic(atype):
+                heads.append(self._encode_uint(offset))
+                tails.append(value)
+                offset += len(value)
+            else:
+                heads.append(value)
+        return b''.join(heads + tails)
+
+    def _encode(self, atype: ABIDataType, value: Any) -> bytes:
+        if isinstance(atype, ABIIntType):
+            return self._encode_int(value, atype.bit_length, atype.unsigned)
+        elif isinstance(atype, ABIAddressType):
+            return bytes.fromhex(value[2:] if value.startswith('0x') else value).rjust(WORD_SIZE, b'\x00')
+        elif isinstance(atype, ABIBoolType):
+            return self._encode_uint(int(bool(value)))
+        elif isinstance(atype, ABIFixedType):
+            unscaled = Decimal(value).scaleb(atype.scale)
+            if unscaled != unscaled.to_integral_value():
+                raise ABIEncodeError(f'{value} has more digits than the scale of {atype.canonical_type}.')
+            return self._encode_int(int(unscaled), atype.bit_length, atype.unsigned)
+        elif isinstance(atype, ABIStringType):
+            return self._encode_dynamic_bytes(value.encode('utf-8'))
+        elif isinstance(atype, ABIBytesType):
+            if atype.dynamic:
+                return self._encode_dynamic_bytes(value)
+            if len(value) != atype.length:
+                raise ABIEncodeError(f'{atype.canonical_type} requires {atype.length} bytes, got {len(value)}.')
+            return value.ljust(WORD_SIZE, b'\x00')
+        elif isinstance(atype, ABIFunctionType):
+            return value.ljust(WORD_SIZE, b'\x00')
+        elif isinstance(atype, ABIArrayType):
+            if atype.length < 0:
+                return self._encode_uint(len(value)) + self._encode_tuple([atype.element_type] * len(value), value)
+            if len(value) != atype.length:
+                raise ABIEncodeError(f'{atype.canonical_type} requires {atype.length} elements, got {len(value)}.')
+            return self._encode_tuple([atype.element_type] * atype.length, value)
+        elif isinstance(atype, ABITupleType):
+            return self._encode_tuple([i.ftype for i in atype.element_fields],
+                                      [value[i.name] for i in atype.element_fields])
+        raise ABIEncodeError(f'{atype.canonical_type} is not a supported type.')
+
+    @staticmethod
+    def _encode_int(value: int, bit_length: int, unsigned: bool) -> bytes:
+        low, high = (0, 2 ** bit_length) if unsigned else (-2 ** (bit_length - 1), 2 ** (bit_length - 1))
+        if not low <= value < high:
+            raise ABIEncodeError(f'{value} is out of the range of {bit_length} bits.')
+        return value.to_bytes(WORD_SIZE, 'big', signed=not unsigned)
+
+    @staticmethod
+    def _encode_uint(value: int) -> bytes:
+        return value.to_bytes(WORD_SIZE, 'big')
+
+    def _encode_dynamic_bytes(self, value: bytes) -> bytes:
+        padding = -len(value) % WORD_SIZE
+        return self._encode_uint(len(value)) + value + b'\x00' * padding
@@ -0,0 +1,103 @@
+import dataclasses
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+from eth_utils import encode_hex, keccak
+from eth_utils.abi import collapse_if_tuple
+
+from bdbt.ethereum.abi.abi_type import ABI, ABIElement, ABIEvent
+
+# The elements without name, they can't be looked up by name.
+unnamed_element_types = ('fallback', 'constructor', 'receive')
+
+
+def element_signature(element: ABIElement) -> str:
+    """
+    The canonical signature of the event or the function, e.g. Transfer(address,address,uint256),
+    the tuples are collapsed into the types of their components.
+    """
+    types = ','.join(collapse_if_tuple(dataclasses.asdict(i)) for i in element.inputs)
+    return f'{element.name}({types})'
+
+
+def signature_selector(signature: str, event: bool) -> str:
+    """
+    The topic of the event, or the 4 bytes selector of the function, in the 0x prefixed hex.
+    """
+    digest = encode_hex(keccak(text=signature))
+    return digest if event else digest[0:10]
+
+
+@dataclasses.dataclass
+class _ElementHashes:
+    by_signature: Dict[str, List[ABIElement]] = dataclasses.field(default_factory=dict)
+    by_selector: Dict[str, List[ABIElement]] = dataclasses.field(default_factory=dict)
+    # id of the element -> selector, the elements are not hashable
+    selectors: Dict[int, str] = dataclasses.field(default_factory=dict)
+
+
+class ABIIndex:
+    """
+    The elements of an ABI indexed by type, name, signature and selector, the ABI is scanned once,
+    so looking up all elements of a huge ABI (e.g. a diamond proxy with hundreds of facets) is linear.
+
+    The elements keep the order of the ABI under every key, the signatures and the selectors are hashed
+    in one more pass on the first lookup by them.
+    """
+
+    def __init__(self, abi: ABI):
+        self.abi = abi
+        self._by_type: Dict[str, List[ABIElement]] = {}
+        self._by_name: Dict[str, List[ABIElement]] = {}
+        self._by_type_and_name: Dict[Tuple[str, str], List[ABIElement]] = {}
+
+        for element in abi.elements:
+            self._by_type.setdefault(element.type, []).append(element)
+            if element.type in unnamed_element_types:
+                continue
+            self._by_name.setdefault(element.name, []).append(element)
+            self._by_type_and_name.setdefault((element.type, element.name), []).append(element)
+
+    def by_type(self, type_str: str) -> List[ABIElement]:
+        return self._by_type.get(type_str, [])
+
+    def by_name(self, name: str) -> List[ABIElement]:
+        return self._by_name.get(name, [])
+
+    def by_type_and_name(self, type_str: str, name: str) -> List[ABIElement]:
+        return self._by_type_and_name.get((type_str, name), [])
+
+    def names(self, type_str: str) -> List[str]:
+        """
+        The distinct names of the elements of the type, in the order of their first appearance.
+        """
+        return [name for element_type, name in self._by_type_and_name if element_type == type_str]
+
+    def by_signature(self, signature: str) -> List[ABIElement]:
+        return self._hashes.by_signature.get(signature, [])
+
+    def by_selector(self, selector: str) -> List[ABIElement]:
+        """
+        :param selector: the topic of an event or the 4 bytes selector of a function
+        """
+        return self._hashes.by_selector.get(selector.lower(), [])
+
+    def selector(self, element: ABIElement) -> str:
+        """
+        The topic or the selector of an event or a function of this ABI.
+        """
+        return self._hashes.selectors[id(element)]
+
+    @cached_property
+    def _hashes(self) -> _ElementHashes:
+        hashes = _ElementHashes()
+        for element in self.abi.elements:
+            if element.type not in ('event', 'function'):
+                continue
+            signature = element_signature(element)
+            selector = signature_selector(signature, isinstance(element, ABIEvent))
+            hashes.by_signature.setdefault(signature, []).append(element)
+            hashes.by_selector.setdefault(selector, []).append(element)
+            hashes.selectors[id(element)] = selector
+        return hashes
+
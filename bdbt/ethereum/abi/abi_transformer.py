@@ -1,6 +1,5 @@
 import re
-from copy import deepcopy
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from bdbt.ethereum.abi.abi_data_type import (
     ABIDataType,
@@ -18,6 +17,7 @@ from bdbt.ethereum.abi.abi_data_type import (
     ABICallSchema,
     ABISchema
 )
+from bdbt.ethereum.abi.abi_index import ABIIndex
 from bdbt.ethereum.abi.abi_type import (
     ABIEventElement,
     ABI,
@@ -25,7 +25,6 @@ from bdbt.ethereum.abi.abi_type import (
     ABICall,
     ABICallElement
 )
-from bdbt.ethereum.abi.utils import filter_by_type_and_name, filter_by_type
 from bdbt.ethereum.exceptions import TargetItemNotFound
 
 
@@ -112,8 +111,23 @@ class ABITransformer:
                 ftype=self.abi_type_mapping[atype_str],
             )
 
-    def transform_abi_event(self, abi: ABI, event_name: str) -> List[ABIEventSchema]:
-        candidate_events: List[ABIEvent] = filter_by_type_and_name(name=event_name, type_str='event', contract_abi=abi)
+    @staticmethod
+    def _abi_index(abi: ABI, index: Optional[ABIIndex]) -> ABIIndex:
+        if index is None:
+            return ABIIndex(abi)
+        # the selectors are looked up by the elements of the ABI the index is built from
+        if index.abi is not abi:
+            raise ValueError('the index is not built from the ABI.')
+        return index
+
+    def transform_abi_event(
+            self, abi: ABI, event_name: str, index: Optional[ABIIndex] = None
+    ) -> List[ABIEventSchema]:
+        """
+        :param index: the index of the ABI, it's built from the ABI if it's None
+        """
+        index = self._abi_index(abi, index)
+        candidate_events: List[ABIEvent] = index.by_type_and_name('event', event_name)
 
         if not candidate_events:
             raise TargetItemNotFound(f"{event_name} event can not be found in ABI")
@@ -125,14 +139,21 @@ class ABITransformer:
                 ABIEventSchema(
                     name=event.name if idx == 0 else event.name + str(idx),
                     inputs=self._revise_fields([self._transform_event_element(i) for i in event.inputs]),
-                    raw_schema=event
+                    raw_schema=event,
+                    selector=index.selector(event)
                 )
             )
 
         return event_schemas
 
-    def transform_abi_call(self, abi: ABI, call_name: str) -> List[ABICallSchema]:
-        candidate_calls: List[ABICall] = filter_by_type_and_name(name=call_name, type_str='function', contract_abi=abi)
+    def transform_abi_call(
+            self, abi: ABI, call_name: str, index: Optional[ABIIndex] = None
+    ) -> List[ABICallSchema]:
+        """
+        :param index: the index of the ABI, it's built from the ABI if it's None
+        """
+        index = self._abi_index(abi, index)
+        candidate_calls: List[ABICall] = index.by_type_and_name('function', call_name)
 
         if not candidate_calls:
             raise TargetItemNotFound(f"{call_name} call can not be found in ABI")
@@ -145,18 +166,25 @@ class ABITransformer:
                     name=call.name if idx == 0 else call.name + str(idx),
                     inputs=self._revise_fields([self._transform_call_element(i) for i in call.inputs]),
                     outputs=self._revise_fields([self._transform_call_element(i) for i in call.outputs], 'output'),
-                    raw_schema=call
+                    raw_schema=call,
+                    selector=index.selector(call)
                 )
             )
 
         return call_schemas
 
-    def transform_abi(self, abi: ABI) -> ABISchema:
-        event_names = set([i.name for i in filter_by_type(type_str='event', contract_abi=abi)])
-        call_names = set(i.name for i in filter_by_type(type_str='function', contract_abi=abi))
+    def transform_abi(self, abi: ABI, include_read_only_calls: bool = True) -> ABISchema:
+        """
+        The ABI is indexed once, so the transform is linear in the size of the ABI.
+
+        :param include_read_only_calls: whether to keep the view and pure functions, the overloaded calls are
+                                        filtered after naming, so the names of the others are not changed.
+        """
+        index = ABIIndex(abi)
 
-        events = [item for i in event_names for item in self.transform_abi_event(abi, i)]
-        calls = [item for i in call_names for item in self.transform_abi_call(abi, i)]
+        events = [item for i in index.names('event') for item in self.transform_abi_event(abi, i, index)]
+        calls = [item for i in index.names('function') for item in self.transform_abi_call(abi, i, index)
+                 if include_read_only_calls or not item.raw_schema.is_read_only]
         return ABISchema(events=events, calls=calls)
 
     @staticmethod
@@ -168,11 +196,11 @@ class ABITransformer:
 
         revised_fields = []
         for i in range(0, size):
-            new_field = deepcopy(fields[i])
+            field = fields[i]
             if prefix == '':
-                new_field.name = f'_{i}' if new_field.name == '' else new_field.name
+                name = f'_{i}' if field.name == '' else field.name
             else:
-                new_field.name = f'{prefix}_{i}' if new_field.name == '' else f'{prefix}_{new_field.name}'
-            revised_fields.append(new_field)
+                name = f'{prefix}_{i}' if field.name == '' else f'{prefix}_{field.name}'
+            revised_fields.append(field.rename(name))
 
         return revised_fields
@@ -61,6 +61,15 @@ class ABICall(DataClassDictMixin):
     class Config(BaseConfig):
         code_generation_options = [TO_DICT_ADD_OMIT_NONE_FLAG]
 
+    @property
+    def is_read_only(self) -> bool:
+        """
+        The view and pure functions can not modify the state, the `constant` is used by the legacy ABIs.
+        """
+        if self.stateMutability is not None:
+            return self.stateMutability in ('view', 'pure')
+        return bool(self.constant)
+
 
 ABIElement = Union[ABICall, ABIEvent]
 
@@ -0,0 +1,164 @@
+from decimal import Decimal, Context
+from typing import List, Any
+
+import pyarrow as pa
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType,
+    ABIArrayType,
+    ABIDataType,
+    ABIField,
+    ABIEventSchema,
+    ABICallSchema
+)
+from bdbt.ethereum.abi.provider.data_type_provider import (
+    DataTypeProvider,
+    max_decimal_digits,
+    signed_bit_length,
+    fixed_precision_and_scale,
+    MAX_DECIMAL_PRECISION
+)
+
+# The max precision of decimal256 in Arrow
+MAX_DECIMAL256_PRECISION = 76
+
+
+class ArrowDataTypeProvider(DataTypeProvider[pa.DataType]):
+    """
+    Map the ABI types to the exact Arrow types, the integers are kept in the native integers as long as possible,
+    then in decimal128 and decimal256, the integers which may have more than 76 digits (e.g. uint256) are
+    fixed size binaries of the big-endian two's complement by default.
+    """
+
+    def __init__(self, wide_int_as_decimal: bool = False):
+        """
+        :param wide_int_as_decimal: keep the integers which may have more than 76 digits as decimal256(76, 0),
+            the values out of the range can't be represented
+        """
+        self.wide_int_as_decimal = wide_int_as_decimal
+
+    def transform_from_int_type(self, atype: ABIIntType) -> pa.DataType:
+        if atype.bit_length <= 64:
+            width = next(i for i in [8, 16, 32, 64] if atype.bit_length <= i)
+            return pa.type_for_alias(f'{"u" if atype.unsigned else ""}int{width}')
+
+        digits = max_decimal_digits(atype)
+        if digits <= MAX_DECIMAL_PRECISION:
+            return pa.decimal128(digits, 0)
+        elif digits <= MAX_DECIMAL256_PRECISION or self.wide_int_as_decimal:
+            return pa.decimal256(min(digits, MAX_DECIMAL256_PRECISION), 0)
+        else:
+            return pa.binary(atype.bit_length // 8)
+
+    def transform_from_string_type(self, atype: ABIStringType) -> pa.DataType:
+        return pa.string()
+
+    def transform_from_address_type(self, atype: ABIAddressType) -> pa.DataType:
+        # the same hex string with the other providers
+        return pa.string()
+
+    def transform_from_bool_type(self, atype: ABIBoolType) -> pa.DataType:
+        return pa.bool_()
+
+    def transform_from_fixed_type(self, atype: ABIFixedType) -> pa.DataType:
+        precision = max(len(str(2 ** (atype.bit_length - (not atype.unsigned)))), atype.scale)
+        if precision <= MAX_DECIMAL_PRECISION:
+            return pa.decimal128(precision, atype.scale)
+        elif precision <= MAX_DECIMAL256_PRECISION:
+            return pa.decimal256(precision, atype.scale)
+        else:
+            return pa.binary(atype.bit_length // 8)
+
+    def transform_from_bytes_type(self, atype: ABIBytesType) -> pa.DataType:
+        return pa.binary() if atype.dynamic else pa.binary(atype.length)
+
+    def transform_from_function_type(self, atype: ABIFunctionType) -> pa.DataType:
+        # 20 bytes address and 4 bytes selector
+        return pa.binary(atype.length)
+
+    def transform_from_array_type(self, atype: ABIArrayType) -> pa.DataType:
+        element_type = self.transform(atype.element_type)
+        return pa.list_(element_type) if atype.length < 0 else pa.list_(element_type, atype.length)
+
+    def transform_from_tuple_type(self, atype: ABITupleType) -> pa.DataType:
+        return pa.struct(self._fields(atype.element_fields))
+
+    def transform_event_schema(self, event: ABIEventSchema) -> pa.Schema:
+        """
+        The schema of the decoded inputs of the event.
+        """
+        return pa.schema(self._fields(event.inputs), metadata={'name': event.name})
+
+    def transform_call_schema(self, call: ABICallSchema) -> pa.Schema:
+        """
+        The schema of the decoded inputs and outputs of the call, the names of the outputs have the output prefix.
+        """
+        return pa.schema(self._fields(call.inputs + call.outputs), metadata={'name': call.name})
+
+    def to_arrow_value(self, atype: ABIDataType, value: Any) -> Any:
+        """
+        Convert the value decoded by `ABIDecoder` to the python value of the Arrow type of the ABI type, e.g.
+        the integers of the fixed size binaries are the big-endian two's complement bytes.
+        """
+        if value is None:
+            return None
+
+        if isinstance(atype, (ABIIntType, ABIFixedType)):
+            arrow_type = self.transform(atype)
+            if pa.types.is_integer(arrow_type):
+                return value
+            if pa.types.is_fixed_size_binary(arrow_type):
+                unscaled = value if isinstance(atype, ABIIntType) else int(value.scaleb(atype.scale, Context(prec=100)))
+                return unscaled.to_bytes(atype.bit_length // 8, 'big', signed=not atype.unsigned)
+            decimal = Decimal(value) if isinstance(value, int) else value
+            # the wide integers kept as decimal256 can't represent the values with more than 76 digits
+            return decimal if len(decimal.as_tuple().digits) <= arrow_type.precision else None
+        elif isinstance(atype, ABITupleType):
+            return {i.name: self.to_arrow_value(i.ftype, value[i.name]) for i in atype.element_fields}
+        elif isinstance(atype, ABIArrayType) and not isinstance(atype, (ABIBytesType, ABIFunctionType)):
+            return [self.to_arrow_value(atype.element_type, i) for i in value]
+        return value
+
+    def _fields(self, fields: List[ABIField]) -> List[pa.Field]:
+        # the ABI type is kept to tell the binary integers from the bytes
+        return [pa.field(i.name, self.transform(i.ftype), metadata={'abi_type': i.ftype.canonical_type})
+                for i in fields]
+
+
+class ArrowModelDataTypeProvider(ArrowDataTypeProvider):
+    """
+    Map the ABI types to the Arrow types of the columns of the generated Spark models, the same widths as
+    `SparkDataTypeProvider`: the integers are int32, int64 or decimal128(38, 0), the values out of the range of
+    decimal128(38, 0) are null, the bytes are variable binaries and the arrays are variable lists.
+    """
+
+    def __init__(self):
+        super().__init__(wide_int_as_decimal=False)
+
+    def transform_from_int_type(self, atype: ABIIntType) -> pa.DataType:
+        bit_length = signed_bit_length(atype)
+        if bit_length <= 32:
+            return pa.int32()
+        elif bit_length <= 64:
+            return pa.int64()
+        return pa.decimal128(MAX_DECIMAL_PRECISION, 0)
+
+    def transform_from_fixed_type(self, atype: ABIFixedType) -> pa.DataType:
+        precision, scale = fixed_precision_and_scale(atype)
+        return pa.decimal128(precision, scale)
+
+    def transform_from_bytes_type(self, atype: ABIBytesType) -> pa.DataType:
+        return pa.binary()
+
+    def transform_from_function_type(self, atype: ABIFunctionType) -> pa.DataType:
+        return pa.binary()
+
+    def transform_from_array_type(self, atype: ABIArrayType) -> pa.DataType:
+        return pa.list_(self.transform(atype.element_type))
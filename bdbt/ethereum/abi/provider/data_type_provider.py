@@ -1,4 +1,5 @@
-from typing import Generic, TypeVar
+import math
+from typing import Generic, TypeVar, Tuple, Union
 
 from bdbt.ethereum.abi.abi_data_type import (
     ABIIntType,
@@ -15,6 +16,31 @@ from bdbt.ethereum.abi.abi_data_type import (
 
 T = TypeVar('T')
 
+# The max precision of the decimal type in Spark and Hive
+MAX_DECIMAL_PRECISION = 38
+
+
+def signed_bit_length(atype: Union[ABIIntType, ABIFixedType]) -> int:
+    """
+    The bit length to hold the number in a signed type, an unsigned number needs one more bit.
+    """
+    return atype.bit_length + atype.unsigned
+
+
+def max_decimal_digits(atype: ABIIntType) -> int:
+    """
+    The number of the decimal digits of the max absolute value of the integer type.
+    """
+    return len(str(2 ** (atype.bit_length - (not atype.unsigned))))
+
+
+def fixed_precision_and_scale(atype: ABIFixedType) -> Tuple[int, int]:
+    # precision = log10(2^bit_length) + 1
+    # The precision can be up to 38, scale can also be up to 38 (less or equal to precision) in Spark
+    # doc: https://spark.apache.org/docs/latest/api/java/org/apache/spark/sql/types/DecimalType.html
+    precision = min(MAX_DECIMAL_PRECISION, math.floor(signed_bit_length(atype) / math.log2(10)) + 1)
+    return precision, min(precision, atype.scale)
+
 
 class DataTypeProvider(Generic[T]):
 
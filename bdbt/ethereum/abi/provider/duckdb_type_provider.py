@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Union
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIArrayType,
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType
+)
+from bdbt.ethereum.abi.provider.data_type_provider import (
+    DataTypeProvider,
+    signed_bit_length,
+    max_decimal_digits,
+    fixed_precision_and_scale,
+    MAX_DECIMAL_PRECISION
+)
+
+
+class DuckDBTypeStringProvider(DataTypeProvider[str]):
+    """
+    The DuckDB type strings, e.g. `STRUCT("a" INTEGER, "b" VARCHAR[])`. The bytes are the lower case hex strings
+    with the 0x prefix, the same as the addresses, because the raw bytes can't be carried by the JSON of the UDFs.
+    """
+
+    def __init__(self, wide_int_as_string: bool = False):
+        """
+        :param wide_int_as_string: keep the integers which may have more than 38 digits (e.g. uint256) as string
+        """
+        self.wide_int_as_string = wide_int_as_string
+
+    def transform_from_int_type(self, atype: ABIIntType) -> str:
+        bit_length = signed_bit_length(atype)
+
+        if 0 < bit_length <= 32:
+            return 'INTEGER'
+        elif 32 < bit_length <= 64:
+            return 'BIGINT'
+        elif 64 < bit_length <= 128:
+            return 'HUGEINT'
+        elif self.wide_int_as_string and max_decimal_digits(atype) > MAX_DECIMAL_PRECISION:
+            return 'VARCHAR'
+        else:
+            return f'DECIMAL({MAX_DECIMAL_PRECISION}, 0)'
+
+    def transform_from_string_type(self, atype: ABIStringType) -> str:
+        return 'VARCHAR'
+
+    def transform_from_address_type(self, atype: ABIAddressType) -> str:
+        return 'VARCHAR'
+
+    def transform_from_bool_type(self, atype: ABIBoolType) -> str:
+        return 'BOOLEAN'
+
+    def transform_from_fixed_type(self, atype: ABIFixedType) -> str:
+        precision, scale = fixed_precision_and_scale(atype)
+        return f'DECIMAL({precision}, {scale})'
+
+    def transform_from_bytes_type(self, atype: ABIBytesType) -> str:
+        return 'VARCHAR'
+
+    def transform_from_function_type(self, atype: ABIFunctionType) -> str:
+        return 'VARCHAR'
+
+    def transform_from_array_type(self, atype: ABIArrayType) -> str:
+        return f'{self.transform(atype.element_type)}[]'
+
+    def transform_from_tuple_type(self, atype: ABITupleType) -> str:
+        fields = ', '.join(f'{quote_identifier(i.name)} {self.transform(i.ftype)}' for i in atype.element_fields)
+        return f'STRUCT({fields})'
+
+
+class DuckDBJsonStructureProvider(DataTypeProvider[Union[str, List, Dict[str, Any]]]):
+    """
+    The structures of `json_transform` to read the JSON decoded by the UDFs into the same types with
+    DuckDBTypeStringProvider, e.g. `{"a": "INTEGER", "b": ["VARCHAR"]}`.
+    """
+
+    def __init__(self, wide_int_as_string: bool = False):
+        self.type_provider = DuckDBTypeStringProvider(wide_int_as_string=wide_int_as_string)
+
+    def transform_from_int_type(self, atype: ABIIntType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_string_type(self, atype: ABIStringType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_address_type(self, atype: ABIAddressType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_bool_type(self, atype: ABIBoolType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_fixed_type(self, atype: ABIFixedType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_bytes_type(self, atype: ABIBytesType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_function_type(self, atype: ABIFunctionType) -> str:
+        return self.type_provider.transform(atype)
+
+    def transform_from_array_type(self, atype: ABIArrayType) -> List:
+        return [self.transform(atype.element_type)]
+
+    def transform_from_tuple_type(self, atype: ABITupleType) -> Dict[str, Any]:
+        return {i.name: self.transform(i.ftype) for i in atype.element_fields}
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
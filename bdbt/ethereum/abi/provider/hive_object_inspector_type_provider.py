@@ -9,12 +9,38 @@ from bdbt.ethereum.abi.abi_data_type import (
     ABIIntType,
     ABITupleType
 )
-from bdbt.ethereum.abi.provider.data_type_provider import DataTypeProvider
+from bdbt.ethereum.abi.provider.data_type_provider import (
+    DataTypeProvider,
+    signed_bit_length,
+    max_decimal_digits,
+    fixed_precision_and_scale,
+    MAX_DECIMAL_PRECISION
+)
 
 
 class HiveObjectInspectorTypeProvider(DataTypeProvider[str]):
+    """
+    The numbers follow the same rules with SparkDataTypeProvider, the integers which have more than 64 bits
+    are decimal(38, 0), and the values out of the range are null.
+    """
+
+    def __init__(self, wide_int_as_string: bool = False):
+        """
+        :param wide_int_as_string: keep the integers which may have more than 38 digits (e.g. uint256) as string
+        """
+        self.wide_int_as_string = wide_int_as_string
+
     def transform_from_int_type(self, atype: ABIIntType) -> str:
-        return 'PrimitiveObjectInspectorFactory.writableStringObjectInspector'
+        bit_length = signed_bit_length(atype)
+
+        if 0 < bit_length <= 32:
+            return 'PrimitiveObjectInspectorFactory.writableIntObjectInspector'
+        elif 32 < bit_length <= 64:
+            return 'PrimitiveObjectInspectorFactory.writableLongObjectInspector'
+        elif self.wide_int_as_string and max_decimal_digits(atype) > MAX_DECIMAL_PRECISION:
+            return 'PrimitiveObjectInspectorFactory.writableStringObjectInspector'
+        else:
+            return self._decimal_object_inspector(MAX_DECIMAL_PRECISION, 0)
 
     def transform_from_string_type(self, atype: ABIStringType) -> str:
         return 'PrimitiveObjectInspectorFactory.writableStringObjectInspector'
@@ -26,7 +52,8 @@ class HiveObjectInspectorTypeProvider(DataTypeProvider[str]):
         return 'PrimitiveObjectInspectorFactory.writableBooleanObjectInspector'
 
     def transform_from_fixed_type(self, atype: ABIFixedType) -> str:
-        return 'PrimitiveObjectInspectorFactory.writableStringObjectInspector'
+        precision, scale = fixed_precision_and_scale(atype)
+        return self._decimal_object_inspector(precision, scale)
 
     def transform_from_bytes_type(self, atype: ABIBytesType) -> str:
         return 'PrimitiveObjectInspectorFactory.writableBinaryObjectInspector'
@@ -46,3 +73,9 @@ class HiveObjectInspectorTypeProvider(DataTypeProvider[str]):
             ImmutableList.of({field_ois})
         )
         """
+
+    @staticmethod
+    def _decimal_object_inspector(precision: int, scale: int) -> str:
+        # The writableHiveDecimalObjectInspector is decimal(38, 18), so the precision and scale should be specified.
+        return 'PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(' \
+               f'TypeInfoFactory.getDecimalTypeInfo({precision}, {scale}))'
@@ -0,0 +1,68 @@
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIArrayType,
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType
+)
+from bdbt.ethereum.abi.provider.data_type_provider import (
+    DataTypeProvider,
+    signed_bit_length,
+    max_decimal_digits,
+    fixed_precision_and_scale,
+    MAX_DECIMAL_PRECISION
+)
+
+
+class HiveTypeStringProvider(DataTypeProvider[str]):
+    """
+    The Hive type strings (e.g. `struct<a:int,b:array<string>>`) of the same types with
+    HiveObjectInspectorTypeProvider, they are parsed by `TypeInfoUtils.getTypeInfoFromTypeString` in the UDFs.
+    """
+
+    def __init__(self, wide_int_as_string: bool = False):
+        """
+        :param wide_int_as_string: keep the integers which may have more than 38 digits (e.g. uint256) as string
+        """
+        self.wide_int_as_string = wide_int_as_string
+
+    def transform_from_int_type(self, atype: ABIIntType) -> str:
+        bit_length = signed_bit_length(atype)
+
+        if 0 < bit_length <= 32:
+            return 'int'
+        elif 32 < bit_length <= 64:
+            return 'bigint'
+        elif self.wide_int_as_string and max_decimal_digits(atype) > MAX_DECIMAL_PRECISION:
+            return 'string'
+        else:
+            return f'decimal({MAX_DECIMAL_PRECISION},0)'
+
+    def transform_from_string_type(self, atype: ABIStringType) -> str:
+        return 'string'
+
+    def transform_from_address_type(self, atype: ABIAddressType) -> str:
+        return 'string'
+
+    def transform_from_bool_type(self, atype: ABIBoolType) -> str:
+        return 'boolean'
+
+    def transform_from_fixed_type(self, atype: ABIFixedType) -> str:
+        precision, scale = fixed_precision_and_scale(atype)
+        return f'decimal({precision},{scale})'
+
+    def transform_from_bytes_type(self, atype: ABIBytesType) -> str:
+        return 'binary'
+
+    def transform_from_function_type(self, atype: ABIFunctionType) -> str:
+        return 'binary'
+
+    def transform_from_array_type(self, atype: ABIArrayType) -> str:
+        return f'array<{self.transform(atype.element_type)}>'
+
+    def transform_from_tuple_type(self, atype: ABITupleType) -> str:
+        return f'struct<{",".join(f"{i.name}:{self.transform(i.ftype)}" for i in atype.element_fields)}>'
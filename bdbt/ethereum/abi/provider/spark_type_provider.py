@@ -1,4 +1,3 @@
-import math
 from typing import Union
 
 from pyspark.sql.types import (
@@ -25,7 +24,12 @@ from bdbt.ethereum.abi.abi_data_type import (
     ABITupleType,
     ABIArrayType
 )
-from bdbt.ethereum.abi.provider.data_type_provider import DataTypeProvider
+from bdbt.ethereum.abi.provider.data_type_provider import (
+    DataTypeProvider,
+    signed_bit_length,
+    fixed_precision_and_scale,
+    MAX_DECIMAL_PRECISION
+)
 
 
 class SparkDataTypeProvider(DataTypeProvider[DataType]):
@@ -37,19 +41,19 @@ class SparkDataTypeProvider(DataTypeProvider[DataType]):
         return StructType(fields=[StructField(
             name=i.name,
             dataType=self.transform(i.ftype),
-            metadata=i.metadata
+            metadata=dict(i.metadata) if i.metadata is not None else None
         ) for i in atype.element_fields])
 
     def transform_from_int_type(self, atype: ABIIntType) -> Union[IntegerType, LongType, DecimalType]:
-        signed_bit_length = atype.bit_length + atype.unsigned
+        bit_length = signed_bit_length(atype)
 
         # Ignore ByteType(8bit) and ShortType(16bit) for match the type in the headlong.
-        if 0 < signed_bit_length <= 32:
+        if 0 < bit_length <= 32:
             return IntegerType()
-        elif 32 < signed_bit_length <= 64:
+        elif 32 < bit_length <= 64:
             return LongType()
-        elif 64 < signed_bit_length:
-            return DecimalType(38, 0)
+        elif 64 < bit_length:
+            return DecimalType(MAX_DECIMAL_PRECISION, 0)
 
     def transform_from_string_type(self, atype: ABIStringType) -> StringType:
         return StringType()
@@ -61,13 +65,8 @@ class SparkDataTypeProvider(DataTypeProvider[DataType]):
         return BooleanType()
 
     def transform_from_fixed_type(self, atype: ABIFixedType) -> DecimalType:
-        signed_bit_length = atype.bit_length + atype.unsigned
-        # precision = log10(2^bit_length) + 1
-        # The precision can be up to 38, scale can also be up to 38 (less or equal to precision) in Spark
-        # doc: https://spark.apache.org/docs/latest/api/java/org/apache/spark/sql/types/DecimalType.html
-        precision = min(38, math.floor(signed_bit_length / math.log2(10)) + 1)
-        return DecimalType(precision=min(38, math.floor(signed_bit_length / math.log2(10)) + 1),
-                           scale=min(precision, atype.scale))
+        precision, scale = fixed_precision_and_scale(atype)
+        return DecimalType(precision=precision, scale=scale)
 
     def transform_from_bytes_type(self, atype: ABIBytesType) -> BinaryType:
         return BinaryType()
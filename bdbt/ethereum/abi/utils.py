@@ -1,6 +1,8 @@
 import json
 from typing import List
 
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABICallSchema
+from bdbt.ethereum.abi.abi_index import ABIIndex, element_signature, signature_selector
 from bdbt.ethereum.abi.abi_type import ABI, ABIElement
 
 
@@ -11,14 +13,28 @@ def normalize_abi(abi_json: str) -> ABI:
     return ABI.from_dicts(json.loads(abi_json))
 
 
+# The filters index the whole ABI for one lookup, build an :class:`ABIIndex` once for the repeated lookups.
 def filter_by_type(type_str: str, contract_abi: ABI) -> List[ABIElement]:
-    return [abi for abi in contract_abi.elements if abi.type == type_str]
+    return ABIIndex(contract_abi).by_type(type_str)
 
 
 def filter_by_name(name: str, contract_abi: ABI) -> List[ABIElement]:
-    return [abi for abi in contract_abi.elements
-            if (abi.type not in ('fallback', 'constructor', 'receive') and abi.name == name)]
+    return ABIIndex(contract_abi).by_name(name)
 
 
 def filter_by_type_and_name(name: str, type_str: str, contract_abi: ABI) -> List[ABIElement]:
-    return [abi for abi in contract_abi.elements if abi.type == type_str and abi.name == name]
+    return ABIIndex(contract_abi).by_type_and_name(type_str, name)
+
+
+def event_selector(event: ABIEventSchema) -> str:
+    """
+    The topic of the event, the one hashed by the transformer is reused.
+    """
+    return event.selector or signature_selector(element_signature(event.raw_schema), event=True)
+
+
+def call_selector(call: ABICallSchema) -> str:
+    """
+    The 4 bytes selector of the call, the one hashed by the transformer is reused.
+    """
+    return call.selector or signature_selector(element_signature(call.raw_schema), event=False)
@@ -0,0 +1,94 @@
+import json
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional, Iterable, Tuple
+
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest
+from bdbt.global_type import SizeClass
+from bdbt.utils import get_partitions
+
+# The number of days in a batch, the larger contracts have more data every day.
+default_batch_days: Dict[SizeClass, int] = {
+    SizeClass.SMALL: 180,
+    SizeClass.MEDIUM: 30,
+    SizeClass.LARGE: 7,
+}
+
+
+@dataclass(frozen=True)
+class BackfillBatch:
+    models: Tuple[str, ...]
+    dt_start: date
+    dt_end: date
+
+    @property
+    def dbt_vars(self) -> Dict[str, str]:
+        return {'dt_start': self.dt_start.isoformat(), 'dt_end': self.dt_end.isoformat()}
+
+    @property
+    def dbt_command(self) -> str:
+        return f"dbt run --select {' '.join(self.models)} --vars '{json.dumps(self.dbt_vars)}'"
+
+
+class BackfillPlanner:
+    """
+    Split the backfill of the incremental models into batches, every batch is one dbt invocation
+    overwriting the dt partitions between dt_start and dt_end (both inclusive).
+    The table models are rebuilt by a normal run, and the views have nothing to backfill, so they are skipped.
+    """
+
+    def __init__(
+            self,
+            batch_days: Optional[Mapping[SizeClass, int]] = None,
+            max_models_per_batch: int = 50
+    ):
+        self.batch_days = {**default_batch_days, **(batch_days or {})}
+        self.max_models_per_batch = max_models_per_batch
+
+        if any(i <= 0 for i in self.batch_days.values()) or max_models_per_batch <= 0:
+            raise ValueError('the batch days and the max models per batch should be more than 0.')
+
+    def plan(
+            self,
+            manifest: CodegenManifest,
+            dt_start: date,
+            dt_end: date,
+            models: Optional[Iterable[str]] = None
+    ) -> List[BackfillBatch]:
+        """
+        :param models: the models need to be backfilled, all models in the manifest by default
+        """
+        if dt_start > dt_end:
+            raise ValueError(f'dt_start {dt_start} should not be after dt_end {dt_end}.')
+
+        model_names = sorted(models) if models is not None else sorted(manifest.models.keys())
+        missing_models = [i for i in model_names if i not in manifest.models]
+        if missing_models:
+            raise ValueError(f'{missing_models} can not be found in the codegen manifest.')
+
+        size_class_to_models: Dict[SizeClass, List[str]] = {}
+        for name in model_names:
+            model = manifest.models[name]
+            if model.materialize != 'increment':
+                continue
+            size_class_to_models.setdefault(model.size_class or SizeClass.MEDIUM, []).append(name)
+
+        batches = []
+        for size_class in SizeClass:
+            if size_class not in size_class_to_models:
+                continue
+            for batch_start, batch_end in self._dt_ranges(dt_start, dt_end, self.batch_days[size_class]):
+                for partition in get_partitions(size_class_to_models[size_class], self.max_models_per_batch):
+                    batches.append(BackfillBatch(models=tuple(partition), dt_start=batch_start, dt_end=batch_end))
+
+        return batches
+
+    @staticmethod
+    def _dt_ranges(dt_start: date, dt_end: date, days: int) -> List[Tuple[date, date]]:
+        ranges = []
+        batch_start = dt_start
+        while batch_start <= dt_end:
+            batch_end = min(batch_start + timedelta(days=days - 1), dt_end)
+            ranges.append((batch_start, batch_end))
+            batch_start = batch_end + timedelta(days=1)
+        return ranges
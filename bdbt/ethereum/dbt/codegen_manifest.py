@@ -0,0 +1,129 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Mapping
+
+from mashumaro import DataClassDictMixin
+
+from bdbt.global_type import SizeClass
+
+# The parts of the models which only change how the tables are written, not the decoded data, e.g. the session confs
+# tuned by the stats of the previous runs, they are left out of the checksums to not backfill the models for them.
+_physical_config_pattern = re.compile(r'^[ \t]*(options|pre_hook|post_hook)=.*,[ \t]*\n', re.MULTILINE)
+_optimizer_hint_pattern = re.compile(r'/\*\+.*?\*/ ?')
+_sort_by_pattern = re.compile(r'^sort by .*(\n|$)', re.MULTILINE)
+
+
+def model_output_content(content: str) -> str:
+    """
+    The content of a generated model without the physical configs, the partition hints and the sort by.
+    """
+    content = _physical_config_pattern.sub('', content)
+    content = _optimizer_hint_pattern.sub('', content)
+    return _sort_by_pattern.sub('', content)
+
+
+@dataclass
+class CodegenModelVersion(DataClassDictMixin):
+    # the checksum of the ABI of the event or the call
+    checksum: str
+    # the ABI of the event or the call, the model of this version is generated from it after the ABI is changed
+    abi: Dict[str, Any]
+    # the first dt decoded by this version, the first version has no start
+    dt_start: Optional[str] = None
+
+
+@dataclass
+class CodegenModel(DataClassDictMixin):
+    checksum: str
+    # table / increment / view, it's unknown for the models generated before the manifest
+    materialize: Optional[str] = None
+    size_class: Optional[SizeClass] = None
+    # the ABI versions of the models of the versioned contracts
+    versions: Optional[List[CodegenModelVersion]] = None
+
+
+@dataclass
+class CodegenManifest(DataClassDictMixin):
+    """
+    The checksum and the hints of every generated model,
+    it's kept in the codegen folder to compare with the next generation and to plan the backfill.
+    """
+    models: Dict[str, CodegenModel] = field(default_factory=dict)
+
+    @classmethod
+    def from_dir(cls, codegen_dir: str, fingerprint: str = '') -> 'CodegenManifest':
+        """
+        The checksums only cover the parts of the models that change the decoded data, see `model_output_content`.
+
+        :param fingerprint: the codegen options which change the decoded data without changing the model sql
+        """
+        models = {}
+        for filepath in sorted(glob.glob(os.path.join(codegen_dir, '**', '*.sql'), recursive=True)):
+            with open(filepath, 'r') as f:
+                digest = hashlib.sha256(fingerprint.encode('utf-8'))
+                digest.update(model_output_content(f.read()).encode('utf-8'))
+            models[os.path.splitext(os.path.basename(filepath))[0]] = CodegenModel(checksum=digest.hexdigest())
+        return cls(models=models)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'CodegenManifest':
+        with open(filepath, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def dump(self, filepath: str) -> None:
+        with open(filepath, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+
+@dataclass
+class CodegenChanges(DataClassDictMixin):
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @classmethod
+    def compare(
+            cls,
+            previous: Optional[CodegenManifest],
+            current: CodegenManifest,
+            renamed: Optional[Mapping[str, str]] = None
+    ) -> 'CodegenChanges':
+        """
+        All models are added if there is no previous generation.
+
+        :param renamed: model name -> previous model name, the renamed models keep the table of the previous models,
+            e.g. the first version of a versioned model, so they are unchanged if the previous models exist
+        """
+        previous_checksums = {i: j.checksum for i, j in previous.models.items()} if previous is not None else {}
+        current_checksums = {i: j.checksum for i, j in current.models.items()}
+        kept = {i for i, j in (renamed or {}).items()
+                if i in current_checksums and i not in previous_checksums and j in previous_checksums}
+        return cls(
+            added=sorted(i for i in current_checksums if i not in previous_checksums and i not in kept),
+            changed=sorted(i for i, checksum in current_checksums.items()
+                           if i in previous_checksums and previous_checksums[i] != checksum),
+            removed=sorted(i for i in previous_checksums if i not in current_checksums),
+            unchanged=sorted([i for i, checksum in current_checksums.items() if previous_checksums.get(i) == checksum] +
+                             list(kept))
+        )
+
+    @property
+    def selectors(self) -> Dict[str, str]:
+        """
+        The expressions for `dbt run --select`, the removed models can't be selected.
+        """
+        return {
+            'added': ' '.join(self.added),
+            'changed': ' '.join(self.changed),
+            'added_or_changed': ' '.join(sorted(self.added + self.changed)),
+            'unchanged': ' '.join(self.unchanged)
+        }
+
+    def dump(self, filepath: str) -> None:
+        with open(filepath, 'w') as f:
+            json.dump({**self.to_dict(), 'select': self.selectors}, f, indent=2)
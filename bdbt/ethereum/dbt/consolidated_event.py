@@ -0,0 +1,55 @@
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional, Tuple
+
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema
+from bdbt.global_type import SizeClass
+
+# The columns of the consolidated model besides the base columns of the events.
+consolidated_event_columns = ['contract_name', 'event_name', 'payload']
+
+# The consolidated model is incremental, every dt of it is written into a few files for all members.
+consolidated_event_materialize = 'increment'
+
+# The alias of the consolidated model in the schema of the project.
+consolidated_model_alias = 'evt_consolidated'
+
+
+def consolidated_model_name(project_name: str) -> str:
+    return f'{project_name}_{consolidated_model_alias}'
+
+
+@dataclass(frozen=True)
+class ConsolidatedEventMember:
+    contract_name: str
+    # If the address is null, the event of all contracts is decoded, the same as the model of the contract.
+    address: Optional[str]
+    event: ABIEventSchema
+    size_class: SizeClass
+
+
+@dataclass(frozen=True)
+class ConsolidatedEvents:
+    """
+    The rarely emitted events of a project, they are decoded into one model with the contract name, the event name
+    and the fields as a json payload, instead of one small table per event, and the model of every member event
+    is a view over it.
+    """
+    project_name: str
+    members: Tuple[ConsolidatedEventMember, ...]
+    # (contract_name, event_name) of the members, every event of the project is looked up in it
+    _member_names: FrozenSet[Tuple[str, str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_member_names', frozenset((i.contract_name, i.event.name) for i in self.members))
+
+    @property
+    def model_name(self) -> str:
+        return consolidated_model_name(self.project_name)
+
+    @property
+    def size_class(self) -> SizeClass:
+        size_classes = list(SizeClass)
+        return max((i.size_class for i in self.members), key=size_classes.index)
+
+    def contains(self, contract_name: str, event_name: str) -> bool:
+        return (contract_name, event_name) in self._member_names
@@ -1,18 +1,58 @@
 import logging
 import os.path
 import pathlib
-from typing import Dict, Optional
+import re
+import textwrap
+from dataclasses import dataclass
+from typing import Dict, Optional, List, Mapping
 
 from bdbt.ethereum.abi.abi_data_type import ABISchema, ABIEventSchema, ABICallSchema
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEvents
+from bdbt.ethereum.dbt.model_version import ModelVersion, ABIModelSchema
+from bdbt.ethereum.dbt.shared_event import SharedEvent
 from bdbt.global_type import Contract
 
 
+# The dt filter of the incremental models, the backfill passes a dt range, the daily run passes one dt.
+increment_dt_filter_sql = """{% if var('dt_start', none) is not none %}
+  and dt >= '{{ var("dt_start") }}' and dt <= '{{ var("dt_end") }}'
+{% elif is_incremental() %}
+  and dt = '{{ var("dt") }}'
+{% endif %}"""
+
+# The table models are rebuilt in full, a dt range selected by the backfill would drop the rest of their history.
+table_dt_filter_sql = """{% if is_incremental() %}
+  and dt = '{{ var("dt") }}'
+{% endif %}"""
+
+
+@dataclass(frozen=True)
+class UDFDescriptor:
+    """
+    The minimal information to register a generated UDF.
+    """
+    project_name: str
+    model_name: str
+    class_name: str
+
+
 class DbtCodeGenerator:
+    # whether the consolidated event models are implemented, the events are decoded by their own models otherwise
+    support_consolidated_events = False
 
     def __init__(self, need_udf: bool):
         self.need_udf = need_udf
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    @staticmethod
+    def _replace_dt_filter(content: str, materialize: str) -> str:
+        """
+        Replace the {{MODEL_DT_FILTER}} placeholder by the dt filter of the materialization, keeping its indent.
+        """
+        dt_filter = increment_dt_filter_sql if materialize == 'increment' else table_dt_filter_sql
+        return re.sub(r'^([ ]*){{MODEL_DT_FILTER}}',
+                      lambda m: textwrap.indent(dt_filter, m.group(1)), content, flags=re.MULTILINE)
+
     @staticmethod
     def create_file_and_write(filepath: str, content: str):
         if os.path.exists(filepath):
@@ -28,18 +68,41 @@ class DbtCodeGenerator:
             contract: Contract,
             version: str,
             abi: ABISchema,
+            shared_events: Optional[Mapping[str, SharedEvent]] = None,
+            model_versions: Optional[Mapping[str, List[ModelVersion]]] = None,
+            consolidated_events: Optional[ConsolidatedEvents] = None
     ):
         """
         Generate some dbt model sql files and schema yaml file,
         one model sql file for one event or call.
+
+        :param shared_events: event_name -> shared_event, the models of these events are views over the shared models
+        :param model_versions: model_name -> versions, the ABIs of these models are changed, one model is generated
+            for every version and the model itself is a view over the versions
+        :param consolidated_events: the consolidated events of the project, the models of the events of this contract
+            in it are views over the consolidated model
         """
         project_path = os.path.join(workspace, project_name)
         pathlib.Path(project_path).mkdir(parents=True, exist_ok=True)
+        shared_events = shared_events or {}
+        model_versions = model_versions or {}
 
         for event in abi.events:
-            self.gen_event_dbt_model(project_path, contract, version, event)
+            model_name = self.evt_model_name(contract.name, event, project_name)
+            if event.name in shared_events:
+                self.gen_shared_event_view_dbt_model(project_path, contract, version, event, shared_events[event.name])
+            elif model_name in model_versions:
+                self.gen_versioned_dbt_models(project_path, contract, version, event, model_versions[model_name])
+            elif consolidated_events is not None and consolidated_events.contains(contract.name, event.name):
+                self.gen_consolidated_event_view_dbt_model(project_path, contract, version, event, consolidated_events)
+            else:
+                self.gen_event_dbt_model(project_path, contract, version, event)
         for call in abi.calls:
-            self.gen_call_dbt_model(project_path, contract, version, call)
+            model_name = self.call_model_name(contract.name, call, project_name)
+            if model_name in model_versions:
+                self.gen_versioned_dbt_models(project_path, contract, version, call, model_versions[model_name])
+            else:
+                self.gen_call_dbt_model(project_path, contract, version, call)
 
     def gen_udf_for_dbt(
             self,
@@ -55,7 +118,8 @@ class DbtCodeGenerator:
         required, such as Spark, which can generate jar packages via this function to enable the use of more complex
         functions in SQL.
         Notes: the best use of this function is to collect all the contract information and call it once to generate all
-        the UDFs.
+        the UDFs, the generator of the large registries should call `gen_udfs_for_project` for every project instead,
+        so the ABIs of all projects don't need to be kept in memory.
 
         :param dbt_dir: the absolute path of the dbt project folder
         :param abi_map: project_name -> (contract_name -> abi_schema)
@@ -63,16 +127,37 @@ class DbtCodeGenerator:
         """
         udf_workspace = self.prepare_udf_workspace(dbt_dir)
 
-        # the empty events and empty calls don't need UDF to decode data
+        udfs: List[UDFDescriptor] = []
         for proj_name, contract_name_to_abi in abi_map.items():
-            for contract_name, abi in contract_name_to_abi.items():
-                for event in abi.nonempty_events:
-                    self.gen_event_udf(udf_workspace, proj_name, contract_name, event)
-                for call in abi.nonempty_calls:
-                    self.gen_call_udf(udf_workspace, proj_name, contract_name, call)
+            udfs.extend(self.gen_udfs_for_project(dbt_dir, udf_workspace, proj_name, contract_name_to_abi))
 
+        self.gen_udf_registration(dbt_dir, udfs, version)
         self.build_udf(dbt_dir, version)
 
+    def gen_udfs_for_project(
+            self,
+            dbt_dir: str,
+            udf_workspace: str,
+            project_name: str,
+            contract_name_to_abi: Dict[str, ABISchema]
+    ) -> List[UDFDescriptor]:
+        """
+        Generate the UDFs of a project into the workspace prepared by `prepare_udf_workspace`.
+
+        :return: the descriptors of the UDFs, they are used to register the UDFs after all projects are generated
+        """
+        proj_udf_workspace = self.project_udf_workspace(dbt_dir, udf_workspace, project_name)
+        pathlib.Path(proj_udf_workspace).mkdir(parents=True, exist_ok=True)
+
+        # the empty events and empty calls don't need UDF to decode data
+        udfs = []
+        for contract_name, abi in contract_name_to_abi.items():
+            for event in abi.nonempty_events:
+                udfs.append(self.gen_event_udf(proj_udf_workspace, project_name, contract_name, event))
+            for call in abi.nonempty_calls:
+                udfs.append(self.gen_call_udf(proj_udf_workspace, project_name, contract_name, call))
+        return udfs
+
     def gen_event_dbt_model(
             self,
             project_path: str,
@@ -91,21 +176,123 @@ class DbtCodeGenerator:
     ):
         raise NotImplementedError()
 
+    def gen_shared_event_dbt_model(
+            self,
+            project_path: str,
+            version: str,
+            shared_event: SharedEvent
+    ):
+        """
+        Generate the model decoding the event of all member contracts in one scan.
+        """
+        raise NotImplementedError()
+
+    def gen_shared_event_view_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema,
+            shared_event: SharedEvent
+    ):
+        """
+        Generate the model of the event for one member contract, it's a view over the shared model.
+        """
+        raise NotImplementedError()
+
+    def gen_consolidated_event_dbt_model(
+            self,
+            project_path: str,
+            version: str,
+            consolidated_events: ConsolidatedEvents
+    ):
+        """
+        Generate the model decoding the consolidated events of the project in one scan.
+        """
+        raise NotImplementedError()
+
+    def gen_consolidated_event_view_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema,
+            consolidated_events: ConsolidatedEvents
+    ):
+        """
+        Generate the model of the consolidated event, it's a view over the consolidated model.
+        """
+        raise NotImplementedError()
+
+    def gen_versioned_dbt_models(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            schema: ABIModelSchema,
+            versions: List[ModelVersion]
+    ):
+        """
+        Generate one model for every version of the event or the call, and the model of the event or the call
+        as a view over the versions.
+
+        The first version keeps the alias of the model, so its table is not decoded again, and the view is
+        `<alias>_all`. The queries reading the table by its alias instead of `ref()` only get the data before
+        the cutover, they need to read `<alias>_all`.
+        """
+        raise NotImplementedError()
+
     def gen_event_udf(
             self, udf_workspace: str, project_name, contract_name: str, event: ABIEventSchema
-    ) -> None:
+    ) -> UDFDescriptor:
         raise NotImplementedError()
 
     def gen_call_udf(
             self, udf_workspace: str, project_name, contract_name: str, call: ABICallSchema
+    ) -> UDFDescriptor:
+        raise NotImplementedError()
+
+    def gen_udf_registration(
+            self,
+            dbt_dir: str,
+            udfs: List[UDFDescriptor],
+            version: str
     ) -> None:
+        """
+        Generate the macro to register all UDFs once in the on-run-start hook, see `on_run_start_hooks`.
+
+        :param dbt_dir: the absolute path of the dbt project folder
+        :param udfs: the UDFs generated by `gen_udfs_for_project`
+        :param version: the version of the dbt project
+        """
         raise NotImplementedError()
 
+    def on_run_start_hooks(self) -> List[str]:
+        """
+        The hooks should be added into the on-run-start of dbt_project.yml.
+        """
+        return []
+
+    def output_fingerprint(self) -> str:
+        """
+        The options which change the decoded data without changing the model sql, e.g. the data types of the UDFs,
+        the models are regarded as changed when it's changed.
+        """
+        return ''
+
     def prepare_udf_workspace(
             self, dbt_dir: str
     ) -> str:
         raise NotImplementedError()
 
+    def project_udf_workspace(
+            self, dbt_dir: str, udf_workspace: str, project_name: str
+    ) -> str:
+        """
+        The folder to put the UDFs of the project, all projects share the UDF workspace by default.
+        """
+        return udf_workspace
+
     def build_udf(
             self, dbt_dir: str, version: str
     ) -> None:
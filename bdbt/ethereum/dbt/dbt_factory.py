@@ -1,4 +1,7 @@
+from typing import Any
+
 from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator
+from bdbt.ethereum.dbt.duckdb.duckdb_dbt_code_generator import DuckDBDbtCodeGenerator
 from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator
 from bdbt.global_type import Database
 
@@ -6,8 +9,13 @@ from bdbt.global_type import Database
 class DbtFactory:
 
     @staticmethod
-    def new_code_generator(database: Database, remote_workspace: str) -> DbtCodeGenerator:
+    def new_code_generator(database: Database, remote_workspace: str, **options: Any) -> DbtCodeGenerator:
+        """
+        :param options: the options of the code generator for the database, like the jar layout of Spark.
+        """
         if database == Database.SPARK:
-            return SparkDbtCodeGenerator(remote_workspace)
+            return SparkDbtCodeGenerator(remote_workspace, **options)
+        elif database == Database.DUCKDB:
+            return DuckDBDbtCodeGenerator(remote_workspace, **options)
         else:
             raise ValueError(f'{database} is not be supported now.')
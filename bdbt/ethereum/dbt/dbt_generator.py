@@ -1,22 +1,30 @@
+import dataclasses
 import functools
 import glob
 import json
 import logging
 import os
+import pathlib
 import shutil
+from datetime import date
 from os import listdir
-from typing import Dict, List
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Mapping
 
-import pyaml
 import ruamel.yaml
 import yaml
 
-from bdbt.ethereum.abi.abi_data_type import ABISchema
+from bdbt.ethereum.abi.abi_data_type import ABISchema, ABIEventSchema, ABICallSchema
 from bdbt.ethereum.abi.abi_transformer import ABITransformer
-from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator as CG
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest, CodegenChanges, CodegenModelVersion
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEvents, ConsolidatedEventMember, \
+    consolidated_event_columns, consolidated_event_materialize
+from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator as CG, UDFDescriptor
 from bdbt.ethereum.dbt.dbt_factory import DbtFactory
-from bdbt.ethereum.dbt.dbt_schema_generator import DbtSchemaGenerator
-from bdbt.global_type import Database, DbtTable, DbtColumn, DbtModelSchema, Contract
+from bdbt.ethereum.dbt.dbt_schema_generator import DbtSchemaGenerator, DbtSchemaWriter
+from bdbt.ethereum.dbt.model_version import ModelVersion, ModelVersioner, ABIModelSchema, union_fields
+from bdbt.ethereum.dbt.shared_event import SharedEvent, find_shared_events, shared_project_name
+from bdbt.global_type import Database, DbtTable, DbtColumn, Contract, SizeClass
+from bdbt.profiler import PhaseProfiler
 
 evt_base_column = [
     'evt_block_number',
@@ -39,89 +47,358 @@ call_base_column = [
 
 
 class DbtGenerator:
-    def __init__(self, database: Database, dbt_dir: str, remote_dir_url: str):
+    def __init__(
+            self,
+            database: Database,
+            dbt_dir: str,
+            remote_dir_url: str,
+            codegen_options: Optional[Dict[str, Any]] = None,
+            shared_event_min_contracts: int = 0,
+            profiler: Optional[PhaseProfiler] = None,
+            version_cutover_dt: Optional[str] = None,
+            consolidated_event_max_daily_bytes: int = 0,
+            model_daily_bytes: Optional[Mapping[str, int]] = None
+    ):
+        """
+        :param shared_event_min_contracts: the events with the same signature emitted by at least this number of
+            contracts are decoded by one shared model, and the models of the contracts are views over it,
+            0 disables it.
+        :param profiler: record the time and the memory of every phase, nothing is recorded by default
+        :param version_cutover_dt: the first dt decoded by the new versions of the changed models of the versioned
+            contracts, today by default
+        :param consolidated_event_max_daily_bytes: the events whose models scan at most this number of bytes for one
+            dt in `model_daily_bytes` are decoded into the consolidated model of the project besides the events
+            hinted by `consolidated_events` of the contracts, 0 disables it.
+        :param model_daily_bytes: model_name -> the bytes of the source data scanned for one dt
+        """
         self._dbt_dir = dbt_dir
         self._remote_dir_url = remote_dir_url
-        self._codegen = DbtFactory.new_code_generator(database, remote_dir_url)
+        self._shared_event_min_contracts = shared_event_min_contracts
+        self._version_cutover_dt = version_cutover_dt or date.today().isoformat()
+        self._consolidated_event_max_daily_bytes = consolidated_event_max_daily_bytes
+        self._model_daily_bytes = model_daily_bytes or {}
+        self._codegen = DbtFactory.new_code_generator(database, remote_dir_url, **(codegen_options or {}))
         self._schemagen = DbtSchemaGenerator()
         self._transformer = ABITransformer()
+        self._profiler = profiler or PhaseProfiler(enabled=False)
         self._logger = logging.getLogger(self.__class__.__name__)
+        # model_name -> (materialize, size_class), they are kept in the manifest to plan the backfill
+        self.model_hints: Dict[str, Tuple[str, SizeClass]] = {}
+        # model_name -> ABI versions of the models of the versioned contracts
+        self.model_versions: Dict[str, List[CodegenModelVersion]] = {}
+        # model_name -> previous model_name, the first versions keep the tables of the models before the versioning
+        self.renamed_models: Dict[str, str] = {}
 
     def gen_all(self):
+        with self._profiler.phase('load_previous_manifest'):
+            previous_manifest = self._load_previous_manifest()
+
         # Remove the old codegen folder and recreate it
         if os.path.exists(self.codegen_dir):
             shutil.rmtree(self.codegen_dir)
         os.mkdir(self.codegen_dir)
         self._logger.info('recreate codegen folder.')
 
-        self._gen_models_and_schema()
-        self._gen_udf()
-        self._replenish_project_yml()
-
-    def _gen_models_and_schema(self):
+        udf_workspace = None
+        if self._codegen.need_udf:
+            with self._profiler.phase('prepare_udf_workspace'):
+                udf_workspace = self._codegen.prepare_udf_workspace(self._dbt_dir)
+
+        udfs = self._gen_models_and_schema(udf_workspace, previous_manifest)
+        self._gen_udf(udfs)
+        with self._profiler.phase('replenish_project_yml'):
+            self._replenish_project_yml()
+        with self._profiler.phase('gen_manifest_and_changes'):
+            self._gen_manifest_and_changes(previous_manifest)
+
+    def _load_previous_manifest(self) -> Optional[CodegenManifest]:
+        if os.path.exists(self.codegen_manifest_path):
+            return CodegenManifest.load(self.codegen_manifest_path)
+        # the generation before the manifest is introduced, it's assumed to have the same codegen options
+        if os.path.exists(self.codegen_dir):
+            return CodegenManifest.from_dir(self.codegen_dir, self._codegen.output_fingerprint())
+        return None
+
+    def _gen_manifest_and_changes(self, previous_manifest: Optional[CodegenManifest]) -> None:
+        manifest = CodegenManifest.from_dir(self.codegen_dir, self._codegen.output_fingerprint())
+        for model_name, (materialize, size_class) in self.model_hints.items():
+            if model_name in manifest.models:
+                manifest.models[model_name].materialize = materialize
+                manifest.models[model_name].size_class = size_class
+        for model_name, versions in self.model_versions.items():
+            if model_name in manifest.models:
+                manifest.models[model_name].versions = versions
+        manifest.dump(self.codegen_manifest_path)
+
+        changes = CodegenChanges.compare(previous_manifest, manifest, self.renamed_models)
+        changes.dump(self.codegen_changes_path)
+
+        self._logger.info(f'compare with the previous generation: {len(changes.added)} added, '
+                          f'{len(changes.changed)} changed, {len(changes.removed)} removed, '
+                          f'{len(changes.unchanged)} unchanged.')
+
+    def _gen_models_and_schema(
+            self,
+            udf_workspace: Optional[str] = None,
+            previous_manifest: Optional[CodegenManifest] = None
+    ) -> List[UDFDescriptor]:
+        """
+        Generate the models, the schema and the UDFs project by project, only the contracts of one project are kept
+        in memory, the UDFs are generated only if the udf workspace is given.
+
+        :param previous_manifest: the ABI versions of the models of the versioned contracts are compared with it
+        :return: the descriptors of the generated UDFs
+        """
+        udfs: List[UDFDescriptor] = []
         models_count_map: Dict[str, int] = {}
-
-        for project, contracts in self.contracts_map.items():
-            # Generate models
-            for contract in contracts:
-                self._codegen.gen_models_for_project(
-                    workspace=self.codegen_dir,
-                    project_name=project,
-                    contract=contract,
-                    version=self.version,
-                    abi=self._transformer.transform_abi(contract.abi)
-                )
-
-            # Generate schema
-            models: List[DbtTable] = []
-            for contract in contracts:
-                abi = self._transformer.transform_abi(contract.abi)
-                for event in abi.events:
-                    columns = [DbtColumn(name=i.name) for i in event.inputs]
-                    columns.extend(DbtColumn(name=i) for i in evt_base_column)
-                    models.append(DbtTable(name=CG.evt_model_name(contract.name, event, project),
-                                           columns=columns))
-
-                for call in abi.calls:
-                    columns = [DbtColumn(name=i.name) for i in call.inputs]
-                    columns.extend([DbtColumn(name=i.name) for i in call.outputs])
-                    columns.extend(DbtColumn(name=i) for i in call_base_column)
-                    models.append(DbtTable(name=CG.call_model_name(contract.name, call, project),
-                                           columns=columns))
-
-            schema = DbtModelSchema(models=models)
-            schema_path = os.path.join(self.codegen_dir, project, 'schema.yml')
-            with open(schema_path, 'w') as f:
-                # https://docs.getdbt.com/faqs/why-version-2
-                f.write('version: 2\n')
-                f.write(pyaml.dump(schema.to_dict(), sort_dicts=False))
-
-            models_count_map[project] = len(models)
+        versioner = ModelVersioner(previous_manifest, self._version_cutover_dt, self._transformer)
+
+        with self._profiler.phase('find_shared_events'):
+            shared_event_map = self.shared_event_map
+
+        for project in self.project_names:
+            with self._profiler.phase('load_contracts', project=project):
+                contracts = self._load_contracts(project)
+            with self._profiler.phase('transform_abi', project=project):
+                contract_abis = [(i, self._transform_abi(i)) for i in contracts]
+
+            consolidated_events = self._consolidated_events(project, contract_abis)
+
+            # contract_name -> the events and the calls decoded by the UDFs of the project
+            udf_abis: Dict[str, ABISchema] = {}
+
+            project_path = os.path.join(self.codegen_dir, project)
+            pathlib.Path(project_path).mkdir(parents=True, exist_ok=True)
+            with self._profiler.phase('gen_models', project=project), \
+                    DbtSchemaWriter(os.path.join(project_path, 'schema.yml')) as schema_writer:
+                for contract, abi in contract_abis:
+                    shared_events = {
+                        i.name: shared_event_map[(project, contract.name, i.name)]
+                        for i in abi.events if (project, contract.name, i.name) in shared_event_map
+                    }
+                    model_versions = self._model_versions(project, contract, abi, shared_events, versioner)
+                    self._codegen.gen_models_for_project(
+                        workspace=self.codegen_dir,
+                        project_name=project,
+                        contract=contract,
+                        version=self.version,
+                        abi=abi,
+                        shared_events=shared_events,
+                        model_versions=model_versions,
+                        consolidated_events=consolidated_events
+                    )
+
+                    for event in abi.events:
+                        model = self._evt_dbt_table(contract.name, event, project)
+                        if model.name in model_versions:
+                            self._write_versioned_dbt_tables(
+                                schema_writer, project, contract, event, model_versions[model.name])
+                            continue
+                        schema_writer.write(model)
+                        is_view = event.name in shared_events or (
+                            consolidated_events is not None and consolidated_events.contains(contract.name, event.name))
+                        self.model_hints[model.name] = (
+                            'view' if is_view else contract.materialize, contract.size_class)
+
+                    for call in abi.calls:
+                        model = self._call_dbt_table(contract.name, call, project)
+                        if model.name in model_versions:
+                            self._write_versioned_dbt_tables(
+                                schema_writer, project, contract, call, model_versions[model.name])
+                            continue
+                        schema_writer.write(model)
+                        self.model_hints[model.name] = (contract.materialize, contract.size_class)
+
+                    # The shared events are decoded by the UDFs of the shared models only,
+                    # and every version of the versioned models has its own UDF.
+                    udf_abis[contract.name] = ABISchema(
+                        events=[j for i in abi.events if i.name not in shared_events
+                                for j in self._versioned_schemas(contract.name, i, project, model_versions)],
+                        calls=[j for i in abi.calls
+                               for j in self._versioned_schemas(contract.name, i, project, model_versions)]
+                    )
+
+                if consolidated_events is not None:
+                    self._codegen.gen_consolidated_event_dbt_model(project_path, self.version, consolidated_events)
+                    columns = [DbtColumn(name=i) for i in evt_base_column + consolidated_event_columns]
+                    schema_writer.write(DbtTable(name=consolidated_events.model_name, columns=columns))
+                    self.model_hints[consolidated_events.model_name] = (
+                        consolidated_event_materialize, consolidated_events.size_class)
+
+            models_count_map[project] = schema_writer.models_count
+
+            if udf_workspace is not None:
+                with self._profiler.phase('gen_udfs', project=project):
+                    project_udfs = self._codegen.gen_udfs_for_project(self._dbt_dir, udf_workspace, project, udf_abis)
+                udfs.extend(self._consolidated_udfs(project, project_udfs, consolidated_events))
+
+        if self.shared_events:
+            with self._profiler.phase('gen_shared_models', project=shared_project_name):
+                udfs.extend(self._gen_shared_models_and_schema(udf_workspace))
+            models_count_map[shared_project_name] = len(self.shared_events)
 
         self._logger.info('generate all models and schemas: ')
         for project, count in models_count_map.items():
             self._logger.info(f'  {project} has {count} models')
 
-    def _gen_udf(self):
+        return udfs
+
+    def _consolidated_events(
+            self, project: str, contract_abis: List[Tuple[Contract, ABISchema]]
+    ) -> Optional[ConsolidatedEvents]:
+        """
+        The events hinted by the contracts or known to be small by the stats are consolidated, the events of the table
+        contracts are rebuilt in full every run and the versioned models have their own tables, so they are skipped.
+        """
+        members = []
+        for contract, abi in contract_abis:
+            if contract.materialize != consolidated_event_materialize or contract.versioned_models:
+                continue
+            hinted_events = set(contract.consolidated_events or [])
+            for event in abi.nonempty_events:
+                if (project, contract.name, event.name) in self.shared_event_map:
+                    continue
+                daily_bytes = self._model_daily_bytes.get(CG.evt_model_name(contract.name, event, project))
+                if event.name in hinted_events or (
+                        self._consolidated_event_max_daily_bytes > 0 and daily_bytes is not None
+                        and daily_bytes <= self._consolidated_event_max_daily_bytes):
+                    members.append(ConsolidatedEventMember(contract.name, contract.address, event, contract.size_class))
+        if not members:
+            return None
+        if not self._codegen.support_consolidated_events:
+            self._logger.warning(f'{project} has {len(members)} events to consolidate, but the consolidated models '
+                                 f'are not supported by {self._codegen.__class__.__name__}, they are not consolidated.')
+            return None
+        return ConsolidatedEvents(project, tuple(members))
+
+    @staticmethod
+    def _consolidated_udfs(
+            project: str, udfs: List[UDFDescriptor], consolidated_events: Optional[ConsolidatedEvents]
+    ) -> List[UDFDescriptor]:
+        """
+        The UDFs of the consolidated events are called by the consolidated model, they are registered with it.
+        """
+        if consolidated_events is None:
+            return udfs
+        member_models = {CG.evt_model_name(i.contract_name, i.event, project) for i in consolidated_events.members}
+        return [dataclasses.replace(i, model_name=consolidated_events.model_name) if i.model_name in member_models
+                else i for i in udfs]
+
+    def _gen_shared_models_and_schema(self, udf_workspace: Optional[str] = None) -> List[UDFDescriptor]:
+        project_path = os.path.join(self.codegen_dir, shared_project_name)
+        pathlib.Path(project_path).mkdir(parents=True, exist_ok=True)
+
+        with DbtSchemaWriter(os.path.join(project_path, 'schema.yml')) as schema_writer:
+            for shared_event in self.shared_events:
+                self._codegen.gen_shared_event_dbt_model(project_path, self.version, shared_event)
+
+                model = self._evt_dbt_table(shared_event.contract_name, shared_event.event, shared_project_name)
+                schema_writer.write(model)
+                self.model_hints[model.name] = (shared_event.materialize, shared_event.size_class)
+
+        if udf_workspace is None:
+            return []
+        return self._codegen.gen_udfs_for_project(self._dbt_dir, udf_workspace, shared_project_name, {
+            i.contract_name: ABISchema(events=[i.event], calls=[]) for i in self.shared_events})
+
+    @staticmethod
+    def _evt_dbt_table(contract_name: str, event: ABIEventSchema, project: str) -> DbtTable:
+        columns = [DbtColumn(name=i.name) for i in event.inputs]
+        columns.extend(DbtColumn(name=i) for i in evt_base_column)
+        return DbtTable(name=CG.evt_model_name(contract_name, event, project), columns=columns)
+
+    @staticmethod
+    def _call_dbt_table(contract_name: str, call: ABICallSchema, project: str) -> DbtTable:
+        columns = [DbtColumn(name=i.name) for i in call.inputs]
+        columns.extend([DbtColumn(name=i.name) for i in call.outputs])
+        columns.extend(DbtColumn(name=i) for i in call_base_column)
+        return DbtTable(name=CG.call_model_name(contract_name, call, project), columns=columns)
+
+    def _model_versions(
+            self,
+            project: str,
+            contract: Contract,
+            abi: ABISchema,
+            shared_events: Mapping[str, SharedEvent],
+            versioner: ModelVersioner
+    ) -> Dict[str, List[ModelVersion]]:
+        """
+        :return: model_name -> versions, only the models whose ABIs are changed have versions
+        """
+        if not contract.versioned_models:
+            return {}
+
+        model_versions = {}
+        schemas: List[Tuple[str, ABIModelSchema]] = \
+            [(CG.evt_model_name(contract.name, i, project), i) for i in abi.events if i.name not in shared_events] + \
+            [(CG.call_model_name(contract.name, i, project), i) for i in abi.calls]
+        for model_name, schema in schemas:
+            manifest_versions, versions = versioner.versions(model_name, schema)
+            self.model_versions[model_name] = manifest_versions
+            if versions:
+                model_versions[model_name] = versions
+                self.renamed_models[self._model_name(contract.name, versions[0].schema, project)] = model_name
+        return model_versions
+
+    def _write_versioned_dbt_tables(
+            self,
+            schema_writer: DbtSchemaWriter,
+            project: str,
+            contract: Contract,
+            schema: ABIModelSchema,
+            versions: List[ModelVersion]
+    ) -> None:
+        for version in versions:
+            if isinstance(schema, ABIEventSchema):
+                model = self._evt_dbt_table(contract.name, version.schema, project)
+            else:
+                model = self._call_dbt_table(contract.name, version.schema, project)
+            schema_writer.write(model)
+            self.model_hints[model.name] = (contract.materialize, contract.size_class)
+
+        base_columns = evt_base_column if isinstance(schema, ABIEventSchema) else call_base_column
+        columns = [DbtColumn(name=i.name) for i in union_fields(versions)]
+        columns.extend(DbtColumn(name=i) for i in base_columns)
+        model_name = self._model_name(contract.name, schema, project)
+        schema_writer.write(DbtTable(name=model_name, columns=columns))
+        self.model_hints[model_name] = ('view', contract.size_class)
+
+    @staticmethod
+    def _model_name(contract_name: str, schema: ABIModelSchema, project: str) -> str:
+        if isinstance(schema, ABIEventSchema):
+            return CG.evt_model_name(contract_name, schema, project)
+        return CG.call_model_name(contract_name, schema, project)
+
+    def _versioned_schemas(
+            self,
+            contract_name: str,
+            schema: ABIModelSchema,
+            project: str,
+            model_versions: Mapping[str, List[ModelVersion]]
+    ) -> List[ABIModelSchema]:
+        versions = model_versions.get(self._model_name(contract_name, schema, project))
+        return [i.schema for i in versions] if versions else [schema]
+
+    def _gen_udf(self, udfs: List[UDFDescriptor]):
         if not self._codegen.need_udf:
             return
 
-        abi_map: Dict[str, Dict[str, ABISchema]] = {}
-        for project, contracts in self.contracts_map.items():
-            abi_map[project] = {}
-            for contract in contracts:
-                abi_map[project][contract.name] = self._transformer.transform_abi(contract.abi)
-
-        self._codegen.gen_udf_for_dbt(self._dbt_dir, abi_map, self.version)
+        with self._profiler.phase('gen_udf_registration'):
+            self._codegen.gen_udf_registration(self._dbt_dir, udfs, self.version)
+        with self._profiler.phase('build_udf'):
+            self._codegen.build_udf(self._dbt_dir, self.version)
         self._logger.info('generate a UDF dependency.')
 
+    def _transform_abi(self, contract: Contract) -> ABISchema:
+        return self._transformer.transform_abi(contract.abi, contract.include_read_only_calls)
+
     def _replenish_project_yml(self):
         projects_dict = {
             project: {
                 '+schema': project,
                 '+tags': ['chain_ethereum', 'level_parse', f'proj_{project}']
             }
-            for project in self.contracts_map.keys()
+            for project in self.project_names + ([shared_project_name] if self.shared_events else [])
         }
 
         project_conf, ind, bsi = ruamel.yaml.util.load_yaml_guess_indent(open(self.dbt_project_yml))
@@ -139,6 +416,13 @@ class DbtGenerator:
 
         database_conf['codegen'] = projects_dict
 
+        on_run_start_hooks = self._codegen.on_run_start_hooks()
+        if on_run_start_hooks:
+            project_hooks = project_conf.get('on-run-start') or []
+            if isinstance(project_hooks, str):
+                project_hooks = [project_hooks]
+            project_conf['on-run-start'] = project_hooks + [i for i in on_run_start_hooks if i not in project_hooks]
+
         y = ruamel.yaml.YAML()
         y.indent(mapping=ind, sequence=ind, offset=bsi)
         with open(self.dbt_project_yml, 'w') as nf:
@@ -158,6 +442,14 @@ class DbtGenerator:
     def codegen_dir(self) -> str:
         return os.path.join(self.model_dir, 'codegen')
 
+    @property
+    def codegen_manifest_path(self) -> str:
+        return os.path.join(self.codegen_dir, 'codegen_manifest.json')
+
+    @property
+    def codegen_changes_path(self) -> str:
+        return os.path.join(self.codegen_dir, 'codegen_changes.json')
+
     @property
     def dbt_project_yml(self) -> str:
         return os.path.join(self._dbt_dir, 'dbt_project.yml')
@@ -183,13 +475,43 @@ class DbtGenerator:
         return [f for f in listdir(self.contracts_dir) if os.path.isdir(os.path.join(self.contracts_dir, f))]
 
     @functools.cached_property
-    def contracts_map(self) -> Dict[str, List[Contract]]:
-        contracts_map: Dict[str, List[Contract]] = {}
-        for project in self.project_dirs:
-            contract_paths = glob.glob(os.path.join(self.contracts_dir, project, '*.json'))
-            for contract_path in contract_paths:
-                with open(contract_path, 'r') as f:
-                    if project not in contracts_map:
-                        contracts_map[project] = []
-                    contracts_map[project].append(Contract.from_dicts(json.loads(f.read())))
-        return contracts_map
+    def project_names(self) -> List[str]:
+        """
+        The projects which have contracts.
+        """
+        return sorted(i for i in self.project_dirs if self._contract_paths(i))
+
+    def _contract_paths(self, project: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.contracts_dir, project, '*.json')))
+
+    def _load_contracts(self, project: str) -> List[Contract]:
+        contracts = []
+        for contract_path in self._contract_paths(project):
+            with open(contract_path, 'r') as f:
+                contracts.append(Contract.from_dicts(json.loads(f.read())))
+        return contracts
+
+    def _iter_contract_abis(self) -> Iterator[Tuple[str, Contract, ABISchema]]:
+        for project in self.project_names:
+            for contract in self._load_contracts(project):
+                yield project, contract, self._transform_abi(contract)
+
+    @functools.cached_property
+    def shared_events(self) -> List[SharedEvent]:
+        """
+        The shared events need all contracts, they are found by an extra pass loading the projects one by one.
+        """
+        if self._shared_event_min_contracts > 0 and shared_project_name in self.project_names:
+            raise ValueError(f'{shared_project_name} is reserved for the shared models, it can not be a project.')
+        return find_shared_events(self._iter_contract_abis(), self._shared_event_min_contracts)
+
+    @functools.cached_property
+    def shared_event_map(self) -> Dict[Tuple[str, str, str], SharedEvent]:
+        """
+        (project_name, contract_name, event_name) -> shared_event
+        """
+        return {
+            (member.project_name, member.contract_name, member.event_name): shared_event
+            for shared_event in self.shared_events
+            for member in shared_event.members
+        }
@@ -0,0 +1,53 @@
+from typing import Mapping, Optional, Any
+
+from jinja2 import Environment, StrictUndefined
+
+_missing = object()
+
+
+class DbtModelRenderer:
+    """
+    Render a generated dbt model into plain SQL without dbt, it's used to run the models on a local Spark,
+    only the jinja used by the codegen templates (config, ref, var and is_incremental) is supported.
+    """
+
+    def __init__(
+            self,
+            refs: Optional[Mapping[str, str]] = None,
+            dbt_vars: Optional[Mapping[str, Any]] = None,
+            incremental: bool = False
+    ):
+        """
+        :param refs: model name -> relation name, the model name is used if it's not in the refs
+        :param dbt_vars: the variables like `dt`
+        :param incremental: the result of is_incremental()
+        """
+        self.refs = refs or {}
+        self.dbt_vars = dbt_vars or {}
+        self.incremental = incremental
+        self._env = Environment(undefined=StrictUndefined, extensions=['jinja2.ext.do'])
+
+    def render(self, content: str) -> str:
+        return self._env.from_string(content).render(
+            config=self._config,
+            ref=self._ref,
+            var=self._var,
+            is_incremental=self._is_incremental
+        )
+
+    @staticmethod
+    def _config(**kwargs) -> str:
+        return ''
+
+    def _ref(self, model_name: str) -> str:
+        return self.refs.get(model_name, model_name)
+
+    def _var(self, name: str, default: Any = _missing) -> Any:
+        if name in self.dbt_vars:
+            return self.dbt_vars[name]
+        if default is _missing:
+            raise KeyError(f'the var {name} is required to render the model.')
+        return default
+
+    def _is_incremental(self) -> bool:
+        return self.incremental
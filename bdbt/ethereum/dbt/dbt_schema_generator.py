@@ -1,6 +1,7 @@
 import os.path
 import pathlib
-from typing import List, Dict
+import textwrap
+from typing import List, Dict, Optional, IO
 
 import pyaml
 
@@ -56,3 +57,32 @@ class DbtSchemaGenerator:
             # https://docs.getdbt.com/faqs/why-version-2
             f.write('version: 2\n')
             f.write(pyaml.dump(schema.to_dict(), sort_dicts=False))
+
+
+class DbtSchemaWriter:
+    """
+    Write the models into schema.yml one by one, so the models of a huge project are not kept in memory,
+    the content is the same as dumping the whole DbtModelSchema.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.models_count = 0
+        self._file: Optional[IO] = None
+
+    def __enter__(self) -> 'DbtSchemaWriter':
+        self._file = open(self.filepath, 'w')
+        # https://docs.getdbt.com/faqs/why-version-2
+        self._file.write('version: 2\n')
+        return self
+
+    def write(self, model: DbtTable) -> None:
+        if self.models_count == 0:
+            self._file.write('models:\n')
+        self._file.write(textwrap.indent(pyaml.dump([model.to_dict()], sort_dicts=False), '  '))
+        self.models_count += 1
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.models_count == 0:
+            self._file.write('models: []\n')
+        self._file.close()
@@ -0,0 +1,522 @@
+import json
+import os.path
+import pathlib
+from typing import List, Optional
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIEventSchema,
+    ABICallSchema,
+    ABIField,
+    ABIDataType,
+    ABIIntType,
+    ABIAddressType,
+    ABIBoolType,
+    ABIBytesType,
+    ABIFunctionType
+)
+from bdbt.ethereum.abi.abi_decoder import head_size
+from bdbt.ethereum.abi.provider.data_type_provider import signed_bit_length
+from bdbt.ethereum.abi.provider.duckdb_type_provider import (
+    DuckDBTypeStringProvider,
+    DuckDBJsonStructureProvider,
+    quote_identifier
+)
+from bdbt.ethereum.abi.utils import event_selector, call_selector
+from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator
+from bdbt.ethereum.dbt.dbt_schema_generator import evt_base_column, call_base_column
+from bdbt.ethereum.dbt.duckdb.duckdb_udf import event_udf_name, call_udf_name
+from bdbt.ethereum.dbt.model_version import ModelVersion, ABIModelSchema, union_fields
+from bdbt.ethereum.dbt.shared_event import SharedEvent, shared_project_name
+from bdbt.global_type import Contract, TraceFilter, LayoutOptions
+
+event_dbt_model_sql_template = """{{
+    config(
+        {{MODEL_MATERIALIZED_CONFIG}},
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+with base as (
+    select
+        block_number as evt_block_number,
+        block_timestamp as evt_block_time,
+        log_index as evt_index,
+        transaction_hash as evt_tx_hash,
+        address as contract_address,
+        dt{{DATA_COLUMNS}}
+    from {{ ref('stg_logs') }}
+    where {{SELECT_CONDITION}}
+
+    {{MODEL_DT_FILTER}}
+),
+
+final as (
+    select
+        evt_block_number,
+        evt_block_time,
+        evt_index,
+        evt_tx_hash,
+        contract_address,
+        dt{{FIELDS}}
+    from base
+)
+
+select *
+from final{{MODEL_SORT_BY}}
+"""
+
+call_dbt_model_sql_template = """{{
+    config(
+        {{MODEL_MATERIALIZED_CONFIG}},
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+with base as (
+    select
+        status = 1 as call_success,
+        block_number as call_block_number,
+        block_timestamp as call_block_time,
+        trace_address as call_trace_address,
+        transaction_hash as call_tx_hash,
+        to_address as contract_address,
+        dt{{DATA_COLUMNS}}
+    from {{ ref('stg_traces') }}
+    where {{SELECT_CONDITION}}
+
+    {{MODEL_DT_FILTER}}
+),
+
+final as (
+    select
+        call_success,
+        call_block_number,
+        call_block_time,
+        call_trace_address,
+        call_tx_hash,
+        contract_address,
+        dt{{FIELDS}}
+    from base
+)
+
+select *
+from final{{MODEL_SORT_BY}}
+"""
+
+shared_event_view_dbt_model_sql_template = """{{
+    config(
+        materialized='view',
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+select
+    evt_block_number,
+    evt_block_time,
+    evt_index,
+    evt_tx_hash,
+    contract_address,
+    dt{{INPUT_FIELDS}}
+from {{ ref('{{SHARED_MODEL_NAME}}') }}
+where contract_address = lower('{{CONTRACT_ADDRESS}}')
+"""
+
+versioned_view_dbt_model_sql_template = """{{
+    config(
+        materialized='view',
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+{{VERSION_SELECTS}}
+"""
+
+version_select_sql_template = """select
+    {{BASE_FIELDS}}{{FIELDS}}
+from {{ ref('{{VERSION_MODEL_NAME}}') }}"""
+
+table_model_config = "materialized='table'"
+# the rows of the dt partitions in the new data are deleted before they are inserted, like insert_overwrite of Spark
+increment_model_config = "materialized='incremental', incremental_strategy='delete+insert', unique_key='dt'"
+
+# The hex string of the data of the logs and the input / output of the traces, 64 characters per word.
+data_hex_column = 'data_hex'
+input_hex_column = 'input_hex'
+output_hex_column = 'output_hex'
+# The column of the fields decoded by the python UDFs.
+udf_data_column = 'data'
+
+
+class DuckDBDbtCodeGenerator(DbtCodeGenerator):
+    """
+    Generate the dbt-duckdb models. The fields in the fixed words of the data (the addresses, the booleans, bytesN,
+    the integers up to 64 bits) are decoded by SQL, the others (e.g. the dynamic types and the wider integers)
+    are decoded by the python UDFs registered by `duckdb_plugin`, so no UDF needs to be built.
+    """
+
+    def __init__(
+            self,
+            remote_workspace: Optional[str] = None,
+            wide_int_as_string: bool = False,
+            layout: Optional[LayoutOptions] = None
+    ):
+        """
+        :param remote_workspace: unused, the UDFs are installed with this package
+        :param layout: only the sort_by of the layout options is used, the rows of the tables are ordered by it
+        """
+        super(DuckDBDbtCodeGenerator, self).__init__(False)
+        self.type_provider = DuckDBTypeStringProvider(wide_int_as_string=wide_int_as_string)
+        self.json_structure_provider = DuckDBJsonStructureProvider(wide_int_as_string=wide_int_as_string)
+        self.layout = layout or LayoutOptions()
+
+    def gen_event_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema
+    ) -> None:
+        self._gen_event_dbt_model(
+            project_path, contract.name, contract.materialize, self.layout.merge(contract.layout), event,
+            self._evt_condition_selector(contract, event))
+
+    def gen_shared_event_dbt_model(
+            self,
+            project_path: str,
+            version: str,
+            shared_event: SharedEvent
+    ) -> None:
+        self._gen_event_dbt_model(
+            project_path, shared_event.contract_name, shared_event.materialize, self.layout, shared_event.event,
+            self._shared_evt_condition_selector(shared_event))
+
+    def gen_shared_event_view_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema,
+            shared_event: SharedEvent
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        filepath = os.path.join(project_path, self.evt_model_name(contract.name, event, project_name) + '.sql')
+
+        # the fields of the member are mapped to the shared event by position
+        content = shared_event_view_dbt_model_sql_template \
+            .replace('{{MODEL_ALIAS}}', self.evt_model_name(contract.name, event).lower()) \
+            .replace('{{SHARED_MODEL_NAME}}',
+                     self.evt_model_name(shared_event.contract_name, shared_event.event, shared_project_name)) \
+            .replace('{{CONTRACT_ADDRESS}}', contract.address) \
+            .replace('{{INPUT_FIELDS}}', self._fields_selector([
+                f'{quote_identifier(i.name)} as {quote_identifier(j.name)}'
+                for i, j in zip(shared_event.event.inputs, event.inputs)]))
+
+        self.create_file_and_write(filepath, content)
+
+    def gen_call_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            call: ABICallSchema
+    ) -> None:
+        self._gen_call_dbt_model(project_path, contract, call, self._call_condition_selector(contract, call))
+
+    def gen_versioned_dbt_models(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            schema: ABIModelSchema,
+            versions: List[ModelVersion]
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        is_event = isinstance(schema, ABIEventSchema)
+        model_name = self.evt_model_name if is_event else self.call_model_name
+        alias = model_name(contract.name, schema).lower()
+
+        for model_version in versions:
+            # the first version keeps the table of the model before the versioning, so its data is not decoded again
+            version_alias = alias if model_version.version == 1 else f'{alias}_v{model_version.version}'
+            if is_event:
+                self._gen_event_dbt_model(
+                    project_path, contract.name, contract.materialize, self.layout.merge(contract.layout),
+                    model_version.schema,
+                    self._evt_condition_selector(contract, model_version.schema) +
+                    self._dt_range_condition(model_version),
+                    version_alias)
+            else:
+                self._gen_call_dbt_model(
+                    project_path, contract, model_version.schema,
+                    self._call_condition_selector(contract, model_version.schema) +
+                    self._dt_range_condition(model_version),
+                    version_alias)
+
+        fields = union_fields(versions)
+        version_selects = [
+            version_select_sql_template
+            .replace('{{BASE_FIELDS}}', ',\n    '.join(evt_base_column if is_event else call_base_column))
+            .replace('{{FIELDS}}', ''.join(f',\n    {i}' for i in self._version_field_selector(fields, version)))
+            .replace('{{VERSION_MODEL_NAME}}', model_name(contract.name, version.schema, project_name))
+            for version in versions
+        ]
+
+        content = versioned_view_dbt_model_sql_template \
+            .replace('{{MODEL_ALIAS}}', f'{alias}_all') \
+            .replace('{{VERSION_SELECTS}}', '\nunion all\n'.join(version_selects))
+        self.create_file_and_write(
+            os.path.join(project_path, model_name(contract.name, schema, project_name) + '.sql'), content)
+
+    def _gen_event_dbt_model(
+            self,
+            project_path: str,
+            contract_name: str,
+            materialize: str,
+            layout: LayoutOptions,
+            event: ABIEventSchema,
+            select_condition: str,
+            alias: Optional[str] = None
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        filepath = os.path.join(project_path, self.evt_model_name(contract_name, event, project_name) + '.sql')
+
+        data_columns = []
+        selectors = []
+        udf_fields = []
+        # the indexed fields are in the topics after the selector, the others are encoded in the data
+        data_fields = [i for i in event.inputs if not self._is_indexed(i)]
+        topic_index = 1 if event.raw_schema.anonymous else 2
+        for field in event.inputs:
+            if self._is_indexed(field):
+                if self._is_native(field.ftype):
+                    selectors.append(self._native_selector(
+                        field, f'lower(topics_arr[{topic_index}])', 3, f'len(topics_arr) >= {topic_index}'))
+                else:
+                    udf_fields.append(field)
+                    selectors.append(self._udf_selector(field))
+                topic_index += 1
+            elif self._is_native(field.ftype):
+                offset = self._head_offset(data_fields, field)
+                selectors.append(self._native_selector(
+                    field, data_hex_column, offset * 2 + 1, f'length({data_hex_column}) >= {(offset + 32) * 2}'))
+            else:
+                udf_fields.append(field)
+                selectors.append(self._udf_selector(field))
+
+        if any(not self._is_indexed(i) and self._is_native(i.ftype) for i in event.inputs):
+            data_columns.append(f'lower(hex(unhex_data)) as {data_hex_column}')
+        if any(self._is_indexed(i) and self._is_native(i.ftype) for i in event.inputs):
+            data_columns.append('topics_arr')
+        if udf_fields:
+            udf_call = f"{event_udf_name}(unhex_data, topics_arr, " \
+                       f"'{json.dumps(event.raw_schema.to_dict(omit_none=True))}')"
+            data_columns.append(self._udf_data_column(udf_call, udf_fields))
+
+        content = self._replace_dt_filter(event_dbt_model_sql_template, materialize) \
+            .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(materialize)) \
+            .replace('{{MODEL_ALIAS}}', alias or self.evt_model_name(contract_name, event).lower()) \
+            .replace('{{DATA_COLUMNS}}', ''.join(f',\n        {i}' for i in data_columns)) \
+            .replace('{{SELECT_CONDITION}}', select_condition) \
+            .replace('{{FIELDS}}', self._fields_selector(selectors, indent=8)) \
+            .replace('{{MODEL_SORT_BY}}', self._sort_by(layout, evt_base_column + [i.name for i in event.inputs]))
+
+        self.create_file_and_write(filepath, content)
+
+    def _gen_call_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            call: ABICallSchema,
+            select_condition: str,
+            alias: Optional[str] = None
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        filepath = os.path.join(project_path, self.call_model_name(contract.name, call, project_name) + '.sql')
+        output_column = self._output_column(contract.trace_filter)
+
+        data_columns = []
+        selectors = []
+        udf_fields = []
+        # the input starts with the 4 bytes selector
+        for fields, hex_column, source_column, start in [
+            (call.inputs, input_hex_column, 'unhex_input', 4),
+            (call.outputs, output_hex_column, output_column, 0)
+        ]:
+            native_fields = [i for i in fields if self._is_native(i.ftype)]
+            if native_fields:
+                data_columns.append(f'lower(hex({source_column})) as {hex_column}')
+            for field in fields:
+                if field in native_fields:
+                    offset = start + self._head_offset(fields, field)
+                    selectors.append(self._native_selector(
+                        field, hex_column, offset * 2 + 1, f'length({hex_column}) >= {(offset + 32) * 2}'))
+                else:
+                    udf_fields.append(field)
+                    selectors.append(self._udf_selector(field))
+
+        if udf_fields:
+            udf_call = f"{call_udf_name}(unhex_input, {output_column}, " \
+                       f"'{json.dumps(call.raw_schema.to_dict(omit_none=True))}')"
+            data_columns.append(self._udf_data_column(udf_call, udf_fields))
+
+        columns = call_base_column + [i.name for i in call.inputs] + [i.name for i in call.outputs]
+        content = self._replace_dt_filter(call_dbt_model_sql_template, contract.materialize) \
+            .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(contract.materialize)) \
+            .replace('{{MODEL_ALIAS}}', alias or self.call_model_name(contract.name, call).lower()) \
+            .replace('{{DATA_COLUMNS}}', ''.join(f',\n        {i}' for i in data_columns)) \
+            .replace('{{SELECT_CONDITION}}', select_condition) \
+            .replace('{{FIELDS}}', self._fields_selector(selectors, indent=8)) \
+            .replace('{{MODEL_SORT_BY}}', self._sort_by(self.layout.merge(contract.layout), columns))
+
+        self.create_file_and_write(filepath, content)
+
+    @staticmethod
+    def _is_indexed(field: ABIField) -> bool:
+        return field.metadata is not None and field.metadata.get('indexed', False)
+
+    @staticmethod
+    def _is_native(atype: ABIDataType) -> bool:
+        """
+        The types in one word which can be decoded by the string functions of DuckDB.
+        """
+        if isinstance(atype, ABIIntType):
+            return signed_bit_length(atype) <= 64
+        elif isinstance(atype, ABIBytesType):
+            return not atype.dynamic
+        return isinstance(atype, (ABIAddressType, ABIBoolType, ABIFunctionType))
+
+    @staticmethod
+    def _head_offset(fields: List[ABIField], field: ABIField) -> int:
+        offset = 0
+        for i in fields:
+            if i is field:
+                return offset
+            offset += head_size(i.ftype)
+        raise ValueError(f'{field.name} is not in the fields.')
+
+    def _native_selector(self, field: ABIField, hex_string: str, start: int, condition: str) -> str:
+        """
+        :param hex_string: the expression of the hex string containing the word
+        :param start: the position of the first character of the word in the hex string, it starts from 1
+        :param condition: the word exists in the hex string, the field is null otherwise
+        """
+        atype = field.ftype
+        if isinstance(atype, ABIAddressType):
+            value = f"'0x' || substr({hex_string}, {start + 24}, 40)"
+        elif isinstance(atype, ABIBoolType):
+            value = f"substr({hex_string}, {start + 63}, 1) = '1'"
+        elif isinstance(atype, (ABIBytesType, ABIFunctionType)):
+            value = f"'0x' || substr({hex_string}, {start}, {atype.length * 2})"
+        else:
+            hex_length = atype.bit_length // 4
+            unsigned = f"try_cast('0x' || substr({hex_string}, {start + 64 - hex_length}, {hex_length}) as UBIGINT)"
+            if atype.unsigned:
+                value = unsigned
+            else:
+                # the two's complement of the signed integers
+                value = f'case when {unsigned} >= {2 ** (atype.bit_length - 1)} ' \
+                        f'then cast({unsigned} as HUGEINT) - {2 ** atype.bit_length} else {unsigned} end'
+            value = f'cast({value} as {self.type_provider.transform(atype)})'
+        return f'case when {condition} then {value} end as {quote_identifier(field.name)}'
+
+    @staticmethod
+    def _udf_selector(field: ABIField) -> str:
+        return f"{udf_data_column}['{field.name}'] as {quote_identifier(field.name)}"
+
+    def _udf_data_column(self, udf_call: str, fields: List[ABIField]) -> str:
+        # the fields which can't be read as their types are null
+        structure = json.dumps({i.name: self.json_structure_provider.transform(i.ftype) for i in fields})
+        return f"json_transform({udf_call}, '{structure}') as {udf_data_column}"
+
+    @staticmethod
+    def _fields_selector(selectors: List[str], indent: int = 4) -> str:
+        return ''.join(f',\n{" " * indent}{i}' for i in selectors)
+
+    @staticmethod
+    def _materialized_config(materialize: str) -> str:
+        if materialize == 'table':
+            return table_model_config
+        elif materialize == 'increment':
+            return increment_model_config
+        else:
+            raise ValueError(f'{materialize} isnt a supported materialized model.')
+
+    @staticmethod
+    def _sort_by(layout: LayoutOptions, columns: List[str]) -> str:
+        # the zone maps of DuckDB skip the row groups by the min/max of the sorted columns
+        name_to_column = {i.lower(): i for i in columns}
+        sort_by = [name_to_column[i.lower()] for i in layout.sort_by or [] if i.lower() in name_to_column]
+        return f'\norder by {", ".join(quote_identifier(i) for i in sort_by)}' if sort_by else ''
+
+    @staticmethod
+    def _dt_range_condition(model_version: ModelVersion) -> str:
+        conditions = []
+        if model_version.dt_start is not None:
+            conditions.append(f"dt >= '{model_version.dt_start}'")
+        if model_version.dt_end is not None:
+            conditions.append(f"dt < '{model_version.dt_end}'")
+        return ''.join(f' and {i}' for i in conditions)
+
+    def _version_field_selector(self, fields: List[ABIField], model_version: ModelVersion) -> List[str]:
+        """
+        The fields missing in the version are null, and the fields are cast to the types of the latest version.
+        """
+        version_fields = {i.name: i for i in model_version.fields}
+        selectors = []
+        for field in fields:
+            field_type = self.type_provider.transform(field.ftype)
+            name = quote_identifier(field.name)
+            if field.name not in version_fields:
+                selectors.append(f'cast(null as {field_type}) as {name}')
+            elif version_fields[field.name].ftype != field.ftype:
+                selectors.append(f'cast({name} as {field_type}) as {name}')
+            else:
+                selectors.append(name)
+        return selectors
+
+    @staticmethod
+    def _address_condition(column: str, addresses: List[str]) -> str:
+        if len(addresses) == 1:
+            return f"{column} = lower('{addresses[0]}')"
+        values = ', '.join(f"lower('{i}')" for i in addresses)
+        return f'{column} in ({values})'
+
+    @classmethod
+    def _evt_condition_selector(cls, contract: Contract, event: ABIEventSchema) -> str:
+        selector = event_selector(event)
+        conditions = [cls._address_condition('address', [contract.address])] if contract.address else []
+        conditions.append(f"selector = '{selector}'")
+        return ' and '.join(conditions)
+
+    @classmethod
+    def _shared_evt_condition_selector(cls, shared_event: SharedEvent) -> str:
+        selector = event_selector(shared_event.event)
+        return f"{cls._address_condition('address', shared_event.addresses)} and selector = '{selector}'"
+
+    @classmethod
+    def _call_condition_selector(cls, contract: Contract, call: ABICallSchema) -> str:
+        selector = call_selector(call)
+        conditions = [cls._address_condition('to_address', [contract.address])] if contract.address else []
+        conditions.append(f"selector = '{selector}'")
+        conditions.extend(cls._trace_filter_conditions(contract.trace_filter))
+        return ' and '.join(conditions)
+
+    @staticmethod
+    def _trace_filter_conditions(trace_filter: Optional[TraceFilter]) -> List[str]:
+        if trace_filter is None:
+            return []
+
+        conditions = []
+        if trace_filter.success_only:
+            conditions.append('status = 1')
+        if trace_filter.call_types:
+            conditions.append(f"""call_type in ({', '.join(f"'{i}'" for i in trace_filter.call_types)})""")
+        if trace_filter.trace_types:
+            conditions.append(f"""trace_type in ({', '.join(f"'{i}'" for i in trace_filter.trace_types)})""")
+        return conditions
+
+    @staticmethod
+    def _output_column(trace_filter: Optional[TraceFilter]) -> str:
+        if trace_filter is None or trace_filter.decode_failed_outputs or trace_filter.success_only:
+            return 'unhex_output'
+        return 'case when status = 1 then unhex_output end'
@@ -0,0 +1,17 @@
+import duckdb
+from dbt.adapters.duckdb.plugins import BasePlugin
+
+from bdbt.ethereum.dbt.duckdb.duckdb_udf import register_udfs
+
+
+class Plugin(BasePlugin):
+    """
+    Register the python UDFs decoding the fields which can't be decoded by SQL, e.g. the dynamic arrays,
+    add it into the profile of dbt-duckdb:
+
+        plugins:
+          - module: bdbt.ethereum.dbt.duckdb.duckdb_plugin
+    """
+
+    def configure_connection(self, conn: duckdb.DuckDBPyConnection) -> None:
+        register_udfs(conn)
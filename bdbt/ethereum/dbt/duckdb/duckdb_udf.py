@@ -0,0 +1,73 @@
+import functools
+import json
+from decimal import Decimal
+from typing import Any, Optional, List
+
+from bdbt.ethereum.abi.abi_decoder import ABIDecoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.abi_type import ABI
+from bdbt.ethereum.dbt.model_version import ABIModelSchema
+from bdbt.ethereum.exceptions import ABIDecodeError
+
+# The names of the python UDFs registered into DuckDB, see `duckdb_plugin`.
+event_udf_name = 'bdbt_decode_event'
+call_udf_name = 'bdbt_decode_call'
+
+_decoder = ABIDecoder()
+
+
+@functools.lru_cache(maxsize=4096)
+def _load_schema(raw_abi: str) -> ABIModelSchema:
+    # the models pass the same ABI with every row, it's parsed once
+    abi = ABITransformer().transform_abi(ABI.from_dicts([json.loads(raw_abi)]))
+    return (abi.events or abi.calls)[0]
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return '0x' + value.hex()
+    elif isinstance(value, Decimal):
+        return str(value)
+    elif isinstance(value, list):
+        return [_to_json_value(i) for i in value]
+    elif isinstance(value, dict):
+        return {k: _to_json_value(v) for k, v in value.items()}
+    return value
+
+
+def decode_event_json(data: Optional[bytes], topics: Optional[List[str]], raw_abi: str) -> Optional[str]:
+    """
+    Decode the log by the raw ABI of the event into a JSON object, it's None if the log can't be decoded.
+    """
+    try:
+        return json.dumps(_to_json_value(_decoder.decode_event(_load_schema(raw_abi), topics or [], data or b'')))
+    except ABIDecodeError:
+        return None
+
+
+def decode_call_json(input_data: Optional[bytes], output_data: Optional[bytes], raw_abi: str) -> Optional[str]:
+    """
+    Decode the trace by the raw ABI of the function into a JSON object, it's None if the input can't be decoded.
+    """
+    try:
+        return json.dumps(_to_json_value(_decoder.decode_call(_load_schema(raw_abi), input_data or b'', output_data)))
+    except ABIDecodeError:
+        return None
+
+
+def register_udfs(conn) -> None:
+    """
+    Register the UDFs into the DuckDB connection, the nulls are passed to the UDFs to decode the empty data.
+    """
+    import duckdb
+    try:
+        from duckdb.sqltypes import BLOB, VARCHAR
+    except ImportError:
+        # the types are moved to duckdb.sqltypes since duckdb 1.4
+        from duckdb.typing import BLOB, VARCHAR
+
+    conn.create_function(
+        event_udf_name, decode_event_json, [BLOB, duckdb.list_type(VARCHAR), VARCHAR], VARCHAR,
+        null_handling='special')
+    conn.create_function(
+        call_udf_name, decode_call_json, [BLOB, BLOB, VARCHAR], VARCHAR, null_handling='special')
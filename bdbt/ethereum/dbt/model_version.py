@@ -0,0 +1,115 @@
+import dataclasses
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Union, Tuple
+
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABICallSchema, ABIField
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.abi_type import ABI
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest, CodegenModelVersion
+
+ABIModelSchema = Union[ABIEventSchema, ABICallSchema]
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """
+    One version of the model of an event or a call whose ABI was changed, it decodes the data between
+    dt_start (inclusive) and dt_end (exclusive) only, so the data decoded by the previous versions is kept.
+    """
+    version: int
+    # the event or the call of this version, it's renamed with the version suffix, e.g. Transfer_v2
+    schema: ABIModelSchema
+    dt_start: Optional[str] = None
+    dt_end: Optional[str] = None
+
+    @property
+    def fields(self) -> List[ABIField]:
+        return model_fields(self.schema)
+
+
+def model_fields(schema: ABIModelSchema) -> List[ABIField]:
+    if isinstance(schema, ABICallSchema):
+        return schema.inputs + schema.outputs
+    return schema.inputs
+
+
+def schema_checksum(schema: ABIModelSchema) -> str:
+    return hashlib.sha256(
+        json.dumps(schema.raw_schema.to_dict(omit_none=True), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def union_fields(versions: List[ModelVersion]) -> List[ABIField]:
+    """
+    The fields of the latest version, and the fields only in the previous versions, the latest field is kept
+    if the fields of the versions have the same name.
+    """
+    fields = {}
+    for version in reversed(versions):
+        for field in version.fields:
+            fields.setdefault(field.name, field)
+    return list(fields.values())
+
+
+class ModelVersioner:
+    """
+    Compare the ABI of the models with the previous generation, the model whose ABI is changed is split into
+    the versions by the cutover dt instead of being decoded again from the beginning.
+    """
+
+    def __init__(
+            self,
+            previous_manifest: Optional[CodegenManifest],
+            cutover_dt: str,
+            transformer: Optional[ABITransformer] = None
+    ):
+        """
+        :param cutover_dt: the first dt decoded by the new version
+        """
+        self.previous_manifest = previous_manifest
+        self.cutover_dt = cutover_dt
+        self.transformer = transformer or ABITransformer()
+
+    def versions(
+            self, model_name: str, schema: ABIModelSchema
+    ) -> Tuple[List[CodegenModelVersion], List[ModelVersion]]:
+        """
+        :return: the versions kept in the manifest, and the versions of the models,
+            the latter is empty if the ABI has never been changed
+        """
+        checksum = schema_checksum(schema)
+        current = CodegenModelVersion(checksum=checksum, abi=schema.raw_schema.to_dict(omit_none=True))
+
+        previous_model = self.previous_manifest.models.get(model_name) if self.previous_manifest else None
+        # the ABI of the model generated before the versioning is unknown, the current ABI is the first version
+        previous_versions = previous_model.versions if previous_model is not None else None
+        if not previous_versions:
+            return [current], []
+
+        if previous_versions[-1].checksum == checksum:
+            manifest_versions = previous_versions
+        elif previous_versions[-1].dt_start is not None and previous_versions[-1].dt_start >= self.cutover_dt:
+            # the latest version is changed again before the cutover, it's replaced
+            manifest_versions = previous_versions[:-1] + [
+                dataclasses.replace(current, dt_start=previous_versions[-1].dt_start)]
+        else:
+            manifest_versions = previous_versions + [dataclasses.replace(current, dt_start=self.cutover_dt)]
+
+        if len(manifest_versions) == 1:
+            return manifest_versions, []
+
+        model_versions = []
+        for idx, version in enumerate(manifest_versions):
+            version_schema = schema if idx == len(manifest_versions) - 1 else self._load_schema(schema, version)
+            model_versions.append(ModelVersion(
+                version=idx + 1,
+                schema=dataclasses.replace(version_schema, name=f'{schema.name}_v{idx + 1}'),
+                dt_start=version.dt_start,
+                dt_end=manifest_versions[idx + 1].dt_start if idx + 1 < len(manifest_versions) else None
+            ))
+        return manifest_versions, model_versions
+
+    def _load_schema(self, schema: ABIModelSchema, version: CodegenModelVersion) -> ABIModelSchema:
+        abi = self.transformer.transform_abi(ABI.from_dicts([version.abi]))
+        return abi.calls[0] if isinstance(schema, ABICallSchema) else abi.events[0]
@@ -0,0 +1,104 @@
+import dataclasses
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Iterable
+
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABISchema
+from bdbt.ethereum.abi.utils import event_selector
+from bdbt.global_type import Contract, SizeClass
+
+# The shared models are generated into this project, it can't be used by the contracts.
+shared_project_name = 'shared'
+
+
+@dataclass(frozen=True)
+class SharedEventMember:
+    """
+    The member only keeps the names, the contracts and their ABIs are not kept in memory.
+    """
+    project_name: str
+    contract_name: str
+    event_name: str
+    address: str
+    size_class: SizeClass
+
+
+@dataclass(frozen=True)
+class SharedEvent:
+    """
+    An event with the same signature and the same indexed fields emitted by many contracts (e.g. ERC20 Transfer),
+    it's decoded by one shared model in one scan, and the model of every member is a view over the shared model.
+    """
+    # the pseudo contract name of the shared model in the shared project
+    contract_name: str
+    # the representative event, the fields of the members are mapped to it by position
+    event: ABIEventSchema
+    materialize: str
+    members: Tuple[SharedEventMember, ...]
+
+    @property
+    def addresses(self) -> List[str]:
+        return sorted(set(i.address.lower() for i in self.members))
+
+    @property
+    def size_class(self) -> SizeClass:
+        """
+        The shared model scans the data of all members, so it's as large as the largest member.
+        """
+        size_classes = list(SizeClass)
+        return max((i.size_class for i in self.members), key=size_classes.index)
+
+
+def event_layout_key(event: ABIEventSchema) -> Tuple[str, Tuple[bool, ...]]:
+    """
+    The events can be decoded by the same UDF only if they have the same topic and the same indexed fields,
+    e.g. the Transfer of ERC20 and ERC721 have the same topic, but the tokenId of ERC721 is indexed.
+    """
+    topic = event_selector(event)
+    return topic, tuple(i.indexed for i in event.raw_schema.inputs)
+
+
+def find_shared_events(
+        contract_abis: Iterable[Tuple[str, Contract, ABISchema]],
+        min_contracts: int
+) -> List[SharedEvent]:
+    """
+    :param contract_abis: (project_name, contract, abi_schema), it's iterated once
+    :param min_contracts: the events emitted by at least min_contracts addresses are shared, 0 disables it
+    """
+    if min_contracts <= 0:
+        return []
+
+    groups: Dict[Tuple, List[SharedEventMember]] = {}
+    # only the representative event of every group is kept, the fields of the others are read from their ABIs later
+    representatives: Dict[Tuple, Tuple[Tuple[str, str, str], ABIEventSchema]] = {}
+    for project_name, contract, abi in contract_abis:
+        # the contract without address matches all contracts already
+        if not contract.address:
+            continue
+        for event in abi.nonempty_events:
+            if event.raw_schema.anonymous:
+                continue
+            key = (*event_layout_key(event), contract.materialize)
+            groups.setdefault(key, []).append(SharedEventMember(
+                project_name, contract.name, event.name, contract.address, contract.size_class))
+
+            order = (project_name, contract.name, event.name)
+            if key not in representatives or order < representatives[key][0]:
+                representatives[key] = (order, event)
+
+    shared_events = []
+    for (topic, indexed, materialize), members in groups.items():
+        if len(set(i.address.lower() for i in members)) < max(min_contracts, 2):
+            continue
+
+        representative = representatives[(topic, indexed, materialize)][1]
+        digest = hashlib.sha1(f'{topic}:{indexed}:{materialize}'.encode('utf-8')).hexdigest()
+        shared_events.append(SharedEvent(
+            contract_name=f'Sig{digest[:8]}',
+            event=dataclasses.replace(representative, name=representative.raw_schema.name),
+            materialize=materialize,
+            members=tuple(sorted(members, key=lambda i: (i.project_name, i.contract_name, i.event_name)))
+        ))
+
+    return sorted(shared_events, key=lambda i: (i.event.name, i.contract_name))
@@ -0,0 +1,62 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+# The prefix of the log lines of the decode counters written by the generated UDFs.
+decode_metrics_log_prefix = 'BDBT_DECODE_METRICS'
+
+
+@dataclass
+class DecodeMetrics:
+    udf: str
+    rows: int = 0
+    failures: int = 0
+    bytes_in: int = 0
+    decode_nanos: int = 0
+    # the number of the JVMs (executors) running the UDF
+    jvms: int = 0
+
+    @property
+    def failure_ratio(self) -> float:
+        return self.failures / self.rows if self.rows else 0.0
+
+    @property
+    def nanos_per_row(self) -> float:
+        return self.decode_nanos / self.rows if self.rows else 0.0
+
+    @property
+    def bytes_per_row(self) -> float:
+        return self.bytes_in / self.rows if self.rows else 0.0
+
+
+def parse_decode_metrics(lines: Iterable[str]) -> List[DecodeMetrics]:
+    """
+    Summarize the log lines of the decode counters, every line has the cumulative counters of a UDF in a JVM,
+    so the latest line of every JVM is kept and the JVMs are summed up, the other lines are skipped.
+
+    :return: the counters of the UDFs, the slowest first
+    """
+    latest: Dict[Tuple[str, str], dict] = {}
+    for line in lines:
+        index = line.find(decode_metrics_log_prefix)
+        if index < 0:
+            continue
+        try:
+            record = json.loads(line[index + len(decode_metrics_log_prefix):])
+        except json.JSONDecodeError:
+            # a line cut off by the log rotation
+            continue
+        key = (record['udf'], record['jvm'])
+        # the counters only grow, the log files may not be read in time order
+        if key not in latest or record['rows'] >= latest[key]['rows']:
+            latest[key] = record
+
+    result: Dict[str, DecodeMetrics] = {}
+    for (udf, _), record in latest.items():
+        metrics = result.setdefault(udf, DecodeMetrics(udf))
+        metrics.rows += record['rows']
+        metrics.failures += record['failures']
+        metrics.bytes_in += record['bytes_in']
+        metrics.decode_nanos += record['decode_nanos']
+        metrics.jvms += 1
+    return sorted(result.values(), key=lambda i: (-i.decode_nanos, i.udf))
@@ -0,0 +1,252 @@
+import logging
+import os
+import pathlib
+import tempfile
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple, Any
+
+from py4j.protocol import Py4JError, Py4JJavaError
+from pyspark.sql import SparkSession
+from pyspark.sql.types import DataType, DecimalType, ArrayType, StructType, StructField
+
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema
+from bdbt.ethereum.abi.abi_decoder import ABIDecoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.provider.spark_type_provider import SparkDataTypeProvider
+from bdbt.ethereum.dbt.dbt_model_renderer import DbtModelRenderer
+from bdbt.ethereum.dbt.model_version import ABIModelSchema
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator, UDFMode
+from bdbt.ethereum.exceptions import ABIDecodeError
+from bdbt.global_type import Contract
+
+
+class UDFDecoder(Enum):
+    # the generated java UDFs in the jar built by the codegen, the same as the cluster
+    JAR = 'jar'
+    # the python UDFs of ABIDecoder, no jar is required, but the decoding is much slower than the java UDFs,
+    # so it only judges the templates
+    PYTHON = 'python'
+
+
+@dataclass
+class ModelBenchmark:
+    model_name: str
+    # the rows written by the model
+    rows: int
+    wall_seconds: float
+    tasks: int = 0
+    # the sum of the run time and the cpu time of the tasks, None if they can't be read from the status store
+    task_seconds: Optional[float] = None
+    task_cpu_seconds: Optional[float] = None
+    output_files: int = 0
+    output_bytes: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(self.wall_seconds, 1e-9)
+
+    @property
+    def avg_file_bytes(self) -> int:
+        return self.output_bytes // self.output_files if self.output_files else 0
+
+
+def output_file_stats(path: str) -> Tuple[int, int]:
+    """
+    :return: the number and the total bytes of the data files in the folder, the marker and checksum files
+        (e.g. _SUCCESS, .part-0.crc) are skipped
+    """
+    files = [os.path.join(root, i) for root, _, names in os.walk(path) for i in names
+             if not i.startswith(('_', '.'))]
+    return len(files), sum(os.path.getsize(i) for i in files)
+
+
+def to_spark_value(dtype: DataType, value: Any) -> Any:
+    """
+    Convert the value decoded by `ABIDecoder` to the python value of the Spark type,
+    the numbers out of the precision of the decimals are null.
+    """
+    if value is None:
+        return None
+    if isinstance(dtype, DecimalType):
+        decimal = Decimal(value) if isinstance(value, int) else value
+        return decimal if decimal.adjusted() < dtype.precision - dtype.scale else None
+    if isinstance(dtype, StructType):
+        return tuple(to_spark_value(i.dataType, value.get(i.name)) for i in dtype.fields)
+    if isinstance(dtype, ArrayType):
+        return [to_spark_value(dtype.elementType, i) for i in value]
+    return value
+
+
+class SparkModelBenchmark:
+    """
+    Run the models generated by `SparkDbtCodeGenerator` on a local Spark against the parquet files of
+    stg_logs and stg_traces, and measure the rows per second, the task time and the output files of every model.
+    """
+
+    def __init__(
+            self,
+            spark: SparkSession,
+            generator: SparkDbtCodeGenerator,
+            output_dir: str,
+            decoder: UDFDecoder = UDFDecoder.PYTHON,
+            udf_jar: Optional[str] = None,
+            dt: Optional[str] = None
+    ):
+        """
+        :param output_dir: the output of every model is written into <output_dir>/<model_name>
+        :param udf_jar: the jar built by the codegen, it's required by the jar decoder
+        :param dt: only decode the dt like the incremental runs, all data is decoded by default
+        """
+        if decoder == UDFDecoder.JAR and udf_jar is None:
+            raise ValueError('the udf jar is required by the jar decoder.')
+        # the struct returned by a python UDF is fixed, it can't serve the schemas of many models
+        if decoder == UDFDecoder.PYTHON and generator.udf_mode == UDFMode.TABLE:
+            raise ValueError('the python decoder only supports the class udf mode.')
+
+        self.spark = spark
+        self.generator = generator
+        self.output_dir = output_dir
+        self.decoder = decoder
+        self.udf_jar = udf_jar
+        self.dt = dt
+        self.transformer = ABITransformer()
+        self.provider = SparkDataTypeProvider()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._loaded_sources = set()
+
+    def load_sources(self, logs_paths: Sequence[str] = (), traces_paths: Sequence[str] = ()) -> None:
+        if logs_paths:
+            self.spark.read.parquet(*logs_paths).createOrReplaceTempView('stg_logs')
+            self._loaded_sources.add('stg_logs')
+        if traces_paths:
+            self.spark.read.parquet(*traces_paths).createOrReplaceTempView('stg_traces')
+            self._loaded_sources.add('stg_traces')
+
+    def run(self, contracts: Sequence[Tuple[str, Contract]]) -> List[ModelBenchmark]:
+        """
+        :param contracts: (project_name, contract), the models whose source is not loaded are skipped
+        """
+        results = []
+        for project_name, contract in contracts:
+            abi = self.transformer.transform_abi(contract.abi, contract.include_read_only_calls)
+            schemas = (abi.nonempty_events if 'stg_logs' in self._loaded_sources else []) \
+                + (abi.nonempty_calls if 'stg_traces' in self._loaded_sources else [])
+            for schema in schemas:
+                self._register_udf(project_name, contract, schema)
+                results.append(self.run_model(project_name, contract, schema))
+        return results
+
+    def run_model(self, project_name: str, contract: Contract, schema: ABIModelSchema) -> ModelBenchmark:
+        if isinstance(schema, ABIEventSchema):
+            model_name = self.generator.evt_model_name(contract.name, schema, project_name)
+        else:
+            model_name = self.generator.call_model_name(contract.name, schema, project_name)
+
+        df = self.spark.sql(self._render(project_name, contract, schema))
+        writer = df.write.mode('overwrite').format('parquet')
+        if contract.materialize == 'increment':
+            writer = writer.partitionBy('dt')
+
+        output_path = os.path.join(self.output_dir, model_name)
+        sc = self.spark.sparkContext
+        sc.setJobGroup(model_name, f'benchmark {model_name}')
+        start = time.perf_counter()
+        try:
+            writer.save(output_path)
+        finally:
+            elapsed = time.perf_counter() - start
+            sc.setLocalProperty('spark.jobGroup.id', None)
+
+        tasks, task_seconds, task_cpu_seconds = self._task_metrics(model_name)
+        output_files, output_bytes = output_file_stats(output_path)
+        result = ModelBenchmark(
+            model_name=model_name,
+            # an empty model writes no data files, its schema can't be inferred from the output
+            rows=self.spark.read.schema(df.schema).parquet(output_path).count(),
+            wall_seconds=elapsed,
+            tasks=tasks,
+            task_seconds=task_seconds,
+            task_cpu_seconds=task_cpu_seconds,
+            output_files=output_files,
+            output_bytes=output_bytes
+        )
+        self.logger.info(f'{model_name}: {result.rows} rows in {elapsed:.2f}s ({result.rows_per_second:.0f} rows/s), '
+                         f'{output_files} files of {output_bytes} bytes')
+        return result
+
+    def _render(self, project_name: str, contract: Contract, schema: ABIModelSchema) -> str:
+        with tempfile.TemporaryDirectory() as tempdir:
+            project_path = os.path.join(tempdir, project_name)
+            pathlib.Path(project_path).mkdir()
+            if isinstance(schema, ABIEventSchema):
+                self.generator.gen_event_dbt_model(project_path, contract, '', schema)
+            else:
+                self.generator.gen_call_dbt_model(project_path, contract, '', schema)
+
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                renderer = DbtModelRenderer(
+                    dbt_vars={'dt': self.dt} if self.dt else None, incremental=self.dt is not None)
+                return renderer.render(f.read())
+
+    def _register_udf(self, project_name: str, contract: Contract, schema: ABIModelSchema) -> None:
+        function_name = self.generator._udf_function_name(project_name, contract.name, schema)
+        if self.decoder == UDFDecoder.JAR:
+            clazz_name = self.generator._udf_class_name(project_name, contract.name, schema)
+            self.spark.sql(f"create or replace temporary function {function_name} "
+                           f"as 'io.iftech.sparkudf.hive.{clazz_name}' using jar '{self.udf_jar}'")
+            return
+
+        decoder = ABIDecoder()
+        input_type = StructType([StructField(i.name, self.provider.transform(i.ftype)) for i in schema.inputs])
+        if isinstance(schema, ABIEventSchema):
+            return_type = StructType([StructField('input', input_type)])
+
+            def decode(data, topics, *args):
+                try:
+                    decoded = decoder.decode_event(schema, topics or [], bytes(data or b''))
+                except ABIDecodeError:
+                    return None
+                return to_spark_value(return_type, {'input': decoded})
+        else:
+            output_type = StructType([StructField(i.name, self.provider.transform(i.ftype)) for i in schema.outputs])
+            return_type = StructType([StructField('input', input_type), StructField('output', output_type)])
+
+            def decode(input_data, output_data, *args):
+                try:
+                    decoded = decoder.decode_call(schema, bytes(input_data or b''), output_data and bytes(output_data))
+                except ABIDecodeError:
+                    return None
+                return to_spark_value(return_type, {'input': decoded, 'output': decoded})
+
+        self.spark.udf.register(function_name, decode, return_type)
+
+    def _task_metrics(self, job_group: str) -> Tuple[int, Optional[float], Optional[float]]:
+        """
+        Sum the metrics of the stages of the jobs in the group from the status store of the SparkContext,
+        the store is private to Spark, so the time is None if it's not accessible.
+        """
+        sc = self.spark.sparkContext
+        tasks, run_ms, cpu_ns = 0, 0, 0
+        try:
+            # the status store is updated by the listener bus asynchronously
+            sc._jsc.sc().listenerBus().waitUntilEmpty()
+            store = sc._jsc.sc().statusStore()
+            for job_id in sc.statusTracker().getJobIdsForGroup(job_group):
+                job = sc.statusTracker().getJobInfo(job_id)
+                for stage_id in (job.stageIds if job is not None else []):
+                    try:
+                        # the defaults of stageData() can't be used by py4j and its arity changes across versions
+                        stage = store.lastStageAttempt(stage_id)
+                    except Py4JJavaError:
+                        # the stage is not submitted (e.g. skipped) or already evicted from the store
+                        continue
+                    tasks += stage.numCompleteTasks()
+                    run_ms += stage.executorRunTime()
+                    cpu_ns += stage.executorCpuTime()
+        except Py4JError as e:
+            self.logger.warning(f'the task metrics of {job_group} are not accessible: {e}')
+            return tasks, None, None
+        return tasks, run_ms / 1000, cpu_ns / 1e9
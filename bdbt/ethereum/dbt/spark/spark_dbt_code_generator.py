@@ -1,16 +1,31 @@
-import dataclasses
+import glob
+import hashlib
 import json
 import os.path
 import pathlib
+import shutil
 import subprocess
 import xml.etree.ElementTree as ET
+import math
+import zlib
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Optional, Union, Dict, Mapping
 
-from eth_utils import event_abi_to_log_topic, encode_hex, function_abi_to_4byte_selector
-
-from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABICallSchema
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABICallSchema, ABIField
 from bdbt.ethereum.abi.provider.hive_object_inspector_type_provider import HiveObjectInspectorTypeProvider
-from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator
-from bdbt.global_type import Contract
+from bdbt.ethereum.abi.provider.hive_type_string_provider import HiveTypeStringProvider
+from bdbt.ethereum.abi.utils import event_selector, call_selector
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEvents, consolidated_event_columns, \
+    consolidated_event_materialize, consolidated_model_alias
+from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator, UDFDescriptor
+from bdbt.ethereum.dbt.shared_event import SharedEvent, shared_project_name
+from bdbt.ethereum.dbt.spark.decode_metrics import decode_metrics_log_prefix
+from bdbt.ethereum.dbt.dbt_schema_generator import evt_base_column, call_base_column
+from bdbt.ethereum.dbt.model_version import ModelVersion, ABIModelSchema, union_fields
+from mashumaro import DataClassDictMixin
+
+from bdbt.global_type import Contract, LayoutOptions, TraceFilter, SizeClass
 
 event_clazz_template = """package io.iftech.sparkudf.hive;
 
@@ -18,6 +33,7 @@ import java.util.List;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspectorFactory;
 import org.apache.hadoop.hive.serde2.objectinspector.primitive.PrimitiveObjectInspectorFactory;
+import org.apache.hadoop.hive.serde2.typeinfo.TypeInfoFactory;
 import org.sparkproject.guava.collect.ImmutableList;
 
 public class {{CLASS_NAME}} extends DecodeContractEventHiveUDF {
@@ -31,7 +47,7 @@ public class {{CLASS_NAME}} extends DecodeContractEventHiveUDF {
     public List<ObjectInspector> getInputDataFieldsOIs() {
         return ImmutableList.of({{OBJECT_INSPECTORS}});
     }
-}
+{{DECODE_METRICS}}}
 """
 
 call_clazz_template = """package io.iftech.sparkudf.hive;
@@ -40,6 +56,7 @@ import java.util.List;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspectorFactory;
 import org.apache.hadoop.hive.serde2.objectinspector.primitive.PrimitiveObjectInspectorFactory;
+import org.apache.hadoop.hive.serde2.typeinfo.TypeInfoFactory;
 import org.sparkproject.guava.collect.ImmutableList;
 
 public class {{CLASS_NAME}} extends DecodeContractFunctionHiveUDF {
@@ -63,18 +80,279 @@ public class {{CLASS_NAME}} extends DecodeContractFunctionHiveUDF {
     public List<ObjectInspector> getOutputDataFieldsOIs() {
         return ImmutableList.of({{OUTPUT_OBJECT_INSPECTORS}});
     }
+{{DECODE_METRICS}}}
+"""
+
+udf_schemas_clazz_template = """package io.iftech.sparkudf.hive;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import org.apache.hadoop.hive.ql.exec.UDFArgumentException;
+import org.apache.hadoop.hive.serde2.objectinspector.ConstantObjectInspector;
+import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
+import org.apache.hadoop.hive.serde2.typeinfo.TypeInfoUtils;
+
+public final class {{CLASS_NAME}} {
+
+    public static final class Fields {
+        public final List<String> names = new ArrayList<>();
+        public final List<ObjectInspector> objectInspectors = new ArrayList<>();
+    }
+
+    private static final String RESOURCE = "/{{RESOURCE_PATH}}";
+    private static Map<String, JsonNode> schemas;
+
+    private {{CLASS_NAME}}() {
+    }
+
+    public static String schemaId(ObjectInspector[] arguments) throws UDFArgumentException {
+        ObjectInspector oi = arguments[arguments.length - 1];
+        if (!(oi instanceof ConstantObjectInspector)) {
+            throw new UDFArgumentException("The last argument should be the constant schema id.");
+        }
+        return ((ConstantObjectInspector) oi).getWritableConstantValue().toString();
+    }
+
+    public static Fields inputs(String id) throws UDFArgumentException {
+        return fields(get(id).get("inputs"));
+    }
+
+    public static Fields outputs(String id) throws UDFArgumentException {
+        return fields(get(id).get("outputs"));
+    }
+
+    private static Fields fields(JsonNode node) {
+        Fields fields = new Fields();
+        for (JsonNode field : node) {
+            fields.names.add(field.get("name").asText());
+            fields.objectInspectors.add(TypeInfoUtils.getStandardWritableObjectInspectorFromTypeInfo(
+                TypeInfoUtils.getTypeInfoFromTypeString(field.get("type").asText())));
+        }
+        return fields;
+    }
+
+    private static synchronized JsonNode get(String id) throws UDFArgumentException {
+        if (schemas == null) {
+            schemas = load();
+        }
+        JsonNode schema = schemas.get(id);
+        if (schema == null) {
+            throw new UDFArgumentException("The schema " + id + " can not be found in " + RESOURCE);
+        }
+        return schema;
+    }
+
+    private static Map<String, JsonNode> load() throws UDFArgumentException {
+        Map<String, JsonNode> result = new HashMap<>();
+        ObjectMapper mapper = new ObjectMapper();
+        try (InputStream in = {{CLASS_NAME}}.class.getResourceAsStream(RESOURCE)) {
+            if (in == null) {
+                throw new UDFArgumentException(RESOURCE + " can not be found in the jar.");
+            }
+            BufferedReader reader = new BufferedReader(new InputStreamReader(in, StandardCharsets.UTF_8));
+            String line;
+            while ((line = reader.readLine()) != null) {
+                JsonNode schema = mapper.readTree(line);
+                result.put(schema.get("id").asText(), schema);
+            }
+        } catch (IOException e) {
+            throw new UDFArgumentException("Failed to load " + RESOURCE + ": " + e.getMessage());
+        }
+        return result;
+    }
 }
 """
 
+table_event_clazz_template = """package io.iftech.sparkudf.hive;
+
+import java.util.Arrays;
+import java.util.List;
+import org.apache.hadoop.hive.ql.exec.UDFArgumentException;
+import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
+
+public class {{CLASS_NAME}} extends DecodeContractEventHiveUDF {
+
+    private String schemaId;
+    private {{SCHEMAS_CLASS_NAME}}.Fields inputs;
+
+    @Override
+    public ObjectInspector initialize(ObjectInspector[] arguments) throws UDFArgumentException {
+        // the schema id is the last argument, it's not passed to the decoder
+        schemaId = {{SCHEMAS_CLASS_NAME}}.schemaId(arguments);
+        inputs = {{SCHEMAS_CLASS_NAME}}.inputs(schemaId);
+        return super.initialize(Arrays.copyOf(arguments, arguments.length - 1));
+    }
+
+    @Override
+    public List<String> getInputDataFieldsName() {
+        return inputs.names;
+    }
+
+    @Override
+    public List<ObjectInspector> getInputDataFieldsOIs() {
+        return inputs.objectInspectors;
+    }
+{{DECODE_METRICS}}}
+"""
+
+table_call_clazz_template = """package io.iftech.sparkudf.hive;
+
+import java.util.Arrays;
+import java.util.List;
+import org.apache.hadoop.hive.ql.exec.UDFArgumentException;
+import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
+
+public class {{CLASS_NAME}} extends DecodeContractFunctionHiveUDF {
+
+    private String schemaId;
+    private {{SCHEMAS_CLASS_NAME}}.Fields inputs;
+    private {{SCHEMAS_CLASS_NAME}}.Fields outputs;
+
+    @Override
+    public ObjectInspector initialize(ObjectInspector[] arguments) throws UDFArgumentException {
+        // the schema id is the last argument, it's not passed to the decoder
+        schemaId = {{SCHEMAS_CLASS_NAME}}.schemaId(arguments);
+        inputs = {{SCHEMAS_CLASS_NAME}}.inputs(schemaId);
+        outputs = {{SCHEMAS_CLASS_NAME}}.outputs(schemaId);
+        return super.initialize(Arrays.copyOf(arguments, arguments.length - 1));
+    }
+
+    @Override
+    public List<String> getInputDataFieldsName() {
+        return inputs.names;
+    }
+
+    @Override
+    public List<ObjectInspector> getInputDataFieldsOIs() {
+        return inputs.objectInspectors;
+    }
+
+    @Override
+    public List<String> getOutputDataFieldsName() {
+        return outputs.names;
+    }
+
+    @Override
+    public List<ObjectInspector> getOutputDataFieldsOIs() {
+        return outputs.objectInspectors;
+    }
+{{DECODE_METRICS}}}
+"""
+
+# The counters of the decoding, the UDFs are recreated by the executors from the serialized plan, so the counters
+# are kept per JVM and logged as the cumulative values instead of being sent back by the accumulators.
+decode_metrics_clazz_template = """package io.iftech.sparkudf.hive;
+
+import java.lang.management.ManagementFactory;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.atomic.AtomicLong;
+import org.apache.hadoop.hive.ql.metadata.HiveException;
+import org.apache.hadoop.hive.ql.udf.generic.GenericUDF.DeferredObject;
+import org.apache.hadoop.io.BytesWritable;
+
+public final class {{CLASS_NAME}} {
+
+    private static final String PREFIX = "{{LOG_PREFIX}}";
+    private static final long LOG_INTERVAL_ROWS = {{LOG_INTERVAL_ROWS}}L;
+    // the name and the start time tell the executors apart, even if their pids are reused
+    private static final String JVM = ManagementFactory.getRuntimeMXBean().getName()
+        + "@" + ManagementFactory.getRuntimeMXBean().getStartTime();
+    private static final Map<String, {{CLASS_NAME}}> METRICS = new ConcurrentHashMap<>();
+
+    static {
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> METRICS.values().forEach({{CLASS_NAME}}::log)));
+    }
+
+    private final String udf;
+    private final AtomicLong rows = new AtomicLong();
+    private final AtomicLong failures = new AtomicLong();
+    private final AtomicLong bytesIn = new AtomicLong();
+    private final AtomicLong decodeNanos = new AtomicLong();
+
+    private {{CLASS_NAME}}(String udf) {
+        this.udf = udf;
+    }
+
+    public static {{CLASS_NAME}} of(String udf) {
+        return METRICS.computeIfAbsent(udf, {{CLASS_NAME}}::new);
+    }
+
+    public static long bytes(DeferredObject[] arguments, int count) throws HiveException {
+        long result = 0;
+        for (int i = 0; i < count && i < arguments.length; i++) {
+            Object value = arguments[i].get();
+            if (value instanceof byte[]) {
+                result += ((byte[]) value).length;
+            } else if (value instanceof BytesWritable) {
+                result += ((BytesWritable) value).getLength();
+            }
+        }
+        return result;
+    }
+
+    public void record(long bytes, long nanos, boolean failed) {
+        bytesIn.addAndGet(bytes);
+        decodeNanos.addAndGet(nanos);
+        if (failed) {
+            failures.incrementAndGet();
+        }
+        if (rows.incrementAndGet() % LOG_INTERVAL_ROWS == 0) {
+            log();
+        }
+    }
+
+    public void log() {
+        // stderr is kept in the executor logs regardless of the log4j confs
+        System.err.println(String.format(
+            "%s {\\"udf\\":\\"%s\\",\\"jvm\\":\\"%s\\",\\"rows\\":%d,\\"failures\\":%d,"
+                + "\\"bytes_in\\":%d,\\"decode_nanos\\":%d}",
+            PREFIX, udf, JVM, rows.get(), failures.get(), bytesIn.get(), decodeNanos.get()));
+    }
+}
+"""
+
+# The override of the generated UDFs to record the counters, a null result is a failed row.
+decode_metrics_method_template = """
+    private transient {{METRICS_CLASS_NAME}} metrics;
+
+    @Override
+    public Object evaluate(DeferredObject[] arguments) throws org.apache.hadoop.hive.ql.metadata.HiveException {
+        if (metrics == null) {
+            metrics = {{METRICS_CLASS_NAME}}.of({{METRICS_NAME}});
+        }
+        long bytes = {{METRICS_CLASS_NAME}}.bytes(arguments, {{BYTES_ARGUMENTS}});
+        long start = System.nanoTime();
+        Object result;
+        try {
+            result = super.evaluate(arguments);
+        } catch (org.apache.hadoop.hive.ql.metadata.HiveException | RuntimeException e) {
+            metrics.record(bytes, System.nanoTime() - start, true);
+            throw e;
+        }
+        metrics.record(bytes, System.nanoTime() - start, result == null);
+        return result;
+    }
+"""
+
 empty_event_dbt_model_sql_template = """{{
     config(
         {{MODEL_MATERIALIZED_CONFIG}},
-        file_format='parquet',
+        file_format='parquet',{{MODEL_LAYOUT_CONFIG}}
         alias='{{MODEL_ALIAS}}'
     )
 }}
 
-select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */
+select /*+ {{MODEL_PARTITION_HINT}} */
     block_number as evt_block_number,
     block_timestamp as evt_block_time,
     log_index as evt_index,
@@ -84,19 +362,14 @@ select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */
 from {{ ref('stg_logs') }}
 where {{SELECT_CONDITION}}
 
-{% if is_incremental() %}
-  and dt = '{{ var("dt") }}'
-{% endif %}
+{{MODEL_DT_FILTER}}{{MODEL_SORT_BY}}
 """
 
 event_dbt_model_sql_template = """{{
     config(
         {{MODEL_MATERIALIZED_CONFIG}},
-        file_format='parquet',
-        alias='{{MODEL_ALIAS}}',
-        pre_hook={
-            'sql': 'create or replace function {{UDF_NAME}} as "io.iftech.sparkudf.hive.{{CLASS_NAME}}" using jar "{{UDF_JAR_PATH}}";'
-        }
+        file_format='parquet',{{MODEL_LAYOUT_CONFIG}}
+        alias='{{MODEL_ALIAS}}'
     )
 }}
 
@@ -108,13 +381,11 @@ with base as (
         transaction_hash as evt_tx_hash,
         address as contract_address,
         dt,
-        {{UDF_NAME}}(unhex_data, topics_arr, '{{EVENT_ABI}}', '{{EVENT_NAME}}') as data
-    from {{ ref('stg_logs') }}
+        {{DATA_COLUMN}}
+    from {{ ref('stg_logs') }}{{DATA_LATERAL_VIEW}}
     where {{SELECT_CONDITION}}
 
-    {% if is_incremental() %}
-      and dt = '{{ var("dt") }}'
-    {% endif %}
+    {{MODEL_DT_FILTER}}
 ),
 
 final as (
@@ -129,19 +400,19 @@ final as (
     from base
 )
 
-select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */ *
-from final
+select /*+ {{MODEL_PARTITION_HINT}} */ *
+from final{{MODEL_SORT_BY}}
 """
 
 empty_call_dbt_model_sql_template = """{{
     config(
         {{MODEL_MATERIALIZED_CONFIG}},
-        file_format='parquet',
+        file_format='parquet',{{MODEL_LAYOUT_CONFIG}}
         alias='{{MODEL_ALIAS}}'
     )
 }}
 
-select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */
+select /*+ {{MODEL_PARTITION_HINT}} */
     status==1 as call_success,
     block_number as call_block_number,
     block_timestamp as call_block_time,
@@ -152,19 +423,14 @@ select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */
 from {{ ref('stg_traces') }}
 where {{SELECT_CONDITION}}
 
-{% if is_incremental() %}
-  and dt = '{{ var("dt") }}'
-{% endif %}
+{{MODEL_DT_FILTER}}{{MODEL_SORT_BY}}
 """
 
 call_dbt_model_sql_template = """{{
     config(
         {{MODEL_MATERIALIZED_CONFIG}},
-        file_format='parquet',
-        alias='{{MODEL_ALIAS}}',
-        pre_hook={
-            'sql': 'create or replace function {{UDF_NAME}} as "io.iftech.sparkudf.hive.{{CLASS_NAME}}" using jar "{{UDF_JAR_PATH}}";'
-        }
+        file_format='parquet',{{MODEL_LAYOUT_CONFIG}}
+        alias='{{MODEL_ALIAS}}'
     )
 }}
 
@@ -177,13 +443,11 @@ with base as (
         transaction_hash as call_tx_hash,
         to_address as contract_address,
         dt,
-        {{UDF_NAME}}(unhex_input, unhex_output, '{{CALL_ABI}}', '{{CALL_NAME}}') as data
-    from {{ ref('stg_traces') }}
+        {{DATA_COLUMN}}
+    from {{ ref('stg_traces') }}{{DATA_LATERAL_VIEW}}
     where {{SELECT_CONDITION}}
 
-    {% if is_incremental() %}
-      and dt = '{{ var("dt") }}'
-    {% endif %}
+    {{MODEL_DT_FILTER}}
 ),
 
 final as (
@@ -199,20 +463,283 @@ final as (
     from base
 )
 
-select /*+ REPARTITION({{MODEL_REPARTITION_COUNT}}) */ *
-from final
+select /*+ {{MODEL_PARTITION_HINT}} */ *
+from final{{MODEL_SORT_BY}}
+"""
+
+shared_event_view_dbt_model_sql_template = """{{
+    config(
+        materialized='view',
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+select
+    evt_block_number,
+    evt_block_time,
+    evt_index,
+    evt_tx_hash,
+    contract_address,
+    dt,
+    {{INPUT_FIELDS}}
+from {{ ref('{{SHARED_MODEL_NAME}}') }}
+where contract_address = lower("{{CONTRACT_ADDRESS}}")
+"""
+
+consolidated_event_dbt_model_sql_template = """{{
+    config(
+        {{MODEL_MATERIALIZED_CONFIG}},
+        file_format='parquet',{{MODEL_LAYOUT_CONFIG}}
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+with base as (
+    select
+        block_number as evt_block_number,
+        block_timestamp as evt_block_time,
+        log_index as evt_index,
+        transaction_hash as evt_tx_hash,
+        address as contract_address,
+        dt,
+        case
+            {{CONTRACT_NAME_CASES}}
+        end as contract_name,
+        case
+            {{EVENT_NAME_CASES}}
+        end as event_name,
+        unhex_data,
+        topics_arr
+    from {{ ref('stg_logs') }}
+    where ({{SELECT_CONDITIONS}})
+
+    {{MODEL_DT_FILTER}}
+),
+
+final as (
+    select
+        evt_block_number,
+        evt_block_time,
+        evt_index,
+        evt_tx_hash,
+        contract_address,
+        dt,
+        contract_name,
+        event_name,
+        case
+            {{PAYLOAD_CASES}}
+        end as payload
+    from base
+)
+
+select /*+ {{MODEL_PARTITION_HINT}} */ *
+from final{{MODEL_SORT_BY}}
+"""
+
+consolidated_event_view_dbt_model_sql_template = """{{
+    config(
+        materialized='view',
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+with consolidated as (
+    select
+        evt_block_number,
+        evt_block_time,
+        evt_index,
+        evt_tx_hash,
+        contract_address,
+        dt,
+        from_json(payload, '{{PAYLOAD_SCHEMA}}') as data
+    from {{ ref('{{CONSOLIDATED_MODEL_NAME}}') }}
+    where contract_name = '{{CONTRACT_NAME}}' and event_name = '{{EVENT_NAME}}'
+)
+
+select
+    evt_block_number,
+    evt_block_time,
+    evt_index,
+    evt_tx_hash,
+    contract_address,
+    dt,
+    {{INPUT_FIELDS}}
+from consolidated
+"""
+
+versioned_view_dbt_model_sql_template = """{{
+    config(
+        materialized='view',
+        alias='{{MODEL_ALIAS}}'
+    )
+}}
+
+{{VERSION_SELECTS}}
 """
 
+version_select_sql_template = """select
+    {{BASE_FIELDS}},
+    {{FIELDS}}
+from {{ ref('{{VERSION_MODEL_NAME}}') }}"""
+
+udf_registration_macro_template = """{% macro {{MACRO_NAME}}() %}
+{#- Register the UDFs of the selected codegen models once before the run, instead of in every model. -#}
+{% if execute %}
+    {% set udfs = [
+        {{UDF_STATEMENTS}}
+    ] %}
+
+    {% set selected_models = [] %}
+    {% if selected_resources is defined %}
+        {% for unique_id in selected_resources %}
+            {% do selected_models.append(unique_id.split('.')[-1]) %}
+        {% endfor %}
+    {% endif %}
+
+    {#- the UDFs without a model name are shared by all models -#}
+    {% for model_name, statement in udfs %}
+        {% if model_name is none or selected_resources is not defined or model_name in selected_models %}
+            {% do run_query(statement) %}
+        {% endif %}
+    {% endfor %}
+{% endif %}
+{% endmacro %}
+"""
+
+udf_registration_macro_name = 'register_codegen_udfs'
+
+udf_package_path = 'io/iftech/sparkudf/hive'
+
+# The fixed UDF classes and the schema resource of the table udf mode.
+udf_schemas_clazz_name = 'CodegenUDFSchemas'
+table_event_udf_clazz_name = 'CodegenEventDecodeUDF'
+table_call_udf_clazz_name = 'CodegenCallDecodeUDF'
+udf_schemas_resource_name = 'codegen_udf_schemas.jsonl'
+
+# The class of the decode counters and the number of rows between two log lines of every UDF in a JVM.
+decode_metrics_clazz_name = 'CodegenDecodeMetrics'
+decode_metrics_log_interval_rows = 100000
+
 table_model_config = "materialized='table'"
 increment_model_config = "materialized='incremental', incremental_strategy='insert_overwrite', partition_by=['dt']"
 
 
+advisory_partition_size_conf = 'spark.sql.adaptive.advisoryPartitionSizeInBytes'
+shuffle_partitions_conf = 'spark.sql.shuffle.partitions'
+
+# The session confs of the models by the size class, the medium models run with the confs of the session.
+default_session_confs: Dict[SizeClass, Dict[str, str]] = {
+    SizeClass.SMALL: {
+        shuffle_partitions_conf: '8',
+        'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+        advisory_partition_size_conf: str(64 * 1024 * 1024),
+    },
+    SizeClass.MEDIUM: {},
+    SizeClass.LARGE: {
+        shuffle_partitions_conf: '1000',
+        'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+        'spark.sql.adaptive.skewJoin.enabled': 'true',
+        advisory_partition_size_conf: str(256 * 1024 * 1024),
+    },
+}
+
+# The default advisory partition size of Spark.
+default_advisory_partition_size = 64 * 1024 * 1024
+max_shuffle_partitions = 2000
+
+
+@dataclass(frozen=True)
+class ModelStats(DataClassDictMixin):
+    """
+    The statistics of a model collected from the previous runs, they tune the session confs of the model
+    more precisely than the size class.
+    """
+    # the bytes of the source data scanned for one dt
+    daily_bytes: Optional[int] = None
+    # the confs set explicitly, they override the others
+    conf: Optional[Dict[str, str]] = None
+
+
+def load_model_stats(filepath: str) -> Dict[str, ModelStats]:
+    """
+    :param filepath: a json file of model_name -> stats
+    """
+    with open(filepath, 'r') as f:
+        return {k: ModelStats.from_dict(v) for k, v in json.load(f).items()}
+
+
+def _filter_columns(names: Optional[List[str]], columns: List[str]) -> List[str]:
+    """
+    Keep the names in the columns of the model, they are matched case-insensitively like Spark.
+    """
+    name_to_column = {i.lower(): i for i in columns}
+    return [name_to_column[i.lower()] for i in names or [] if i.lower() in name_to_column]
+
+
+class UDFJarLayout(Enum):
+    # one jar contains the runtime and the UDFs of all projects
+    SINGLE = 'single'
+    # a shared base jar with the runtime, and one thin jar with the UDFs for every project
+    PROJECT = 'project'
+    # a shared base jar with the runtime, and the UDFs of projects are hashed into a fixed number of thin jars
+    SHARD = 'shard'
+
+
+class UDFMode(Enum):
+    # one generated java class for every event and call
+    CLASS = 'class'
+    # a few fixed java classes look up the schemas of the events and calls from a resource in the jar by the model name,
+    # so the compile time of the jar doesn't grow with the number of models
+    TABLE = 'table'
+
+
 class SparkDbtCodeGenerator(DbtCodeGenerator):
-    hive_provider = HiveObjectInspectorTypeProvider()
+    support_consolidated_events = True
 
-    def __init__(self, remote_workspace: str):
+    def __init__(
+            self,
+            remote_workspace: str,
+            jar_layout: UDFJarLayout = UDFJarLayout.SINGLE,
+            jar_shards: int = 16,
+            wide_int_as_string: bool = False,
+            single_decode: bool = False,
+            layout: Optional[LayoutOptions] = None,
+            udf_mode: UDFMode = UDFMode.CLASS,
+            session_tuning: bool = False,
+            session_confs: Optional[Mapping[SizeClass, Mapping[str, str]]] = None,
+            model_stats: Optional[Mapping[str, ModelStats]] = None,
+            decode_metrics: bool = False
+    ):
+        """
+        :param single_decode: decode the data in a lateral view, Spark can't inline the UDF into the projection
+            of every field (CollapseProject), so the UDF is evaluated once per row.
+        :param layout: the global layout options of the tables, they are overridden by the options of the contracts.
+        :param udf_mode: generate one java class for every model, or one schema resource for the fixed classes.
+        :param session_tuning: set the session confs of every model in its hooks by its size class and its stats.
+        :param session_confs: override the default session confs of the size classes
+        :param model_stats: model_name -> stats
+        :param decode_metrics: count the rows, the failures, the input bytes and the time of every UDF,
+            the counters are logged by the executors and summarized by `bdbt ethereum_decode_metrics`.
+        """
         super(SparkDbtCodeGenerator, self).__init__(True)
+        if jar_layout == UDFJarLayout.SHARD and jar_shards <= 0:
+            raise ValueError('the number of jar shards should be more than 0.')
+        # the schema resource is packaged into the base jar, the thin jars would need to be rebuilt with it
+        if udf_mode == UDFMode.TABLE and jar_layout != UDFJarLayout.SINGLE:
+            raise ValueError('the table udf mode only supports the single jar layout.')
+
         self.remote_workspace = remote_workspace
+        self.jar_layout = jar_layout
+        self.jar_shards = jar_shards
+        self.hive_provider = HiveObjectInspectorTypeProvider(wide_int_as_string=wide_int_as_string)
+        self.hive_type_provider = HiveTypeStringProvider(wide_int_as_string=wide_int_as_string)
+        self.single_decode = single_decode
+        self.layout = layout or LayoutOptions()
+        self.udf_mode = udf_mode
+        self.session_tuning = session_tuning
+        self.session_confs = {**default_session_confs, **(session_confs or {})}
+        self.model_stats = model_stats or {}
+        self.decode_metrics = decode_metrics
 
     def gen_event_dbt_model(
             self,
@@ -221,32 +748,151 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
             version: str,
             event: ABIEventSchema
     ) -> None:
-        contract_name = contract.name
-        contract_materialize = contract.materialize
+        self._gen_event_dbt_model(
+            project_path=project_path,
+            contract_name=contract.name,
+            materialize=contract.materialize,
+            layout=self.layout.merge(contract.layout),
+            event=event,
+            select_condition=self._evt_condition_selector(contract, event),
+            size_class=contract.size_class
+        )
+
+    def gen_shared_event_dbt_model(
+            self,
+            project_path: str,
+            version: str,
+            shared_event: SharedEvent
+    ) -> None:
+        self._gen_event_dbt_model(
+            project_path=project_path,
+            contract_name=shared_event.contract_name,
+            materialize=shared_event.materialize,
+            layout=self.layout,
+            event=shared_event.event,
+            select_condition=self._shared_evt_condition_selector(shared_event),
+            size_class=shared_event.size_class
+        )
 
+    def gen_shared_event_view_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema,
+            shared_event: SharedEvent
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        filepath = os.path.join(project_path, self.evt_model_name(contract.name, event, project_name) + '.sql')
+
+        # the fields of the member are mapped to the shared event by position,
+        # they are quoted because the field names like `from` are the keywords of Spark SQL
+        input_fields = ', '.join(
+            [f'`{i.name}` as `{j.name}`' for i, j in zip(shared_event.event.inputs, event.inputs)])
+        content = shared_event_view_dbt_model_sql_template \
+            .replace('{{MODEL_ALIAS}}', self.evt_model_name(contract.name, event).lower()) \
+            .replace('{{SHARED_MODEL_NAME}}',
+                     self.evt_model_name(shared_event.contract_name, shared_event.event, shared_project_name)) \
+            .replace('{{CONTRACT_ADDRESS}}', contract.address) \
+            .replace('{{INPUT_FIELDS}}', input_fields)
+
+        self.create_file_and_write(filepath, content)
+
+    def _gen_event_dbt_model(
+            self,
+            project_path: str,
+            contract_name: str,
+            materialize: str,
+            layout: LayoutOptions,
+            event: ABIEventSchema,
+            select_condition: str,
+            alias: Optional[str] = None,
+            size_class: SizeClass = SizeClass.MEDIUM
+    ) -> None:
         project_name = pathlib.Path(project_path).name
-        filepath = os.path.join(project_path, self.evt_model_name(contract_name, event, project_name) + '.sql')
+        model_name = self.evt_model_name(contract_name, event, project_name)
+        filepath = os.path.join(project_path, model_name + '.sql')
+        columns = evt_base_column + [i.name for i in event.inputs]
+        alias = alias or self.evt_model_name(contract_name, event).lower()
 
         if event.is_empty:
             content = event_dbt_model_sql_template \
-                .replace('{{SELECT_CONDITION}}', self._evt_condition_selector(contract, event)) \
-                .replace('{{MODEL_ALIAS}}', self.evt_model_name(contract_name, event).lower()) \
-                .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(contract_materialize)) \
-                .replace('{{MODEL_REPARTITION_COUNT}}', self._repartition_count(contract_materialize))
+                .replace('{{SELECT_CONDITION}}', select_condition) \
+                .replace('{{MODEL_ALIAS}}', alias)
         else:
-            clazz_name = self._event_udf_class_name(project_name, contract_name, event)
+            udf_call = self._evt_udf_call(project_name, contract_name, event)
             content = event_dbt_model_sql_template \
-                .replace('{{UDF_NAME}}', clazz_name.lower()) \
-                .replace('{{CLASS_NAME}}', clazz_name) \
-                .replace('{{UDF_JAR_PATH}}', os.path.join(self.remote_workspace, self._jar_name(version))) \
-                .replace('{{EVENT_ABI}}', json.dumps(event.raw_schema.to_dict(omit_none=True))) \
-                .replace('{{EVENT_NAME}}', event.name) \
-                .replace('{{SELECT_CONDITION}}', self._evt_condition_selector(contract, event)) \
-                .replace('{{MODEL_ALIAS}}', self.evt_model_name(contract_name, event).lower()) \
-                .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(contract_materialize)) \
-                .replace('{{MODEL_REPARTITION_COUNT}}', self._repartition_count(contract_materialize)) \
+                .replace('{{DATA_COLUMN}}', self._data_column(udf_call)) \
+                .replace('{{DATA_LATERAL_VIEW}}', self._data_lateral_view(udf_call)) \
+                .replace('{{SELECT_CONDITION}}', select_condition) \
+                .replace('{{MODEL_ALIAS}}', alias) \
                 .replace('{{INPUT_FIELDS}}', self._evt_original_field_selector(event))
 
+        content = self._replace_physical_config(
+            content, materialize, layout, columns, self._session_conf(model_name, size_class))
+        self.create_file_and_write(filepath, content)
+
+    def gen_consolidated_event_dbt_model(
+            self,
+            project_path: str,
+            version: str,
+            consolidated_events: ConsolidatedEvents
+    ) -> None:
+        project_name = consolidated_events.project_name
+        model_name = consolidated_events.model_name
+        filepath = os.path.join(project_path, model_name + '.sql')
+        columns = evt_base_column + consolidated_event_columns
+        # the rows of a member are kept together, the views skip the row groups of the others by the statistics
+        layout = self.layout.merge(
+            LayoutOptions(sort_by=['contract_name', 'event_name'] + (self.layout.sort_by or [])))
+
+        conditions = [self._evt_address_condition_selector(i.address, i.event) for i in consolidated_events.members]
+        contract_name_cases = []
+        event_name_cases = []
+        payload_cases = []
+        for condition, member in zip(conditions, consolidated_events.members):
+            contract_name_cases.append(f"when {condition} then '{member.contract_name}'")
+            event_name_cases.append(f"when {condition} then '{member.event.name}'")
+            # the UDF is only evaluated for the rows of its event
+            payload_cases.append(
+                f"when contract_name = '{member.contract_name}' and event_name = '{member.event.name}' "
+                f"then to_json({self._evt_udf_call(project_name, member.contract_name, member.event)}.input)")
+
+        case_separator = '\n            '
+        content = consolidated_event_dbt_model_sql_template \
+            .replace('{{CONTRACT_NAME_CASES}}', case_separator.join(contract_name_cases)) \
+            .replace('{{EVENT_NAME_CASES}}', case_separator.join(event_name_cases)) \
+            .replace('{{PAYLOAD_CASES}}', case_separator.join(payload_cases)) \
+            .replace('{{SELECT_CONDITIONS}}', '\n        or '.join(f'({i})' for i in conditions)) \
+            .replace('{{MODEL_ALIAS}}', consolidated_model_alias)
+
+        content = self._replace_physical_config(
+            content, consolidated_event_materialize, layout, columns,
+            self._session_conf(model_name, consolidated_events.size_class))
+        self.create_file_and_write(filepath, content)
+
+    def gen_consolidated_event_view_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            event: ABIEventSchema,
+            consolidated_events: ConsolidatedEvents
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        filepath = os.path.join(project_path, self.evt_model_name(contract.name, event, project_name) + '.sql')
+
+        # the field names of the structs decoded by the UDFs are lower case
+        payload_schema = 'struct<' + ','.join(
+            f'`{i.name.lower()}`:{self.hive_type_provider.transform(i.ftype).lower()}' for i in event.inputs) + '>'
+        content = consolidated_event_view_dbt_model_sql_template \
+            .replace('{{MODEL_ALIAS}}', self.evt_model_name(contract.name, event).lower()) \
+            .replace('{{PAYLOAD_SCHEMA}}', payload_schema) \
+            .replace('{{CONSOLIDATED_MODEL_NAME}}', consolidated_events.model_name) \
+            .replace('{{CONTRACT_NAME}}', contract.name) \
+            .replace('{{EVENT_NAME}}', event.name) \
+            .replace('{{INPUT_FIELDS}}', self._evt_original_field_selector(event, prefix='data.'))
+
         self.create_file_and_write(filepath, content)
 
     def gen_call_dbt_model(
@@ -255,38 +901,134 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
             contract: Contract,
             version: str,
             call: ABICallSchema
+    ) -> None:
+        self._gen_call_dbt_model(project_path, contract, call, self._call_condition_selector(contract, call))
+
+    def _gen_call_dbt_model(
+            self,
+            project_path: str,
+            contract: Contract,
+            call: ABICallSchema,
+            select_condition: str,
+            alias: Optional[str] = None
     ) -> None:
         contract_name = contract.name
         contract_materialize = contract.materialize
 
         project_name = pathlib.Path(project_path).name
-        filepath = os.path.join(project_path, self.call_model_name(contract_name, call, project_name) + '.sql')
+        model_name = self.call_model_name(contract_name, call, project_name)
+        filepath = os.path.join(project_path, model_name + '.sql')
+        columns = call_base_column + [i.name for i in call.inputs] + [i.name for i in call.outputs]
+        alias = alias or self.call_model_name(contract_name, call).lower()
 
         if call.is_empty:
             content = empty_call_dbt_model_sql_template \
-                .replace('{{SELECT_CONDITION}}', self._call_condition_selector(contract, call)) \
-                .replace('{{MODEL_ALIAS}}', self.call_model_name(contract_name, call).lower()) \
-                .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(contract_materialize)) \
-                .replace('{{MODEL_REPARTITION_COUNT}}', self._repartition_count(contract_materialize))
+                .replace('{{SELECT_CONDITION}}', select_condition) \
+                .replace('{{MODEL_ALIAS}}', alias)
         else:
-            clazz_name = self._call_udf_class_name(project_name, contract_name, call)
+            udf_call = f"{self._udf_function_name(project_name, contract_name, call)}(unhex_input, " \
+                       f"{self._output_column(contract.trace_filter)}, " \
+                       f"'{json.dumps(call.raw_schema.to_dict(omit_none=True))}', '{call.name}'" \
+                       f"{self._udf_schema_id_arg(self.call_model_name(contract_name, call, project_name))})"
             content = call_dbt_model_sql_template \
-                .replace('{{UDF_NAME}}', clazz_name.lower()) \
-                .replace('{{CLASS_NAME}}', clazz_name) \
-                .replace('{{UDF_JAR_PATH}}', os.path.join(self.remote_workspace, self._jar_name(version))) \
-                .replace('{{CALL_ABI}}', json.dumps(call.raw_schema.to_dict(omit_none=True))) \
-                .replace('{{CALL_NAME}}', call.name) \
-                .replace('{{SELECT_CONDITION}}', self._call_condition_selector(contract, call)) \
-                .replace('{{MODEL_ALIAS}}', self.call_model_name(contract_name, call).lower()) \
-                .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(contract_materialize)) \
-                .replace('{{MODEL_REPARTITION_COUNT}}', self._repartition_count(contract_materialize)) \
+                .replace('{{DATA_COLUMN}}', self._data_column(udf_call)) \
+                .replace('{{DATA_LATERAL_VIEW}}', self._data_lateral_view(udf_call)) \
+                .replace('{{SELECT_CONDITION}}', select_condition) \
+                .replace('{{MODEL_ALIAS}}', alias) \
                 .replace('{{INPUT_AND_OUTPUT_FIELDS}}', self._call_original_field_selector(call))
 
+        content = self._replace_physical_config(
+            content, contract_materialize, self.layout.merge(contract.layout), columns,
+            self._session_conf(model_name, contract.size_class))
         self.create_file_and_write(filepath, content)
 
+    def gen_versioned_dbt_models(
+            self,
+            project_path: str,
+            contract: Contract,
+            version: str,
+            schema: ABIModelSchema,
+            versions: List[ModelVersion]
+    ) -> None:
+        project_name = pathlib.Path(project_path).name
+        is_event = isinstance(schema, ABIEventSchema)
+        model_name = self.evt_model_name if is_event else self.call_model_name
+        alias = model_name(contract.name, schema).lower()
+
+        for model_version in versions:
+            # the first version keeps the table of the model before the versioning, so its data is not decoded again
+            version_alias = alias if model_version.version == 1 else f'{alias}_v{model_version.version}'
+            if is_event:
+                self._gen_event_dbt_model(
+                    project_path=project_path,
+                    contract_name=contract.name,
+                    materialize=contract.materialize,
+                    layout=self.layout.merge(contract.layout),
+                    event=model_version.schema,
+                    select_condition=self._evt_condition_selector(contract, model_version.schema) +
+                                     self._dt_range_condition(model_version),
+                    alias=version_alias,
+                    size_class=contract.size_class
+                )
+            else:
+                self._gen_call_dbt_model(
+                    project_path=project_path,
+                    contract=contract,
+                    call=model_version.schema,
+                    select_condition=self._call_condition_selector(contract, model_version.schema) +
+                                     self._dt_range_condition(model_version),
+                    alias=version_alias
+                )
+
+        fields = union_fields(versions)
+        base_fields = ',\n    '.join(evt_base_column if is_event else call_base_column)
+        version_selects = [
+            version_select_sql_template
+            .replace('{{BASE_FIELDS}}', base_fields)
+            .replace('{{FIELDS}}', ',\n    '.join(self._version_field_selector(fields, i)))
+            .replace('{{VERSION_MODEL_NAME}}', model_name(contract.name, i.schema, project_name))
+            for i in versions
+        ]
+
+        content = versioned_view_dbt_model_sql_template \
+            .replace('{{MODEL_ALIAS}}', f'{alias}_all') \
+            .replace('{{VERSION_SELECTS}}', '\nunion all\n'.join(version_selects))
+        self.create_file_and_write(
+            os.path.join(project_path, model_name(contract.name, schema, project_name) + '.sql'), content)
+
+    @staticmethod
+    def _dt_range_condition(model_version: ModelVersion) -> str:
+        conditions = []
+        if model_version.dt_start is not None:
+            conditions.append(f"dt >= '{model_version.dt_start}'")
+        if model_version.dt_end is not None:
+            conditions.append(f"dt < '{model_version.dt_end}'")
+        return ''.join(f' and {i}' for i in conditions)
+
+    def _version_field_selector(self, fields: List[ABIField], model_version: ModelVersion) -> List[str]:
+        """
+        The fields missing in the version are null, and the fields are cast to the types of the latest version.
+        """
+        version_fields = {i.name: i for i in model_version.fields}
+        selectors = []
+        for field in fields:
+            field_type = self.hive_type_provider.transform(field.ftype)
+            if field.name not in version_fields:
+                selectors.append(f'cast(null as {field_type}) as `{field.name}`')
+            elif version_fields[field.name].ftype != field.ftype:
+                selectors.append(f'cast(`{field.name}` as {field_type}) as `{field.name}`')
+            else:
+                selectors.append(f'`{field.name}`')
+        return selectors
+
     def gen_event_udf(
             self, udf_workspace: str, project_name: str, contract_name: str, event: ABIEventSchema
-    ) -> None:
+    ) -> UDFDescriptor:
+        model_name = self.evt_model_name(contract_name, event, project_name)
+        if self.udf_mode == UDFMode.TABLE:
+            self._append_udf_schema(udf_workspace, model_name, event.inputs, [])
+            return UDFDescriptor(project_name, model_name, table_event_udf_clazz_name)
+
         clazz_name = self._event_udf_class_name(project_name, contract_name, event)
         filepath = os.path.join(udf_workspace, clazz_name + '.java')
 
@@ -296,13 +1038,20 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
         content = event_clazz_template \
             .replace('{{CLASS_NAME}}', clazz_name) \
             .replace('{{FIELD_NAMES}}', field_names) \
-            .replace('{{OBJECT_INSPECTORS}}', field_ois)
+            .replace('{{OBJECT_INSPECTORS}}', field_ois) \
+            .replace('{{DECODE_METRICS}}', self._decode_metrics_method(f'"{model_name}"', 1))
 
         self.create_file_and_write(filepath, content)
+        return UDFDescriptor(project_name, model_name, clazz_name)
 
     def gen_call_udf(
             self, udf_workspace: str, project_name: str, contract_name: str, call: ABICallSchema
-    ) -> None:
+    ) -> UDFDescriptor:
+        model_name = self.call_model_name(contract_name, call, project_name)
+        if self.udf_mode == UDFMode.TABLE:
+            self._append_udf_schema(udf_workspace, model_name, call.inputs, call.outputs)
+            return UDFDescriptor(project_name, model_name, table_call_udf_clazz_name)
+
         clazz_name = self._call_udf_class_name(project_name, contract_name, call)
         filepath = os.path.join(udf_workspace, clazz_name + '.java')
 
@@ -316,9 +1065,105 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
             .replace('{{INPUT_FIELD_NAMES}}', input_field_names) \
             .replace('{{INPUT_OBJECT_INSPECTORS}}', input_field_ois) \
             .replace('{{OUTPUT_FIELD_NAMES}}', output_field_names) \
-            .replace('{{OUTPUT_OBJECT_INSPECTORS}}', output_field_ois)
+            .replace('{{OUTPUT_OBJECT_INSPECTORS}}', output_field_ois) \
+            .replace('{{DECODE_METRICS}}', self._decode_metrics_method(f'"{model_name}"', 2))
 
         self.create_file_and_write(filepath, content)
+        return UDFDescriptor(project_name, model_name, clazz_name)
+
+    def _append_udf_schema(
+            self, udf_workspace: str, schema_id: str, inputs: List[ABIField], outputs: List[ABIField]
+    ) -> None:
+        """
+        Append the schema as one json line to the resource, so the schemas of a project are not kept in memory.
+        """
+        schema = {
+            'id': schema_id,
+            'inputs': [{'name': i.name, 'type': self.hive_type_provider.transform(i.ftype)} for i in inputs],
+            'outputs': [{'name': i.name, 'type': self.hive_type_provider.transform(i.ftype)} for i in outputs]
+        }
+        with open(os.path.join(udf_workspace, udf_schemas_resource_name), 'a') as f:
+            f.write(json.dumps(schema, separators=(',', ':')) + '\n')
+
+    def gen_table_udf_classes(self, udf_workspace: str) -> None:
+        """
+        Generate the fixed UDF classes of the table udf mode into the java sources.
+        """
+        resource_path = f'{udf_package_path}/{udf_schemas_resource_name}'
+        # the counters of the fixed classes are named by the schema id, i.e. the model name
+        for clazz_name, template, bytes_arguments in [(udf_schemas_clazz_name, udf_schemas_clazz_template, 0),
+                                                      (table_event_udf_clazz_name, table_event_clazz_template, 1),
+                                                      (table_call_udf_clazz_name, table_call_clazz_template, 2)]:
+            content = template \
+                .replace('{{CLASS_NAME}}', clazz_name) \
+                .replace('{{SCHEMAS_CLASS_NAME}}', udf_schemas_clazz_name) \
+                .replace('{{RESOURCE_PATH}}', resource_path) \
+                .replace('{{DECODE_METRICS}}', self._decode_metrics_method('schemaId', bytes_arguments))
+            self.create_file_and_write(os.path.join(udf_workspace, clazz_name + '.java'), content)
+
+    @staticmethod
+    def gen_decode_metrics_class(udf_workspace: str) -> None:
+        """
+        Generate the class of the decode counters into the java sources, it's packaged into the base jar,
+        so the UDFs of the thin jars share it.
+        """
+        content = decode_metrics_clazz_template \
+            .replace('{{CLASS_NAME}}', decode_metrics_clazz_name) \
+            .replace('{{LOG_PREFIX}}', decode_metrics_log_prefix) \
+            .replace('{{LOG_INTERVAL_ROWS}}', str(decode_metrics_log_interval_rows))
+        DbtCodeGenerator.create_file_and_write(
+            os.path.join(udf_workspace, decode_metrics_clazz_name + '.java'), content)
+
+    def _decode_metrics_method(self, metrics_name: str, bytes_arguments: int) -> str:
+        """
+        :param metrics_name: the java expression of the counter name
+        :param bytes_arguments: the number of the leading binary arguments counted as the input bytes
+        """
+        if not self.decode_metrics:
+            return ''
+        return decode_metrics_method_template \
+            .replace('{{METRICS_CLASS_NAME}}', decode_metrics_clazz_name) \
+            .replace('{{METRICS_NAME}}', metrics_name) \
+            .replace('{{BYTES_ARGUMENTS}}', str(bytes_arguments))
+
+    def gen_udf_registration(
+            self,
+            dbt_dir: str,
+            udfs: List[UDFDescriptor],
+            version: str
+    ) -> None:
+        if self.udf_mode == UDFMode.TABLE:
+            # the fixed classes are registered once for all models
+            clazz_to_udf = {i.class_name: i for i in udfs}
+            statements = [(None, self._udf_registration_statement(i, version, clazz_to_udf[i].project_name))
+                          for i in sorted(clazz_to_udf)]
+        else:
+            statements = [
+                (i.model_name, self._udf_registration_statement(i.class_name, version, i.project_name)) for i in udfs]
+
+        macro_path = os.path.join(dbt_dir, 'macros', 'codegen')
+        pathlib.Path(macro_path).mkdir(parents=True, exist_ok=True)
+        filepath = os.path.join(macro_path, udf_registration_macro_name + '.sql')
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+        content = udf_registration_macro_template \
+            .replace('{{MACRO_NAME}}', udf_registration_macro_name) \
+            .replace('{{UDF_STATEMENTS}}', ',\n        '.join(
+                f"({repr(model_name) if model_name is not None else 'none'}, '{statement}')"
+                for model_name, statement in statements))
+
+        self.create_file_and_write(filepath, content)
+
+    def on_run_start_hooks(self) -> List[str]:
+        return [f'{{{{ {udf_registration_macro_name}() }}}}']
+
+    def output_fingerprint(self) -> str:
+        return f'wide_int_as_string={self.hive_provider.wide_int_as_string}'
+
+    def _udf_registration_statement(self, clazz_name: str, version: str, project_name: str) -> str:
+        return f'create or replace function {clazz_name.lower()} as "io.iftech.sparkudf.hive.{clazz_name}" ' \
+               f'using {self._udf_jars_clause(version, project_name)}'
 
     def build_udf(
             self, dbt_dir: str, version: str
@@ -334,13 +1179,61 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
         self._execute_command(
             command=f"""
             mvn clean package -DskipTests \
-            && mv target/blockchain-spark-{blockchain_spark_version}-jar-with-dependencies.jar {jar_path} \
-            && cd {dbt_dir} \
-            && rm -rf java
+            && mv target/blockchain-spark-{blockchain_spark_version}-jar-with-dependencies.jar {jar_path}
             """,
             dir=java_project_path
         )
 
+        if self.jar_layout != UDFJarLayout.SINGLE:
+            shards_path = os.path.join(java_project_path, 'udf')
+            shards = sorted(os.listdir(shards_path)) if os.path.isdir(shards_path) else []
+            for shard in shards:
+                self._build_shard_jar(
+                    shard_path=os.path.join(shards_path, shard),
+                    base_jar_path=jar_path,
+                    shard_jar_path=os.path.join(dbt_dir, self._shard_jar_name(version, shard)),
+                    blockchain_spark_version=blockchain_spark_version
+                )
+
+        shutil.rmtree(java_project_path)
+
+    def _build_shard_jar(
+            self, shard_path: str, base_jar_path: str, shard_jar_path: str, blockchain_spark_version: str
+    ) -> None:
+        """Compile the UDFs of a shard against the base jar and package the classes only,
+        the shard is skipped if the jar has been built from the same sources.
+        """
+        fingerprint_path = shard_jar_path + '.sha256'
+        fingerprint = self._shard_fingerprint(shard_path, blockchain_spark_version)
+
+        if os.path.exists(shard_jar_path) and os.path.exists(fingerprint_path):
+            with open(fingerprint_path, 'r') as f:
+                if f.read().strip() == fingerprint:
+                    self.logger.info(f'{shard_jar_path} is up to date, skip it.')
+                    return
+
+        classes_path = os.path.join(shard_path, 'classes')
+        self._execute_command(
+            command=f"""
+            mkdir -p {classes_path} \
+            && javac -nowarn -cp {base_jar_path} -d {classes_path} $(find {udf_package_path} -name '*.java') \
+            && jar cf {shard_jar_path} -C {classes_path} .
+            """,
+            dir=shard_path
+        )
+
+        with open(fingerprint_path, 'w') as f:
+            f.write(fingerprint)
+
+    @staticmethod
+    def _shard_fingerprint(shard_path: str, blockchain_spark_version: str) -> str:
+        digest = hashlib.sha256(blockchain_spark_version.encode('utf-8'))
+        for filepath in sorted(glob.glob(os.path.join(shard_path, udf_package_path, '*.java'))):
+            digest.update(os.path.basename(filepath).encode('utf-8'))
+            with open(filepath, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
     def prepare_udf_workspace(self, dbt_dir: str) -> str:
         # clone blockchain-spark project and move java dir to the root
         # TODO: release blockchain-spark project to maven central
@@ -352,7 +1245,21 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
             """,
             dir=dbt_dir
         )
-        return os.path.join(dbt_dir, 'java/src/main/java/io/iftech/sparkudf/hive')
+        udf_workspace = os.path.join(dbt_dir, 'java/src/main/java', udf_package_path)
+        if self.udf_mode == UDFMode.TABLE:
+            self.gen_table_udf_classes(udf_workspace)
+        if self.decode_metrics:
+            self.gen_decode_metrics_class(udf_workspace)
+        return udf_workspace
+
+    def project_udf_workspace(self, dbt_dir: str, udf_workspace: str, project_name: str) -> str:
+        # The schemas of all projects are appended to one resource which is packaged into the jar by maven.
+        if self.udf_mode == UDFMode.TABLE:
+            return os.path.join(dbt_dir, 'java/src/main/resources', udf_package_path)
+        # The UDFs of thin jars are out of the maven sources, so they are not packaged into the base jar.
+        if self.jar_layout == UDFJarLayout.SINGLE:
+            return udf_workspace
+        return os.path.join(dbt_dir, 'java', 'udf', self._jar_shard(project_name), udf_package_path)
 
     def _execute_command(self, command: str, dir: str):
         sp = subprocess.Popen(
@@ -390,10 +1297,139 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
         return project_name[0].upper() + project_name[1:] \
                + '_' + contract_name + '_' + call.name + '_' + 'CallDecodeUDF'
 
+    def _udf_class_name(
+            self, project_name: str, contract_name: str, schema: Union[ABIEventSchema, ABICallSchema]
+    ) -> str:
+        if isinstance(schema, ABIEventSchema):
+            return table_event_udf_clazz_name if self.udf_mode == UDFMode.TABLE \
+                else self._event_udf_class_name(project_name, contract_name, schema)
+        return table_call_udf_clazz_name if self.udf_mode == UDFMode.TABLE \
+            else self._call_udf_class_name(project_name, contract_name, schema)
+
+    def _udf_function_name(
+            self, project_name: str, contract_name: str, schema: Union[ABIEventSchema, ABICallSchema]
+    ) -> str:
+        return self._udf_class_name(project_name, contract_name, schema).lower()
+
+    def _evt_udf_call(self, project_name: str, contract_name: str, event: ABIEventSchema) -> str:
+        return f"{self._udf_function_name(project_name, contract_name, event)}(unhex_data, topics_arr, " \
+               f"'{json.dumps(event.raw_schema.to_dict(omit_none=True))}', '{event.name}'" \
+               f"{self._udf_schema_id_arg(self.evt_model_name(contract_name, event, project_name))})"
+
+    def _udf_schema_id_arg(self, model_name: str) -> str:
+        return f", '{model_name}'" if self.udf_mode == UDFMode.TABLE else ''
+
     @staticmethod
     def _jar_name(version: str) -> str:
         return f'blockchain-dbt-udf-{version}.jar'
 
+    @staticmethod
+    def _shard_jar_name(version: str, shard: str) -> str:
+        return f'blockchain-dbt-udf-{version}-{shard}.jar'
+
+    def _jar_shard(self, project_name: str) -> str:
+        if self.jar_layout == UDFJarLayout.PROJECT:
+            return project_name
+        elif self.jar_layout == UDFJarLayout.SHARD:
+            # crc32 is stable across processes, the built-in hash of str is not
+            return f'shard{zlib.crc32(project_name.encode("utf-8")) % self.jar_shards:03d}'
+        else:
+            raise ValueError(f'{self.jar_layout} has no jar shard.')
+
+    def _udf_jar_paths(self, version: str, project_name: str) -> List[str]:
+        jar_paths = [os.path.join(self.remote_workspace, self._jar_name(version))]
+        if self.jar_layout != UDFJarLayout.SINGLE:
+            jar_paths.append(
+                os.path.join(self.remote_workspace, self._shard_jar_name(version, self._jar_shard(project_name))))
+        return jar_paths
+
+    def _udf_jars_clause(self, version: str, project_name: str) -> str:
+        return ', '.join(f'jar "{i}"' for i in self._udf_jar_paths(version, project_name))
+
+    def _data_column(self, udf_call: str) -> str:
+        return 'data' if self.single_decode else f'{udf_call} as data'
+
+    def _data_lateral_view(self, udf_call: str) -> str:
+        # explode(array(x)) emits exactly one row for every input row, even if x is null
+        return f'\n    lateral view explode(array({udf_call})) decoded as data' if self.single_decode else ''
+
+    def _replace_physical_config(
+            self,
+            content: str,
+            materialize: str,
+            layout: LayoutOptions,
+            columns: List[str],
+            session_conf: Optional[Mapping[str, str]] = None
+    ) -> str:
+        return self._replace_dt_filter(content, materialize) \
+            .replace('{{MODEL_MATERIALIZED_CONFIG}}', self._materialized_config(materialize)) \
+            .replace('{{MODEL_LAYOUT_CONFIG}}', self._layout_config(layout, columns, session_conf)) \
+            .replace('{{MODEL_PARTITION_HINT}}', self._partition_hint(layout, materialize)) \
+            .replace('{{MODEL_SORT_BY}}', self._sort_by(layout, columns))
+
+    @staticmethod
+    def _layout_config(
+            layout: LayoutOptions, columns: List[str], session_conf: Optional[Mapping[str, str]] = None
+    ) -> str:
+        """The options are passed to the parquet writer of the table,
+        the target file size is the advisory size of the partitions made by the REBALANCE hint.
+        The session confs are set before the model and reset after it.
+        """
+        options = {}
+        if layout.compression is not None:
+            options['compression'] = layout.compression
+        if layout.row_group_size is not None:
+            options['parquet.block.size'] = str(layout.row_group_size)
+        for column in _filter_columns(layout.bloom_filter_columns, columns):
+            options[f'parquet.bloom.filter.enabled#{column}'] = 'true'
+
+        conf = dict(session_conf or {})
+        if layout.target_file_size is not None:
+            conf[advisory_partition_size_conf] = str(layout.target_file_size)
+
+        configs = []
+        if options:
+            configs.append(f'options={options}')
+        if len(conf) == 1:
+            key, value = list(conf.items())[0]
+            configs.append(f'pre_hook="set {key}={value}"')
+            configs.append(f'post_hook="reset {key}"')
+        elif conf:
+            configs.append(f'pre_hook={json.dumps([f"set {k}={v}" for k, v in sorted(conf.items())])}')
+            configs.append(f'post_hook={json.dumps([f"reset {k}" for k in sorted(conf)])}')
+
+        return ''.join(f'\n        {i},' for i in configs)
+
+    def _session_conf(self, model_name: str, size_class: SizeClass) -> Dict[str, str]:
+        """
+        The shuffle partitions are estimated by the daily bytes in the stats if they are known,
+        otherwise the confs of the size class are used.
+        """
+        if not self.session_tuning:
+            return {}
+
+        conf = dict(self.session_confs.get(size_class) or {})
+        stats = self.model_stats.get(model_name)
+        if stats is not None:
+            if stats.daily_bytes is not None:
+                advisory_size = int(conf.get(advisory_partition_size_conf, default_advisory_partition_size))
+                conf[shuffle_partitions_conf] = str(
+                    min(max_shuffle_partitions, max(1, math.ceil(stats.daily_bytes / advisory_size))))
+            conf.update(stats.conf or {})
+        return conf
+
+    def _partition_hint(self, layout: LayoutOptions, materialize: str) -> str:
+        if layout.target_file_size is not None:
+            # the adaptive execution splits or coalesces the partitions to the advisory size
+            return 'REBALANCE(dt)' if materialize == 'increment' else 'REBALANCE'
+        return f'REPARTITION({self._repartition_count(materialize)})'
+
+    @staticmethod
+    def _sort_by(layout: LayoutOptions, columns: List[str]) -> str:
+        # sort by is sorting within every partition, so the partitioning of the hint is kept
+        sort_columns = _filter_columns(layout.sort_by, columns)
+        return f'\nsort by {", ".join(f"`{i}`" for i in sort_columns)}' if sort_columns else ''
+
     @staticmethod
     def _materialized_config(materialize: str) -> str:
         if materialize == 'table':
@@ -425,30 +1461,67 @@ class SparkDbtCodeGenerator(DbtCodeGenerator):
                 f"""to_address = lower("{contract.address}") and address_hash = abs(hash(lower("{contract.address}"))) % 10"""
             )
 
-        selector = encode_hex(function_abi_to_4byte_selector(dataclasses.asdict(call.raw_schema)))[0:10]
+        selector = call_selector(call)
         conditions.append(
             f"""selector = "{selector}" and selector_hash = abs(hash("{selector}")) % 10"""
         )
+        conditions.extend(SparkDbtCodeGenerator._trace_filter_conditions(contract.trace_filter))
 
         return ' and '.join(conditions)
 
+    @staticmethod
+    def _trace_filter_conditions(trace_filter: Optional[TraceFilter]) -> List[str]:
+        if trace_filter is None:
+            return []
+
+        conditions = []
+        if trace_filter.success_only:
+            conditions.append('status = 1')
+        if trace_filter.call_types:
+            conditions.append(f"""call_type in ({', '.join(f'"{i}"' for i in trace_filter.call_types)})""")
+        if trace_filter.trace_types:
+            conditions.append(f"""trace_type in ({', '.join(f'"{i}"' for i in trace_filter.trace_types)})""")
+        return conditions
+
+    @staticmethod
+    def _output_column(trace_filter: Optional[TraceFilter]) -> str:
+        if trace_filter is None or trace_filter.decode_failed_outputs or trace_filter.success_only:
+            return 'unhex_output'
+        # the outputs of the failed calls are empty or the revert reasons, they can't be decoded by the ABI
+        return 'case when status = 1 then unhex_output end'
+
     @staticmethod
     def _evt_condition_selector(
             contract: Contract, evt: ABIEventSchema
+    ) -> str:
+        return SparkDbtCodeGenerator._evt_address_condition_selector(contract.address, evt)
+
+    @staticmethod
+    def _evt_address_condition_selector(
+            address: Optional[str], evt: ABIEventSchema
     ) -> str:
         conditions = []
-        if contract.address:
+        if address:
             conditions.append(
-                f"""address = lower("{contract.address}") and address_hash = abs(hash(lower("{contract.address}"))) % 10"""
+                f"""address = lower("{address}") and address_hash = abs(hash(lower("{address}"))) % 10"""
             )
 
-        selector = encode_hex(event_abi_to_log_topic(dataclasses.asdict(evt.raw_schema)))
+        selector = event_selector(evt)
         conditions.append(
             f"""selector = "{selector}" and selector_hash = abs(hash("{selector}")) % 10"""
         )
 
         return ' and '.join(conditions)
 
+    @staticmethod
+    def _shared_evt_condition_selector(shared_event: SharedEvent) -> str:
+        addresses = ', '.join(f'lower("{i}")' for i in shared_event.addresses)
+        address_hashes = ', '.join(f'abs(hash(lower("{i}"))) % 10' for i in shared_event.addresses)
+
+        selector = event_selector(shared_event.event)
+        return f"""address in ({addresses}) and address_hash in ({address_hashes}) """ \
+               f"""and selector = "{selector}" and selector_hash = abs(hash("{selector}")) % 10"""
+
     @staticmethod
     def _evt_original_field_selector(
             evt: ABIEventSchema, prefix: str = 'data.input.'
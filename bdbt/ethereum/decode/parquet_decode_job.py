@@ -0,0 +1,336 @@
+import dataclasses
+import glob
+import json
+import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Tuple, Iterable, Sequence, Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema
+from bdbt.ethereum.abi.abi_decoder import ABIDecoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.provider.arrow_type_provider import ArrowDataTypeProvider, ArrowModelDataTypeProvider
+from bdbt.ethereum.abi.utils import event_selector, call_selector
+from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator as CG
+from bdbt.ethereum.dbt.model_version import ABIModelSchema
+from bdbt.ethereum.exceptions import ABIDecodeError
+from bdbt.global_type import Contract, TraceFilter
+
+
+class DataSource(Enum):
+    # the parquet files with the columns of stg_logs
+    LOGS = 'logs'
+    # the parquet files with the columns of stg_traces
+    TRACES = 'traces'
+
+
+# The columns of the raw data -> the base columns of the models, the same as the generated dbt models.
+evt_base_column_mapping = {
+    'block_number': 'evt_block_number',
+    'block_timestamp': 'evt_block_time',
+    'log_index': 'evt_index',
+    'transaction_hash': 'evt_tx_hash',
+    'address': 'contract_address',
+}
+
+call_base_column_mapping = {
+    'block_number': 'call_block_number',
+    'block_timestamp': 'call_block_time',
+    'trace_address': 'call_trace_address',
+    'transaction_hash': 'call_tx_hash',
+    'to_address': 'contract_address',
+}
+
+
+@dataclass(frozen=True, eq=False)
+class ModelRoute:
+    project_name: str
+    # the alias of the generated model, it's the name of the output dataset
+    model_alias: str
+    schema: ABIModelSchema
+    trace_filter: Optional[TraceFilter] = None
+
+    def accept_trace(self, status: int, call_type: Optional[str], trace_type: Optional[str]) -> bool:
+        if self.trace_filter is None:
+            return True
+        if self.trace_filter.success_only and status != 1:
+            return False
+        if self.trace_filter.call_types and call_type not in self.trace_filter.call_types:
+            return False
+        if self.trace_filter.trace_types and trace_type not in self.trace_filter.trace_types:
+            return False
+        return True
+
+    def decode_output(self, status: int) -> bool:
+        return self.trace_filter is None or self.trace_filter.decode_failed_outputs or status == 1
+
+
+class DecodeRouter:
+    """
+    Route the logs and the traces to the events and the calls of the contracts by the selector and the address,
+    the same as the conditions of the generated dbt models. The shared events and the versioned models are decoded
+    by the current ABIs of the contracts into their own models.
+    """
+
+    def __init__(self, contracts: Iterable[Tuple[str, Contract]], transformer: Optional[ABITransformer] = None):
+        """
+        :param contracts: (project_name, contract)
+        """
+        transformer = transformer or ABITransformer()
+        # (address, selector) -> routes, the address is None if the contract matches all addresses
+        self.event_routes: Dict[Tuple[Optional[str], str], List[ModelRoute]] = {}
+        self.call_routes: Dict[Tuple[Optional[str], str], List[ModelRoute]] = {}
+
+        for project_name, contract in contracts:
+            abi = transformer.transform_abi(contract.abi, contract.include_read_only_calls)
+            address = contract.address.lower() if contract.address else None
+            for event in abi.events:
+                selector = event_selector(event)
+                self.event_routes.setdefault((address, selector), []).append(ModelRoute(
+                    project_name, CG.evt_model_name(contract.name, event).lower(), event))
+            for call in abi.calls:
+                selector = call_selector(call)
+                self.call_routes.setdefault((address, selector), []).append(ModelRoute(
+                    project_name, CG.call_model_name(contract.name, call).lower(), call, contract.trace_filter))
+
+    def routes(self, source: DataSource, address: Optional[str], selector: Optional[str]) -> List[ModelRoute]:
+        routes = self.event_routes if source == DataSource.LOGS else self.call_routes
+        return routes.get((address.lower() if address else None, selector), []) + routes.get((None, selector), [])
+
+    @property
+    def models_count(self) -> int:
+        return sum(len(i) for i in self.event_routes.values()) + sum(len(i) for i in self.call_routes.values())
+
+
+@dataclass(frozen=True)
+class DecodeTask:
+    source: DataSource
+    path: str
+    file_index: int
+    row_group: int
+
+
+@dataclass
+class DecodeStats:
+    # the rows read from the raw data
+    rows: int = 0
+    # the rows written into the models, a row is counted once for every model it's routed to
+    decoded_rows: int = 0
+    # the rows failed to be decoded, their fields are null
+    failed_rows: int = 0
+    row_groups: int = 0
+    files: int = 0
+
+    def merge(self, other: 'DecodeStats') -> None:
+        for field in dataclasses.fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+
+def load_contracts(dbt_dir: str, projects: Optional[Sequence[str]] = None) -> List[Tuple[str, Contract]]:
+    """
+    Load the contracts in the layout of the codegen, contracts/<project_name>/<contract_name>.json.
+    """
+    contracts_dir = os.path.join(dbt_dir, 'contracts')
+    contracts = []
+    for project_name in sorted(os.listdir(contracts_dir)):
+        if projects and project_name not in projects:
+            continue
+        for contract_path in sorted(glob.glob(os.path.join(contracts_dir, project_name, '*.json'))):
+            with open(contract_path, 'r') as f:
+                contracts.append((project_name, Contract.from_dicts(json.loads(f.read()))))
+    return contracts
+
+
+class RowGroupDecoder:
+    """
+    Decode one row group of the raw data into the row groups of the models, a parquet file is written
+    for every model and every dt in <output_dir>/<project_name>/<model_alias>/dt=<dt>/.
+    """
+
+    def __init__(
+            self, router: DecodeRouter, output_dir: str, exact_types: bool = False, wide_int_as_decimal: bool = False
+    ):
+        self.router = router
+        self.output_dir = output_dir
+        self.decoder = ABIDecoder()
+        self.provider = ArrowDataTypeProvider(wide_int_as_decimal=wide_int_as_decimal) if exact_types \
+            else ArrowModelDataTypeProvider()
+
+    def decode(self, task: DecodeTask) -> DecodeStats:
+        table = pq.ParquetFile(task.path).read_row_group(task.row_group)
+        stats = DecodeStats(rows=table.num_rows, row_groups=1)
+        logs = task.source == DataSource.LOGS
+
+        addresses = table.column('address' if logs else 'to_address').to_pylist()
+        selectors = table.column('selector').to_pylist()
+        dts = table.column('dt').to_pylist()
+        if not logs:
+            statuses = table.column('status').to_pylist()
+            call_types = table.column('call_type').to_pylist()
+            trace_types = table.column('trace_type').to_pylist()
+
+        # (route, dt) -> the indices of the rows
+        groups: Dict[Tuple[ModelRoute, str], List[int]] = {}
+        for idx, (address, selector) in enumerate(zip(addresses, selectors)):
+            for route in self.router.routes(task.source, address, selector):
+                if not logs and not route.accept_trace(statuses[idx], call_types[idx], trace_types[idx]):
+                    continue
+                groups.setdefault((route, dts[idx]), []).append(idx)
+
+        if not groups:
+            return stats
+
+        if logs:
+            topics = table.column('topics_arr').to_pylist()
+            data = table.column('unhex_data').to_pylist()
+        else:
+            inputs = table.column('unhex_input').to_pylist()
+            outputs = table.column('unhex_output').to_pylist()
+
+        for (route, dt), indices in groups.items():
+            values = []
+            for idx in indices:
+                try:
+                    if logs:
+                        values.append(self.decoder.decode_event(route.schema, topics[idx], data[idx] or b''))
+                    else:
+                        values.append(self.decoder.decode_call(
+                            route.schema, inputs[idx] or b'',
+                            outputs[idx] if route.decode_output(statuses[idx]) else None))
+                except ABIDecodeError:
+                    stats.failed_rows += 1
+                    values.append(None)
+
+            self._write(task, route, dt, self._model_table(table, route, indices, values))
+            stats.decoded_rows += len(indices)
+            stats.files += 1
+
+        return stats
+
+    def _model_table(
+            self, table: pa.Table, route: ModelRoute, indices: List[int], values: List[Optional[Dict[str, Any]]]
+    ) -> pa.Table:
+        rows = table.take(pa.array(indices, pa.int64()))
+        if isinstance(route.schema, ABIEventSchema):
+            model = rows.select(list(evt_base_column_mapping.keys())) \
+                .rename_columns(list(evt_base_column_mapping.values()))
+            arrow_schema = self.provider.transform_event_schema(route.schema)
+            fields = route.schema.inputs
+        else:
+            model = rows.select(list(call_base_column_mapping.keys())) \
+                .rename_columns(list(call_base_column_mapping.values()))
+            model = model.add_column(0, 'call_success', pc.equal(rows.column('status'), 1))
+            arrow_schema = self.provider.transform_call_schema(route.schema)
+            fields = route.schema.inputs + route.schema.outputs
+
+        for field, arrow_field in zip(fields, arrow_schema):
+            model = model.append_column(arrow_field, pa.array([
+                self.provider.to_arrow_value(field.ftype, i[field.name]) if i is not None else None for i in values
+            ], type=arrow_field.type))
+        return model
+
+    def _write(self, task: DecodeTask, route: ModelRoute, dt: str, table: pa.Table) -> None:
+        dataset_path = os.path.join(self.output_dir, route.project_name, route.model_alias, f'dt={dt}')
+        pathlib.Path(dataset_path).mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, os.path.join(dataset_path, f'part-{task.file_index:05d}-{task.row_group:05d}.parquet'))
+
+
+_worker_decoder: Optional[RowGroupDecoder] = None
+
+
+def _init_worker(router: DecodeRouter, output_dir: str, exact_types: bool, wide_int_as_decimal: bool) -> None:
+    # the router is sent to every worker once instead of every task
+    global _worker_decoder
+    _worker_decoder = RowGroupDecoder(router, output_dir, exact_types, wide_int_as_decimal)
+
+
+def _decode_in_worker(task: DecodeTask) -> DecodeStats:
+    return _worker_decoder.decode(task)
+
+
+class ParquetDecodeJob:
+    """
+    Decode the raw logs and traces in the local parquet files by the ABIs of the contracts without Spark,
+    the row groups are decoded in a process pool, one task for every row group.
+    The output datasets have the same columns and the same types as the generated Spark models by default,
+    they are partitioned by dt.
+    """
+
+    def __init__(
+            self,
+            router: DecodeRouter,
+            output_dir: str,
+            workers: Optional[int] = None,
+            exact_types: bool = False,
+            wide_int_as_decimal: bool = False
+    ):
+        """
+        :param workers: the number of the processes, the number of the cpus by default, 1 decodes in this process
+        :param exact_types: keep the values in the exact Arrow types of `ArrowDataTypeProvider` instead of the types
+            of the models (`ArrowModelDataTypeProvider`), e.g. uint256 is not truncated to decimal(38, 0), but the
+            datasets can't be compared with the models
+        :param wide_int_as_decimal: see `ArrowDataTypeProvider`, it's only used with the exact types
+        """
+        self.router = router
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.exact_types = exact_types
+        self.wide_int_as_decimal = wide_int_as_decimal
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def plan(self, logs_paths: Sequence[str] = (), traces_paths: Sequence[str] = ()) -> List[DecodeTask]:
+        """
+        :param logs_paths: the parquet files or the folders of them
+        """
+        tasks = []
+        file_index = 0
+        for source, paths in [(DataSource.LOGS, logs_paths), (DataSource.TRACES, traces_paths)]:
+            for path in self._parquet_files(paths):
+                num_row_groups = pq.ParquetFile(path).metadata.num_row_groups
+                tasks.extend(DecodeTask(source, path, file_index, i) for i in range(num_row_groups))
+                file_index += 1
+        return tasks
+
+    def run(self, logs_paths: Sequence[str] = (), traces_paths: Sequence[str] = ()) -> DecodeStats:
+        tasks = self.plan(logs_paths, traces_paths)
+        self.logger.info(f'decode {len(tasks)} row groups into {self.router.models_count} models '
+                         f'with {self.workers} processes.')
+
+        start = time.perf_counter()
+        stats = DecodeStats()
+        if self.workers == 1:
+            decoder = RowGroupDecoder(self.router, self.output_dir, self.exact_types, self.wide_int_as_decimal)
+            for task in tasks:
+                stats.merge(decoder.decode(task))
+        else:
+            with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.router, self.output_dir, self.exact_types, self.wide_int_as_decimal)
+            ) as executor:
+                for task_stats in executor.map(_decode_in_worker, tasks):
+                    stats.merge(task_stats)
+
+        elapsed = time.perf_counter() - start
+        self.logger.info(f'decode {stats.rows} rows in {elapsed:.2f}s ({stats.rows / max(elapsed, 1e-9):.0f} rows/s), '
+                         f'{stats.decoded_rows} rows written into {stats.files} files, '
+                         f'{stats.failed_rows} rows failed.')
+        return stats
+
+    @staticmethod
+    def _parquet_files(paths: Sequence[str]) -> List[str]:
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True)))
+            else:
+                files.append(path)
+        return files
@@ -14,3 +14,21 @@ class TargetItemNotFound(Exception):
 
     def __init__(self, message) -> None:
         super().__init__(message)
+
+
+class ABIDecodeError(Exception):
+    """
+    We failed to decode the data by the ABI
+    """
+
+    def __init__(self, message) -> None:
+        super().__init__(message)
+
+
+class ABIEncodeError(Exception):
+    """
+    We failed to encode the values by the ABI
+    """
+
+    def __init__(self, message) -> None:
+        super().__init__(message)
@@ -0,0 +1,348 @@
+import os
+import pathlib
+import random
+import string
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from eth_utils import keccak
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIDataType,
+    ABIFunctionType,
+    ABIBytesType,
+    ABIFixedType,
+    ABIBoolType,
+    ABIAddressType,
+    ABIStringType,
+    ABIIntType,
+    ABITupleType,
+    ABIArrayType
+)
+from bdbt.ethereum.abi.abi_encoder import ABIEncoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.dbt.model_version import ABIModelSchema
+from bdbt.global_type import Contract
+
+# The models filter the buckets by abs(hash(x)) % 10, the same as the bucketing of the raw tables.
+HASH_BUCKETS = 10
+
+LOGS_SCHEMA = pa.schema([
+    ('block_number', pa.int64()),
+    ('block_timestamp', pa.timestamp('us')),
+    ('log_index', pa.int64()),
+    ('transaction_hash', pa.string()),
+    ('address', pa.string()),
+    ('unhex_data', pa.binary()),
+    ('topics_arr', pa.list_(pa.string())),
+    ('selector', pa.string()),
+    ('address_hash', pa.int32()),
+    ('selector_hash', pa.int32()),
+    ('dt', pa.string())
+])
+
+TRACES_SCHEMA = pa.schema([
+    ('block_number', pa.int64()),
+    ('block_timestamp', pa.timestamp('us')),
+    ('trace_address', pa.string()),
+    ('transaction_hash', pa.string()),
+    ('to_address', pa.string()),
+    ('unhex_input', pa.binary()),
+    ('unhex_output', pa.binary()),
+    ('status', pa.int32()),
+    ('call_type', pa.string()),
+    ('trace_type', pa.string()),
+    ('selector', pa.string()),
+    ('address_hash', pa.int32()),
+    ('selector_hash', pa.int32()),
+    ('dt', pa.string())
+])
+
+
+def _mix_k1(k1: int) -> int:
+    k1 = (k1 * 0xcc9e2d51) & 0xffffffff
+    k1 = ((k1 << 15) | (k1 >> 17)) & 0xffffffff
+    return (k1 * 0x1b873593) & 0xffffffff
+
+
+def _mix_h1(h1: int, k1: int) -> int:
+    h1 ^= k1
+    h1 = ((h1 << 13) | (h1 >> 19)) & 0xffffffff
+    return (h1 * 5 + 0xe6546b64) & 0xffffffff
+
+
+def _fmix(h1: int, length: int) -> int:
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & 0xffffffff
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & 0xffffffff
+    return h1 ^ (h1 >> 16)
+
+
+def spark_hash(value: str, seed: int = 42) -> int:
+    """
+    The same as hash(value) of Spark SQL for a string, Murmur3_x86_32.hashUnsafeBytes, it mixes the tail bytes
+    one by one as signed ints instead of the standard Murmur3.
+    """
+    data = value.encode('utf-8')
+    h1 = seed & 0xffffffff
+    aligned = len(data) - len(data) % 4
+    for i in range(0, aligned, 4):
+        h1 = _mix_h1(h1, _mix_k1(int.from_bytes(data[i:i + 4], 'little')))
+    for i in range(aligned, len(data)):
+        h1 = _mix_h1(h1, _mix_k1((data[i] - 256 if data[i] > 127 else data[i]) & 0xffffffff))
+    h1 = _fmix(h1, len(data))
+    return h1 - (1 << 32) if h1 & 0x80000000 else h1
+
+
+def hash_bucket(value: str) -> int:
+    """
+    abs(hash(value)) % 10 of Spark SQL, abs and % follow the int semantics of Java.
+    """
+    h = spark_hash(value)
+    h = h if h == -2 ** 31 else abs(h)
+    return h - int(h / HASH_BUCKETS) * HASH_BUCKETS
+
+
+class ABIValueGenerator:
+    """
+    Generate the random values of the ABI types in the same form as the values decoded by `ABIDecoder`.
+    """
+
+    def __init__(
+            self,
+            rng: random.Random,
+            max_array_length: int = 3,
+            max_bytes_length: int = 64,
+            address_pool_size: int = 1000,
+            wide_int_ratio: float = 0.1
+    ):
+        """
+        :param address_pool_size: the addresses are drawn from a pool, so the same accounts appear in many rows
+        :param wide_int_ratio: the ratio of the integers drawn from the full range of the type,
+            the others fit in 64 bits like most of the amounts and ids
+        """
+        self.rng = rng
+        self.max_array_length = max_array_length
+        self.max_bytes_length = max_bytes_length
+        self.wide_int_ratio = wide_int_ratio
+        self.addresses = ['0x' + self.random_bytes(20).hex() for _ in range(address_pool_size)]
+
+    def random_bytes(self, length: int) -> bytes:
+        return self.rng.getrandbits(length * 8).to_bytes(length, 'big') if length > 0 else b''
+
+    def value(self, atype: ABIDataType) -> Any:
+        if isinstance(atype, ABIIntType):
+            return self._int(atype.bit_length, atype.unsigned)
+        elif isinstance(atype, ABIAddressType):
+            return self.rng.choice(self.addresses)
+        elif isinstance(atype, ABIBoolType):
+            return self.rng.random() < 0.5
+        elif isinstance(atype, ABIFixedType):
+            return Decimal(self._int(atype.bit_length, atype.unsigned)).scaleb(-atype.scale)
+        elif isinstance(atype, ABIStringType):
+            return ''.join(self.rng.choices(string.ascii_letters + string.digits,
+                                            k=self.rng.randint(0, self.max_bytes_length)))
+        elif isinstance(atype, ABIBytesType):
+            return self.random_bytes(self.rng.randint(0, self.max_bytes_length) if atype.dynamic else atype.length)
+        elif isinstance(atype, ABIFunctionType):
+            return self.random_bytes(atype.length)
+        elif isinstance(atype, ABIArrayType):
+            length = self.rng.randint(0, self.max_array_length) if atype.length < 0 else atype.length
+            return [self.value(atype.element_type) for _ in range(length)]
+        elif isinstance(atype, ABITupleType):
+            return {i.name: self.value(i.ftype) for i in atype.element_fields}
+        raise ValueError(f'{atype.canonical_type} is not a supported type.')
+
+    def _int(self, bit_length: int, unsigned: bool) -> int:
+        bits = bit_length if self.rng.random() < self.wide_int_ratio else min(bit_length, 64)
+        magnitude = self.rng.getrandbits(bits - (not unsigned))
+        return -magnitude if not unsigned and self.rng.random() < 0.5 else magnitude
+
+
+@dataclass(frozen=True)
+class SyntheticTarget:
+    """
+    An event or a call of a contract whose rows are generated.
+    """
+    project_name: str
+    contract_name: str
+    address: str
+    schema: ABIModelSchema
+    weight: float
+
+
+def zipf_weights(count: int, skew: float) -> List[float]:
+    """
+    The k-th item is drawn in proportion to 1 / k^skew, 0 is uniform.
+    """
+    return [1 / (i + 1) ** skew for i in range(count)]
+
+
+class SyntheticChainDataGenerator:
+    """
+    Generate the raw logs and traces with the columns of stg_logs and stg_traces for the events and the calls
+    of the contracts, the data is ABI encoded with the right topics and selectors, so it's decoded by the models.
+
+    The contracts and the events / calls of every contract are drawn by the zipf weights in the given order,
+    the noise rows are emitted by the unknown contracts and never decoded.
+    """
+
+    def __init__(
+            self,
+            contracts: Sequence[Tuple[str, Contract]],
+            seed: int = 0,
+            contract_skew: float = 1.0,
+            schema_skew: float = 1.0,
+            noise_ratio: float = 0.0,
+            failed_call_ratio: float = 0.05,
+            rows_per_block: int = 200,
+            start_dt: str = '2022-01-01',
+            block_seconds: int = 12,
+            value_generator: Optional[ABIValueGenerator] = None,
+            transformer: Optional[ABITransformer] = None
+    ):
+        """
+        :param contracts: (project_name, contract), the contracts without address get a random one
+        :param noise_ratio: the ratio of the rows which don't belong to the contracts
+        :param failed_call_ratio: the ratio of the reverted traces, they have no output
+        """
+        if not 0 <= noise_ratio <= 1 or not 0 <= failed_call_ratio <= 1:
+            raise ValueError('the ratios should be between 0 and 1.')
+
+        self.rng = random.Random(seed)
+        self.noise_ratio = noise_ratio
+        self.failed_call_ratio = failed_call_ratio
+        self.rows_per_block = rows_per_block
+        self.start_time = datetime.strptime(start_dt, '%Y-%m-%d')
+        self.block_seconds = block_seconds
+        self.values = value_generator or ABIValueGenerator(self.rng)
+        self.encoder = ABIEncoder()
+
+        transformer = transformer or ABITransformer()
+        self.event_targets: List[SyntheticTarget] = []
+        self.call_targets: List[SyntheticTarget] = []
+        for contract_weight, (project_name, contract) in zip(zipf_weights(len(contracts), contract_skew), contracts):
+            address = (contract.address or '0x' + self.values.random_bytes(20).hex()).lower()
+            abi = transformer.transform_abi(contract.abi, contract.include_read_only_calls)
+            for schemas, targets in [(abi.nonempty_events, self.event_targets), (abi.nonempty_calls, self.call_targets)]:
+                weights = zipf_weights(len(schemas), schema_skew)
+                targets.extend(SyntheticTarget(project_name, contract.name, address, schema,
+                                               contract_weight * weight / sum(weights))
+                               for schema, weight in zip(schemas, weights))
+
+        self._log_rows = 0
+        self._trace_rows = 0
+        self._hash_buckets: Dict[str, int] = {}
+
+    def generate_logs(self, rows: int) -> pa.Table:
+        """
+        Generate the next rows of the logs, the blocks continue from the previous rows.
+        """
+        columns = {i: [] for i in LOGS_SCHEMA.names}
+        targets = self._draw(self.event_targets, rows)
+        for row, target in zip(range(self._log_rows, self._log_rows + rows), targets):
+            if target is None:
+                address = '0x' + self.values.random_bytes(20).hex()
+                topics, data = ['0x' + self.values.random_bytes(32).hex()], self.values.random_bytes(64)
+            else:
+                address = target.address
+                topics, data = self.encoder.encode_event(
+                    target.schema, {i.name: self.values.value(i.ftype) for i in target.schema.inputs})
+
+            selector = topics[0] if topics else None
+            self._append_base_columns(columns, row)
+            columns['log_index'].append(row % self.rows_per_block)
+            columns['address'].append(address)
+            columns['unhex_data'].append(data)
+            columns['topics_arr'].append(topics)
+            columns['selector'].append(selector)
+            columns['address_hash'].append(self._hash_bucket(address))
+            columns['selector_hash'].append(self._hash_bucket(selector) if selector is not None else None)
+
+        self._log_rows += rows
+        return pa.Table.from_pydict(columns, schema=LOGS_SCHEMA)
+
+    def generate_traces(self, rows: int) -> pa.Table:
+        """
+        Generate the next rows of the traces, the blocks continue from the previous rows.
+        """
+        columns = {i: [] for i in TRACES_SCHEMA.names}
+        targets = self._draw(self.call_targets, rows)
+        for row, target in zip(range(self._trace_rows, self._trace_rows + rows), targets):
+            if target is None:
+                address = '0x' + self.values.random_bytes(20).hex()
+                input_data, output_data = self.values.random_bytes(68), self.values.random_bytes(32)
+            else:
+                address = target.address
+                input_data, output_data = self.encoder.encode_call(
+                    target.schema, {i.name: self.values.value(i.ftype)
+                                    for i in target.schema.inputs + target.schema.outputs})
+
+            status = 0 if self.rng.random() < self.failed_call_ratio else 1
+            selector = '0x' + input_data[:4].hex()
+            self._append_base_columns(columns, row)
+            columns['trace_address'].append('')
+            columns['to_address'].append(address)
+            columns['unhex_input'].append(input_data)
+            columns['unhex_output'].append(output_data if status == 1 else b'')
+            columns['status'].append(status)
+            columns['call_type'].append('call')
+            columns['trace_type'].append('call')
+            columns['selector'].append(selector)
+            columns['address_hash'].append(self._hash_bucket(address))
+            columns['selector_hash'].append(self._hash_bucket(selector))
+
+        self._trace_rows += rows
+        return pa.Table.from_pydict(columns, schema=TRACES_SCHEMA)
+
+    def write(
+            self,
+            output_dir: str,
+            logs_rows: int = 0,
+            traces_rows: int = 0,
+            rows_per_file: int = 1_000_000,
+            row_group_size: Optional[int] = None
+    ) -> None:
+        """
+        Write the logs and the traces into <output_dir>/logs/part-xxxxx.parquet and <output_dir>/traces/.
+        """
+        for name, rows, generate in [('logs', logs_rows, self.generate_logs),
+                                     ('traces', traces_rows, self.generate_traces)]:
+            if rows <= 0:
+                continue
+            path = os.path.join(output_dir, name)
+            pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+            for file_index, start in enumerate(range(0, rows, rows_per_file)):
+                table = generate(min(rows_per_file, rows - start))
+                pq.write_table(table, os.path.join(path, f'part-{file_index:05d}.parquet'),
+                               row_group_size=row_group_size)
+
+    def _draw(self, targets: List[SyntheticTarget], rows: int) -> List[Optional[SyntheticTarget]]:
+        """
+        None is a noise row.
+        """
+        if not targets:
+            return [None] * rows
+        drawn = self.rng.choices(targets, weights=[i.weight for i in targets], k=rows)
+        return [None if self.rng.random() < self.noise_ratio else i for i in drawn]
+
+    def _append_base_columns(self, columns: Dict[str, List], row: int) -> None:
+        block_offset = row // self.rows_per_block
+        block_timestamp = self.start_time + timedelta(seconds=block_offset * self.block_seconds)
+        columns['block_number'].append(block_offset + 1)
+        columns['block_timestamp'].append(block_timestamp)
+        # a few rows share a transaction
+        columns['transaction_hash'].append('0x' + keccak(f'{block_offset}:{row % self.rows_per_block // 4}'
+                                                         .encode('utf-8')).hex())
+        columns['dt'].append(block_timestamp.strftime('%Y-%m-%d'))
+
+    def _hash_bucket(self, value: str) -> int:
+        if value not in self._hash_buckets:
+            self._hash_buckets[value] = hash_bucket(value)
+        return self._hash_buckets[value]
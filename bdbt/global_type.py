@@ -29,6 +29,57 @@ class Database(Enum):
     REDSHIFT = 'redshift'
     SNOWFLAKE = 'snowflake'
     POSTGRES = 'postgres'
+    DUCKDB = 'duckdb'
+
+
+class SizeClass(Enum):
+    """
+    The hint of the data size of a contract, it's used to plan the batches of the backfill.
+    """
+    SMALL = 'small'
+    MEDIUM = 'medium'
+    LARGE = 'large'
+
+
+@dataclass(frozen=True)
+class LayoutOptions(DataClassDictMixin):
+    """
+    The physical layout of the generated tables, the columns which are not in a model are ignored.
+    """
+    # sort the rows within every file, the parquet min/max statistics are used to skip the row groups
+    sort_by: Optional[List[str]] = None
+    # the parquet codec, e.g. zstd / snappy
+    compression: Optional[str] = None
+    # the row group size in bytes
+    row_group_size: Optional[int] = None
+    bloom_filter_columns: Optional[List[str]] = None
+    # the target file size in bytes
+    target_file_size: Optional[int] = None
+
+    def merge(self, other: Optional['LayoutOptions']) -> 'LayoutOptions':
+        """
+        The options set in the other override the options in this one.
+        """
+        if other is None:
+            return self
+        return LayoutOptions(**{
+            k: v if v is not None else getattr(self, k) for k, v in other.to_dict().items()
+        })
+
+
+@dataclass(frozen=True)
+class TraceFilter(DataClassDictMixin):
+    """
+    Filter the traces of the call models before they are decoded.
+    """
+    # keep the successful calls only
+    success_only: bool = False
+    # e.g. call / delegatecall / staticcall, all call types by default
+    call_types: Optional[List[str]] = None
+    # e.g. call / create / suicide, all trace types by default
+    trace_types: Optional[List[str]] = None
+    # the outputs of the failed calls are null if they are not decoded
+    decode_failed_outputs: bool = True
 
 
 @dataclass(frozen=True)
@@ -39,6 +90,15 @@ class Contract(DataClassDictMixin):
     materialize: str
     # If the address is null, SQL will match all contracts.
     address: Optional[str] = None
+    # The view and pure functions are skipped by default, their traces are mostly static calls.
+    include_read_only_calls: bool = False
+    size_class: SizeClass = SizeClass.MEDIUM
+    layout: Optional[LayoutOptions] = None
+    # The models are split into versions when their ABIs are changed, instead of being decoded again.
+    versioned_models: bool = False
+    trace_filter: Optional[TraceFilter] = None
+    # The rarely emitted events decoded into the consolidated model of the project instead of their own tables.
+    consolidated_events: Optional[List[str]] = None
 
     @classmethod
     def from_dicts(
@@ -48,5 +108,11 @@ class Contract(DataClassDictMixin):
             abi=ABI.from_dicts(d['abi']),
             name=d['name'],
             materialize=d['materialize'],
-            address=d.get('address')
+            address=d.get('address'),
+            include_read_only_calls=d.get('include_read_only_calls', False),
+            size_class=SizeClass(d.get('size_class', SizeClass.MEDIUM.value)),
+            layout=LayoutOptions.from_dict(d['layout']) if d.get('layout') is not None else None,
+            versioned_models=d.get('versioned_models', False),
+            trace_filter=TraceFilter.from_dict(d['trace_filter']) if d.get('trace_filter') is not None else None,
+            consolidated_events=d.get('consolidated_events')
         )
@@ -0,0 +1,177 @@
+import cProfile
+import json
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Any, Iterator
+
+
+class ProfileFormat(Enum):
+    JSON = 'json'
+    # https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+    CHROME_TRACE = 'chrome'
+
+
+class ProfileMode(Enum):
+    CPROFILE = 'cprofile'
+    TRACEMALLOC = 'tracemalloc'
+
+
+@dataclass
+class PhaseRecord:
+    name: str
+    # the offset from the start of the profiler in seconds
+    start: float
+    wall_time: float
+    cpu_time: float
+    # the cpu time of the finished subprocesses, e.g. git and mvn
+    children_cpu_time: float
+    # the peak RSS of the process and the subprocesses until the end of the phase
+    max_rss_kb: int
+    children_max_rss_kb: int
+    # the peak of the python heap in the phase, it's only traced in the tracemalloc mode
+    traced_peak_kb: Optional[int] = None
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class PhaseProfiler:
+    """
+    Record the wall time, the cpu time and the peak memory of the phases, e.g.
+
+        with profiler.phase('transform_abi', project='opensea'):
+            ...
+
+    The phases with the name of profile_phase are profiled by cProfile or tracemalloc additionally,
+    the stats are written beside the output file. A disabled profiler records nothing.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = True,
+            profile_phase: Optional[str] = None,
+            profile_mode: ProfileMode = ProfileMode.CPROFILE
+    ):
+        self.enabled = enabled
+        self.profile_phase = profile_phase
+        self.profile_mode = profile_mode
+        self.records: List[PhaseRecord] = []
+        self._origin = time.perf_counter()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._tracemalloc_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._tracemalloc_peak = 0
+
+    @contextmanager
+    def phase(self, name: str, **args: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        traced = name == self.profile_phase
+        if traced:
+            self._start_tracing()
+
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            cpu_time = time.process_time() - cpu_start
+            traced_peak_kb = self._stop_tracing() if traced else None
+            new_self_usage = resource.getrusage(resource.RUSAGE_SELF)
+            new_children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+            self.records.append(PhaseRecord(
+                name=name,
+                start=start - self._origin,
+                wall_time=wall_time,
+                cpu_time=cpu_time,
+                children_cpu_time=(new_children_usage.ru_utime + new_children_usage.ru_stime) -
+                                  (children_usage.ru_utime + children_usage.ru_stime),
+                max_rss_kb=max(self_usage.ru_maxrss, new_self_usage.ru_maxrss),
+                children_max_rss_kb=new_children_usage.ru_maxrss,
+                traced_peak_kb=traced_peak_kb,
+                args=args
+            ))
+
+    def _start_tracing(self) -> None:
+        if self.profile_mode == ProfileMode.CPROFILE:
+            if self._cprofile is None:
+                self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            tracemalloc.start()
+
+    def _stop_tracing(self) -> Optional[int]:
+        if self.profile_mode == ProfileMode.CPROFILE:
+            self._cprofile.disable()
+            return None
+
+        _, peak = tracemalloc.get_traced_memory()
+        # keep the allocations of the phase with the highest peak
+        if peak > self._tracemalloc_peak:
+            self._tracemalloc_peak = peak
+            self._tracemalloc_snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        return peak // 1024
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate the records by the phase name.
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        for record in self.records:
+            item = summary.setdefault(record.name, {
+                'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'children_cpu_time': 0.0, 'max_rss_kb': 0})
+            item['count'] += 1
+            item['wall_time'] += record.wall_time
+            item['cpu_time'] += record.cpu_time
+            item['children_cpu_time'] += record.children_cpu_time
+            item['max_rss_kb'] = max(item['max_rss_kb'], record.max_rss_kb)
+        return summary
+
+    def dump(self, filepath: str, fmt: ProfileFormat = ProfileFormat.JSON) -> None:
+        if not self.enabled:
+            return
+
+        if fmt == ProfileFormat.CHROME_TRACE:
+            content = {'traceEvents': self._chrome_trace_events(), 'displayTimeUnit': 'ms'}
+        else:
+            content = {'phases': [i.__dict__ for i in self.records], 'summary': self.summary()}
+
+        with open(filepath, 'w') as f:
+            json.dump(content, f, indent=2)
+
+        base_path = os.path.splitext(filepath)[0]
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f'{base_path}.{self.profile_phase}.prof')
+        if self._tracemalloc_snapshot is not None:
+            with open(f'{base_path}.{self.profile_phase}.tracemalloc.txt', 'w') as f:
+                for stat in self._tracemalloc_snapshot.statistics('lineno')[:50]:
+                    f.write(f'{stat}\n')
+
+    def _chrome_trace_events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        return [{
+            'name': i.name,
+            'cat': 'codegen',
+            'ph': 'X',
+            'ts': int(i.start * 1e6),
+            'dur': int(i.wall_time * 1e6),
+            'pid': pid,
+            'tid': 0,
+            'args': {
+                **i.args,
+                'cpu_time': i.cpu_time,
+                'children_cpu_time': i.children_cpu_time,
+                'max_rss_kb': i.max_rss_kb,
+                'children_max_rss_kb': i.children_max_rss_kb,
+                'traced_peak_kb': i.traced_peak_kb
+            }
+        } for i in self.records]
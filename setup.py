@@ -41,7 +41,14 @@ setup(
     extras_require={
         'dev': [
             "pytest~=4.3.0",
-            "pyspark==3.2.1"
+            "pyspark==3.2.1",
+            "Jinja2~=3.0.3"
+        ],
+        'duckdb': [
+            "duckdb>=0.10.0",
+            "dbt-duckdb>=1.7.0",
+            # the python UDFs of DuckDB need numpy
+            "numpy"
         ]
     },
     entry_points={
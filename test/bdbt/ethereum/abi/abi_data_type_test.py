@@ -0,0 +1,73 @@
+import pickle
+import unittest
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIField,
+    ABIIntType,
+    ABIBoolType,
+    ABITupleType,
+    ABIArrayType,
+    ABIBytesType,
+)
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+
+
+class ABIDataTypeTestCase(unittest.TestCase):
+
+    def test_types_are_interned(self):
+        self.assertIs(ABIIntType(256, True), ABIIntType(bit_length=256, unsigned=True))
+        self.assertIsNot(ABIIntType(256, True), ABIIntType(256, False))
+        self.assertIs(ABIBytesType(10, False), ABIBytesType(10, False))
+
+        element_type = ABIIntType(8, False)
+        self.assertIs(
+            ABIArrayType(canonical_type='int8[]', element_type=element_type, length=-1),
+            ABIArrayType('int8[]', element_type, -1)
+        )
+
+    def test_fields_are_interned(self):
+        field = ABIField('value', ABIIntType(256, True), {'indexed': True})
+        self.assertIs(field, ABIField(name='value', ftype=ABIIntType(256, True), metadata={'indexed': True}))
+        self.assertIsNot(field, ABIField('value', ABIIntType(256, True), {'indexed': False}))
+        self.assertIs(ABITupleType([field]), ABITupleType((field,)))
+
+    def test_types_are_immutable(self):
+        atype = ABIIntType(256, True)
+        with self.assertRaises(AttributeError):
+            atype.bit_length = 8
+
+        field = ABIField('value', atype, {'indexed': True})
+        with self.assertRaises(AttributeError):
+            field.name = 'other'
+        with self.assertRaises(TypeError):
+            field.metadata['indexed'] = False
+
+    def test_tuple_add_returns_new_type(self):
+        tuple_type = ABITupleType([ABIField('key', ABIBoolType())])
+        added = tuple_type.add(ABIField('value', ABIIntType(256, True)))
+
+        self.assertEqual(1, len(tuple_type.element_fields))
+        self.assertEqual(['key', 'value'], [i.name for i in added.element_fields])
+
+    def test_rename_shares_type_tree(self):
+        tuple_type = ABITupleType([ABIField('key', ABIBoolType())])
+        field = ABIField('', tuple_type)
+        renamed = field.rename('output_0')
+
+        self.assertEqual('output_0', renamed.name)
+        self.assertIs(tuple_type, renamed.ftype)
+        self.assertEqual('', field.name)
+
+    def test_pickle_keeps_interned(self):
+        field = ABIField('values', ABITupleType([ABIField('key', ABIBoolType())]), {'indexed': False})
+        self.assertIs(field, pickle.loads(pickle.dumps(field)))
+
+    def test_transformer_revise_fields_without_copy(self):
+        tuple_type = ABITupleType([ABIField('key', ABIBoolType())])
+        fields = [ABIField('', tuple_type), ABIField('amount', ABIIntType(256, True))]
+
+        revised = ABITransformer._revise_fields(fields, 'output')
+
+        self.assertEqual(['output_0', 'output_amount'], [i.name for i in revised])
+        self.assertIs(tuple_type, revised[0].ftype)
+        self.assertEqual('', fields[0].name)
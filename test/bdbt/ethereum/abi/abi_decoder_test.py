@@ -0,0 +1,103 @@
+import json
+import unittest
+from decimal import Decimal
+
+from bdbt.ethereum.abi.abi_decoder import ABIDecoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi
+from bdbt.ethereum.exceptions import ABIDecodeError
+
+CALL_ABI = [{
+    'type': 'function',
+    'name': 'fill',
+    'stateMutability': 'nonpayable',
+    'inputs': [
+        {'name': 'amount', 'type': 'uint256'},
+        {'name': 'note', 'type': 'string'},
+        {'name': 'sides', 'type': 'uint8[]'},
+        {'name': 'order', 'type': 'tuple', 'components': [
+            {'name': 'maker', 'type': 'address'},
+            {'name': 'data', 'type': 'bytes'}
+        ]},
+        {'name': 'delta', 'type': 'int16'},
+        {'name': 'tag', 'type': 'bytes4'},
+        {'name': 'price', 'type': 'fixed128x2'}
+    ],
+    'outputs': [{'name': '', 'type': 'bool'}]
+}]
+
+EVENT_ABI = [{
+    'type': 'event',
+    'name': 'Named',
+    'anonymous': False,
+    'inputs': [
+        {'name': 'owner', 'type': 'address', 'indexed': True},
+        {'name': 'label', 'type': 'string', 'indexed': True},
+        {'name': 'value', 'type': 'uint256', 'indexed': False}
+    ]
+}]
+
+MAKER = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+
+
+def word(value: int) -> bytes:
+    return (value % 2 ** 256).to_bytes(32, 'big')
+
+
+def padded(value: bytes) -> bytes:
+    return value + bytes(-len(value) % 32)
+
+
+class ABIDecoderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = ABIDecoder()
+        self.transformer = ABITransformer()
+
+    def _call_data(self) -> bytes:
+        head = word(2 ** 255) + word(7 * 32) + word(9 * 32) + word(12 * 32) + word(-3) + padded(b'\x01\x02\x03\x04') \
+               + word(-12345)
+        note = word(3) + padded(b'abc')
+        sides = word(2) + word(1) + word(255)
+        order = word(int(MAKER, 16)) + word(64) + word(2) + padded(b'\xab\xcd')
+        return bytes.fromhex('12345678') + head + note + sides + order
+
+    def test_decode_call(self):
+        call = self.transformer.transform_abi(normalize_abi(json.dumps(CALL_ABI))).calls[0]
+        values = self.decoder.decode_call(call, self._call_data(), word(1))
+
+        self.assertEqual({
+            'amount': 2 ** 255,
+            'note': 'abc',
+            'sides': [1, 255],
+            'order': {'maker': MAKER, 'data': b'\xab\xcd'},
+            'delta': -3,
+            'tag': b'\x01\x02\x03\x04',
+            'price': Decimal('-123.45'),
+            'output_0': True
+        }, values)
+
+        self.assertIsNone(self.decoder.decode_call(call, self._call_data(), b'')['output_0'])
+
+    def test_decode_malformed_data(self):
+        call = self.transformer.transform_abi(normalize_abi(json.dumps(CALL_ABI))).calls[0]
+        data = self._call_data()
+
+        with self.assertRaises(ABIDecodeError):
+            self.decoder.decode_call(call, data[:-32], None)
+        with self.assertRaises(ABIDecodeError):
+            # the length of the array is far beyond the data
+            self.decoder.decode_call(call, data[:4 + 9 * 32] + word(2 ** 64) + data[4 + 10 * 32:], None)
+        with self.assertRaises(ABIDecodeError):
+            self.decoder.decode_call(call, b'\x12', None)
+
+    def test_decode_event(self):
+        event = self.transformer.transform_abi(normalize_abi(json.dumps(EVENT_ABI))).events[0]
+        topics = ['0x' + '00' * 32, '0x' + word(int(MAKER, 16)).hex(), '0x' + 'ff' * 32]
+
+        self.assertEqual(
+            {'owner': MAKER, 'label': None, 'value': 10 ** 18},
+            self.decoder.decode_event(event, topics, word(10 ** 18)))
+
+        with self.assertRaises(ABIDecodeError):
+            self.decoder.decode_event(event, topics[:2], word(10 ** 18))
@@ -0,0 +1,63 @@
+import json
+import unittest
+from decimal import Decimal
+
+from eth_utils import keccak
+
+from bdbt.ethereum.abi.abi_decoder import ABIDecoder
+from bdbt.ethereum.abi.abi_encoder import ABIEncoder
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi
+from bdbt.ethereum.exceptions import ABIEncodeError
+from test.bdbt.ethereum.abi.abi_decoder_test import CALL_ABI, EVENT_ABI, MAKER, word, padded
+
+CALL_VALUES = {
+    'amount': 2 ** 255,
+    'note': 'abc',
+    'sides': [1, 255],
+    'order': {'maker': MAKER, 'data': b'\xab\xcd'},
+    'delta': -3,
+    'tag': b'\x01\x02\x03\x04',
+    'price': Decimal('-123.45'),
+    'output_0': True
+}
+
+
+class ABIEncoderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = ABIEncoder()
+        self.transformer = ABITransformer()
+
+    def test_encode_call(self):
+        call = self.transformer.transform_abi(normalize_abi(json.dumps(CALL_ABI))).calls[0]
+        input_data, output_data = self.encoder.encode_call(call, CALL_VALUES)
+
+        head = word(2 ** 255) + word(7 * 32) + word(9 * 32) + word(12 * 32) + word(-3) + padded(b'\x01\x02\x03\x04') \
+               + word(-12345)
+        note = word(3) + padded(b'abc')
+        sides = word(2) + word(1) + word(255)
+        order = word(int(MAKER, 16)) + word(64) + word(2) + padded(b'\xab\xcd')
+        self.assertEqual(head + note + sides + order, input_data[4:])
+        self.assertEqual(word(1), output_data)
+        self.assertEqual(CALL_VALUES, ABIDecoder().decode_call(call, input_data, output_data))
+
+    def test_encode_event(self):
+        event = self.transformer.transform_abi(normalize_abi(json.dumps(EVENT_ABI))).events[0]
+        topics, data = self.encoder.encode_event(event, {'owner': MAKER, 'label': 'abc', 'value': 10 ** 18})
+
+        self.assertEqual(['0x' + keccak(b'Named(address,string,uint256)').hex(),
+                          '0x' + word(int(MAKER, 16)).hex(),
+                          # the indexed dynamic value is hashed
+                          '0x' + keccak(word(3) + padded(b'abc')).hex()], topics)
+        self.assertEqual(word(10 ** 18), data)
+
+    def test_encode_invalid_values(self):
+        call = self.transformer.transform_abi(normalize_abi(json.dumps(CALL_ABI))).calls[0]
+
+        with self.assertRaises(ABIEncodeError):
+            self.encoder.encode_call(call, {**CALL_VALUES, 'delta': 2 ** 15})
+        with self.assertRaises(ABIEncodeError):
+            self.encoder.encode_call(call, {**CALL_VALUES, 'tag': b'\x01'})
+        with self.assertRaises(ABIEncodeError):
+            self.encoder.encode_call(call, {**CALL_VALUES, 'price': Decimal('1.001')})
@@ -0,0 +1,91 @@
+import json
+import unittest
+
+from eth_utils import encode_hex, keccak
+
+import test
+from bdbt.ethereum.abi.abi_index import ABIIndex, element_signature
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi, event_selector, call_selector, filter_by_type, filter_by_name, \
+    filter_by_type_and_name
+
+RESOURCE_GROUP = 'dbt_test'
+
+OVERLOADED_ABI = [
+    {'type': 'function', 'name': 'transfer', 'inputs': [{'name': 'to', 'type': 'address'}], 'outputs': []},
+    {'type': 'constructor', 'inputs': []},
+    {'type': 'event', 'name': 'Moved', 'anonymous': False, 'inputs': [
+        {'name': 'amount', 'type': 'uint256', 'indexed': False}]},
+    {'type': 'function', 'name': 'transfer', 'inputs': [
+        {'name': 'to', 'type': 'address'},
+        {'name': 'item', 'type': 'tuple[]', 'components': [
+            {'name': 'id', 'type': 'uint256'},
+            {'name': 'memo', 'type': 'string'}
+        ]}
+    ], 'outputs': []}
+]
+
+
+class ABIIndexTestCase(unittest.TestCase):
+
+    def test_lookup(self):
+        index = ABIIndex(normalize_abi(json.dumps(OVERLOADED_ABI)))
+
+        self.assertEqual(['transfer'], index.names('function'))
+        self.assertEqual(1, len(index.by_type('constructor')))
+        # the overloaded functions keep the order of the ABI
+        transfers = index.by_type_and_name('function', 'transfer')
+        self.assertEqual([1, 2], [len(i.inputs) for i in transfers])
+        self.assertEqual([], index.by_type_and_name('event', 'transfer'))
+        self.assertEqual(transfers, index.by_name('transfer'))
+
+    def test_filters(self):
+        abi = normalize_abi(json.dumps(OVERLOADED_ABI))
+
+        self.assertEqual(2, len(filter_by_type('function', abi)))
+        self.assertEqual(['Moved'], [i.name for i in filter_by_name('Moved', abi)])
+        self.assertEqual([], filter_by_type_and_name('Moved', 'function', abi))
+
+    def test_lookup_by_signature_and_selector(self):
+        index = ABIIndex(normalize_abi(json.dumps(OVERLOADED_ABI)))
+        transfer = index.by_type_and_name('function', 'transfer')[1]
+
+        signature = 'transfer(address,(uint256,string)[])'
+        self.assertEqual(signature, element_signature(transfer))
+        self.assertEqual([transfer], index.by_signature(signature))
+
+        selector = encode_hex(keccak(text=signature))[0:10]
+        self.assertEqual(selector, index.selector(transfer))
+        self.assertEqual([transfer], index.by_selector(selector.upper().replace('0X', '0x')))
+        self.assertEqual([], index.by_selector('0x00000000'))
+
+    def test_transform_selectors(self):
+        abi = ABITransformer().transform_abi(normalize_abi(test.read_resource([RESOURCE_GROUP], 'erc20_abi.json')))
+        transfer_event = [i for i in abi.events if i.name == 'Transfer'][0]
+        transfer_call = [i for i in abi.calls if i.name == 'transfer'][0]
+
+        self.assertEqual('0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef', transfer_event.selector)
+        self.assertEqual('0xa9059cbb', transfer_call.selector)
+
+        # the schemas without the selector are hashed on demand
+        self.assertEqual(transfer_event.selector, event_selector(
+            type(transfer_event)(transfer_event.name, transfer_event.inputs, transfer_event.raw_schema)))
+        self.assertEqual(transfer_call.selector, call_selector(type(transfer_call)(
+            transfer_call.name, transfer_call.inputs, transfer_call.outputs, transfer_call.raw_schema)))
+
+    def test_transform_order(self):
+        abi = ABITransformer().transform_abi(
+            normalize_abi(test.read_resource([RESOURCE_GROUP], 'wyvern_exchange_v2_abi.json')))
+
+        # the schemas are in the order of the ABI
+        self.assertEqual(['OrderApprovedPartOne', 'OrderApprovedPartTwo', 'OrderCancelled', 'OrdersMatched',
+                          'NonceIncremented', 'OwnershipRenounced', 'OwnershipTransferred'],
+                         [i.name for i in abi.events])
+
+    def test_transform_with_index_of_another_abi(self):
+        abi = normalize_abi(json.dumps(OVERLOADED_ABI))
+        index = ABIIndex(normalize_abi(json.dumps(OVERLOADED_ABI)))
+
+        with self.assertRaises(ValueError):
+            ABITransformer().transform_abi_call(abi, 'transfer', index)
+        self.assertEqual(2, len(ABITransformer().transform_abi_call(abi, 'transfer', ABIIndex(abi))))
@@ -12,6 +12,7 @@ from bdbt.ethereum.abi.abi_data_type import (
     ABIFixedType
 )
 from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.abi_type import ABICall
 from bdbt.ethereum.abi.utils import normalize_abi
 
 RESOURCE_GROUP = 'abi_test'
@@ -103,3 +104,24 @@ class ABITransformerTestCase(unittest.TestCase):
         afield2 = atype.element_fields[1]
         self.assertEqual("key", afield2.name)
         self.assertEqual("string", afield2.ftype.canonical_type)
+
+    def test_transform_abi_without_read_only_calls(self):
+        transformer = ABITransformer()
+        abi = normalize_abi(test.read_resource(['dbt_test'], 'wyvern_exchange_v2_abi.json'))
+
+        all_calls = {i.name: i for i in transformer.transform_abi(abi).calls}
+        calls = {i.name: i for i in transformer.transform_abi(abi, include_read_only_calls=False).calls}
+
+        self.assertIn('calculateFinalPrice', all_calls)
+        self.assertIn('guardedArrayReplace', all_calls)
+        self.assertNotIn('calculateFinalPrice', calls)
+        self.assertNotIn('guardedArrayReplace', calls)
+        self.assertIn('atomicMatch_', calls)
+        self.assertTrue(all(not i.raw_schema.is_read_only for i in calls.values()))
+
+    def test_call_is_read_only(self):
+        self.assertTrue(ABICall.from_dict({'type': 'function', 'name': 'a', 'stateMutability': 'pure'}).is_read_only)
+        self.assertFalse(ABICall.from_dict({'type': 'function', 'name': 'a', 'stateMutability': 'payable'}).is_read_only)
+        # the legacy ABIs only have the constant field
+        self.assertTrue(ABICall.from_dict({'type': 'function', 'name': 'a', 'constant': True}).is_read_only)
+        self.assertFalse(ABICall.from_dict({'type': 'function', 'name': 'a'}).is_read_only)
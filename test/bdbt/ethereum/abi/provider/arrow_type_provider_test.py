@@ -0,0 +1,87 @@
+import unittest
+
+import pyarrow as pa
+
+import test
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIIntType,
+    ABIFixedType,
+    ABIBytesType,
+    ABIArrayType,
+    ABITupleType,
+    ABIField,
+    ABIAddressType
+)
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.provider.arrow_type_provider import ArrowDataTypeProvider, ArrowModelDataTypeProvider
+from bdbt.ethereum.abi.utils import normalize_abi
+
+
+class ArrowDataTypeProviderTestCase(unittest.TestCase):
+
+    def test_transform_int_type(self):
+        provider = ArrowDataTypeProvider()
+
+        self.assertEqual(pa.uint8(), provider.transform(ABIIntType(8, True)))
+        self.assertEqual(pa.int32(), provider.transform(ABIIntType(24, False)))
+        self.assertEqual(pa.uint64(), provider.transform(ABIIntType(64, True)))
+        # the max uint128 has 39 digits
+        self.assertEqual(pa.decimal128(22, 0), provider.transform(ABIIntType(72, True)))
+        self.assertEqual(pa.decimal256(39, 0), provider.transform(ABIIntType(128, True)))
+        # the max uint256 has 78 digits
+        self.assertEqual(pa.binary(32), provider.transform(ABIIntType(256, True)))
+        self.assertEqual(pa.binary(32), provider.transform(ABIIntType(256, False)))
+        self.assertEqual(pa.decimal256(76, 0),
+                         ArrowDataTypeProvider(wide_int_as_decimal=True).transform(ABIIntType(256, True)))
+
+    def test_transform_model_type(self):
+        provider = ArrowModelDataTypeProvider()
+
+        self.assertEqual(pa.int32(), provider.transform(ABIIntType(8, True)))
+        self.assertEqual(pa.int64(), provider.transform(ABIIntType(32, True)))
+        self.assertEqual(pa.decimal128(38, 0), provider.transform(ABIIntType(64, True)))
+        self.assertEqual(pa.decimal128(38, 0), provider.transform(ABIIntType(256, False)))
+        self.assertEqual(pa.binary(), provider.transform(ABIBytesType(32, False)))
+        self.assertEqual(pa.list_(pa.int32()), provider.transform(ABIArrayType('uint8[2]', ABIIntType(8, True), 2)))
+        # the values out of the range of decimal(38, 0) are null, the same as the models
+        self.assertEqual(10 ** 37, provider.to_arrow_value(ABIIntType(256, True), 10 ** 37))
+        self.assertIsNone(provider.to_arrow_value(ABIIntType(256, True), 10 ** 38))
+
+    def test_transform_fixed_type(self):
+        provider = ArrowDataTypeProvider()
+
+        self.assertEqual(pa.decimal128(20, 18), provider.transform(ABIFixedType(64, 18, True)))
+        self.assertEqual(pa.decimal256(39, 18), provider.transform(ABIFixedType(128, 18, True)))
+
+    def test_transform_nested_type(self):
+        provider = ArrowDataTypeProvider()
+        tuple_type = ABITupleType([
+            ABIField('owner', ABIAddressType()),
+            ABIField('hash', ABIBytesType(32, False)),
+            ABIField('data', ABIBytesType(32, True))
+        ])
+
+        self.assertEqual(
+            pa.list_(pa.struct([
+                pa.field('owner', pa.string(), metadata={'abi_type': 'address'}),
+                pa.field('hash', pa.binary(32), metadata={'abi_type': 'bytes32'}),
+                pa.field('data', pa.binary(), metadata={'abi_type': 'bytes32'})
+            ]), 2),
+            provider.transform(ABIArrayType('tuple[2]', tuple_type, 2))
+        )
+        self.assertEqual(pa.list_(pa.uint8()), provider.transform(ABIArrayType('uint8[]', ABIIntType(8, True), -1)))
+
+    def test_transform_schema(self):
+        provider = ArrowDataTypeProvider()
+        abi = ABITransformer().transform_abi(normalize_abi(test.read_resource(['dbt_test'], 'erc20_abi.json')))
+
+        transfer = provider.transform_event_schema([i for i in abi.events if i.name == 'Transfer'][0])
+        self.assertEqual(['from', 'to', 'value'], transfer.names)
+        self.assertEqual(pa.binary(32), transfer.field('value').type)
+        self.assertEqual(b'uint256', transfer.field('value').metadata[b'abi_type'])
+        self.assertEqual(b'Transfer', transfer.metadata[b'name'])
+
+        balance_of = provider.transform_call_schema([i for i in abi.calls if i.name == 'balanceOf'][0])
+        self.assertEqual(1, len(balance_of.names) - len([i for i in balance_of.names if i.startswith('output_')]))
+        self.assertTrue(pa.table({i.name: pa.array([], i.type) for i in balance_of}).schema.equals(
+            balance_of, check_metadata=False))
@@ -0,0 +1,41 @@
+import unittest
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIIntType,
+    ABIFixedType,
+    ABIAddressType,
+    ABIArrayType,
+    ABIBytesType,
+    ABITupleType,
+    ABIField,
+    ABIBoolType
+)
+from bdbt.ethereum.abi.provider.duckdb_type_provider import DuckDBTypeStringProvider, DuckDBJsonStructureProvider
+
+
+class DuckDBTypeProviderTestCase(unittest.TestCase):
+
+    def test_transform_int_type(self):
+        provider = DuckDBTypeStringProvider()
+
+        self.assertEqual('INTEGER', provider.transform(ABIIntType(32, False)))
+        self.assertEqual('BIGINT', provider.transform(ABIIntType(32, True)))
+        self.assertEqual('HUGEINT', provider.transform(ABIIntType(64, True)))
+        self.assertEqual('HUGEINT', provider.transform(ABIIntType(128, False)))
+        self.assertEqual('DECIMAL(38, 0)', provider.transform(ABIIntType(256, True)))
+        self.assertEqual('VARCHAR', DuckDBTypeStringProvider(wide_int_as_string=True).transform(ABIIntType(256, True)))
+        self.assertEqual('DECIMAL(20, 18)', provider.transform(ABIFixedType(64, 18, True)))
+
+    def test_transform_nested_type(self):
+        tuple_type = ABITupleType([
+            ABIField('owner', ABIAddressType()),
+            ABIField('ids', ABIArrayType('uint8[]', ABIIntType(8, True), -1)),
+            ABIField('data', ABIBytesType(32, False)),
+            ABIField('valid', ABIBoolType())
+        ])
+        array_type = ABIArrayType('tuple[]', tuple_type, -1)
+
+        self.assertEqual('STRUCT("owner" VARCHAR, "ids" INTEGER[], "data" VARCHAR, "valid" BOOLEAN)[]',
+                         DuckDBTypeStringProvider().transform(array_type))
+        self.assertEqual([{'owner': 'VARCHAR', 'ids': ['INTEGER'], 'data': 'VARCHAR', 'valid': 'BOOLEAN'}],
+                         DuckDBJsonStructureProvider().transform(array_type))
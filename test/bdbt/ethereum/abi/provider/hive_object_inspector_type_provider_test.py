@@ -0,0 +1,46 @@
+import unittest
+
+from bdbt.ethereum.abi.abi_data_type import ABIIntType, ABIFixedType, ABIAddressType
+from bdbt.ethereum.abi.provider.hive_object_inspector_type_provider import HiveObjectInspectorTypeProvider
+
+
+class HiveObjectInspectorTypeProviderTestCase(unittest.TestCase):
+    decimal_38_0 = 'PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(' \
+                   'TypeInfoFactory.getDecimalTypeInfo(38, 0))'
+
+    def test_transform_int_type(self):
+        provider = HiveObjectInspectorTypeProvider()
+
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableIntObjectInspector',
+                         provider.transform(ABIIntType(32, False)))
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableLongObjectInspector',
+                         provider.transform(ABIIntType(32, True)))
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableLongObjectInspector',
+                         provider.transform(ABIIntType(64, False)))
+        self.assertEqual(self.decimal_38_0, provider.transform(ABIIntType(64, True)))
+        self.assertEqual(self.decimal_38_0, provider.transform(ABIIntType(256, True)))
+
+    def test_transform_wide_int_type_as_string(self):
+        provider = HiveObjectInspectorTypeProvider(wide_int_as_string=True)
+
+        # the max uint120 has 37 digits and the max int128 has 39 digits
+        self.assertEqual(self.decimal_38_0, provider.transform(ABIIntType(120, True)))
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableStringObjectInspector',
+                         provider.transform(ABIIntType(128, False)))
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableStringObjectInspector',
+                         provider.transform(ABIIntType(256, True)))
+
+    def test_transform_fixed_type(self):
+        provider = HiveObjectInspectorTypeProvider()
+
+        self.assertEqual('PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector('
+                         'TypeInfoFactory.getDecimalTypeInfo(20, 18))',
+                         provider.transform(ABIFixedType(64, 18, True)))
+        self.assertEqual('PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector('
+                         'TypeInfoFactory.getDecimalTypeInfo(38, 18))',
+                         provider.transform(ABIFixedType(128, 18, False)))
+
+    def test_transform_address_type(self):
+        provider = HiveObjectInspectorTypeProvider()
+        self.assertEqual('PrimitiveObjectInspectorFactory.writableStringObjectInspector',
+                         provider.transform(ABIAddressType()))
@@ -0,0 +1,46 @@
+import unittest
+
+from bdbt.ethereum.abi.abi_data_type import (
+    ABIIntType,
+    ABIFixedType,
+    ABIAddressType,
+    ABIArrayType,
+    ABIBytesType,
+    ABITupleType,
+    ABIField,
+    ABIBoolType
+)
+from bdbt.ethereum.abi.provider.hive_type_string_provider import HiveTypeStringProvider
+
+
+class HiveTypeStringProviderTestCase(unittest.TestCase):
+
+    def test_transform_int_type(self):
+        provider = HiveTypeStringProvider()
+
+        self.assertEqual('int', provider.transform(ABIIntType(32, False)))
+        self.assertEqual('bigint', provider.transform(ABIIntType(32, True)))
+        self.assertEqual('decimal(38,0)', provider.transform(ABIIntType(64, True)))
+        self.assertEqual('decimal(38,0)', provider.transform(ABIIntType(256, True)))
+
+    def test_transform_wide_int_type_as_string(self):
+        provider = HiveTypeStringProvider(wide_int_as_string=True)
+
+        self.assertEqual('decimal(38,0)', provider.transform(ABIIntType(120, True)))
+        self.assertEqual('string', provider.transform(ABIIntType(256, True)))
+
+    def test_transform_fixed_type(self):
+        provider = HiveTypeStringProvider()
+        self.assertEqual('decimal(20,18)', provider.transform(ABIFixedType(64, 18, True)))
+
+    def test_transform_nested_type(self):
+        provider = HiveTypeStringProvider()
+        tuple_type = ABITupleType([
+            ABIField('owner', ABIAddressType()),
+            ABIField('ids', ABIArrayType('uint8[]', ABIIntType(8, True), 0)),
+            ABIField('data', ABIBytesType(32, False)),
+            ABIField('valid', ABIBoolType())
+        ])
+
+        self.assertEqual('array<struct<owner:string,ids:array<int>,data:binary,valid:boolean>>',
+                         provider.transform(ABIArrayType('tuple[]', tuple_type, 0)))
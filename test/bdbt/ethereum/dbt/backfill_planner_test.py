@@ -0,0 +1,48 @@
+import unittest
+from datetime import date
+
+from bdbt.ethereum.dbt.backfill_planner import BackfillPlanner
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest, CodegenModel
+from bdbt.global_type import SizeClass
+
+
+class BackfillPlannerTestCase(unittest.TestCase):
+    manifest = CodegenManifest(models={
+        'a_evt_large': CodegenModel(checksum='1', materialize='increment', size_class=SizeClass.LARGE),
+        'b_evt_small': CodegenModel(checksum='2', materialize='increment', size_class=SizeClass.SMALL),
+        'c_evt_small': CodegenModel(checksum='3', materialize='increment', size_class=SizeClass.SMALL),
+        'd_evt_table': CodegenModel(checksum='4', materialize='table', size_class=SizeClass.SMALL),
+        'e_evt_view': CodegenModel(checksum='5', materialize='view', size_class=SizeClass.SMALL),
+    })
+
+    def test_plan(self):
+        planner = BackfillPlanner(batch_days={SizeClass.SMALL: 30, SizeClass.LARGE: 10})
+        batches = planner.plan(self.manifest, date(2022, 1, 1), date(2022, 1, 31))
+
+        small_batches = [i for i in batches if 'b_evt_small' in i.models]
+        self.assertEqual(2, len(small_batches))
+        self.assertEqual(('b_evt_small', 'c_evt_small'), small_batches[0].models)
+        self.assertEqual((date(2022, 1, 1), date(2022, 1, 30)), (small_batches[0].dt_start, small_batches[0].dt_end))
+        self.assertEqual((date(2022, 1, 31), date(2022, 1, 31)), (small_batches[1].dt_start, small_batches[1].dt_end))
+
+        large_batches = [i for i in batches if 'a_evt_large' in i.models]
+        self.assertEqual(4, len(large_batches))
+        self.assertEqual(date(2022, 1, 21), large_batches[2].dt_start)
+
+        # the table models and the views are not backfilled by dt
+        self.assertEqual(6, len(batches))
+        self.assertEqual(
+            """dbt run --select b_evt_small c_evt_small --vars '{"dt_start": "2022-01-01", "dt_end": "2022-01-30"}'""",
+            small_batches[0].dbt_command
+        )
+
+    def test_plan_selected_models(self):
+        planner = BackfillPlanner(max_models_per_batch=1)
+        batches = planner.plan(self.manifest, date(2022, 1, 1), date(2022, 1, 2), ['b_evt_small', 'c_evt_small'])
+
+        self.assertEqual([('b_evt_small',), ('c_evt_small',)], [i.models for i in batches])
+
+        with self.assertRaises(ValueError):
+            planner.plan(self.manifest, date(2022, 1, 1), date(2022, 1, 2), ['unknown'])
+        with self.assertRaises(ValueError):
+            planner.plan(self.manifest, date(2022, 1, 2), date(2022, 1, 1))
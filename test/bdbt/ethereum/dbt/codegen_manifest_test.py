@@ -0,0 +1,84 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest, CodegenChanges, CodegenModel
+from bdbt.global_type import SizeClass
+
+
+class CodegenManifestTestCase(unittest.TestCase):
+
+    @staticmethod
+    def _write_model(codegen_dir: str, project: str, model_name: str, content: str) -> None:
+        pathlib.Path(os.path.join(codegen_dir, project)).mkdir(parents=True, exist_ok=True)
+        with open(os.path.join(codegen_dir, project, model_name + '.sql'), 'w') as f:
+            f.write(content)
+
+    def test_manifest_from_dir(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._write_model(tempdir, 'opensea', 'opensea_A_evt_X', 'select 1')
+            self._write_model(tempdir, 'uniswap', 'uniswap_B_call_y', 'select 2')
+
+            manifest = CodegenManifest.from_dir(tempdir)
+            self.assertEqual(['opensea_A_evt_X', 'uniswap_B_call_y'], sorted(manifest.models.keys()))
+
+            # the fingerprint of the codegen options is a part of the checksum
+            self.assertNotEqual(manifest.models, CodegenManifest.from_dir(tempdir, 'wide_int_as_string=True').models)
+
+            manifest.models['opensea_A_evt_X'].materialize = 'increment'
+            manifest.models['opensea_A_evt_X'].size_class = SizeClass.LARGE
+            manifest_path = os.path.join(tempdir, 'codegen_manifest.json')
+            manifest.dump(manifest_path)
+            self.assertEqual(manifest, CodegenManifest.load(manifest_path))
+
+    def test_manifest_ignores_physical_configs(self):
+        model = """{{{{
+    config(
+        materialized='incremental',{config}
+        alias='x'
+    )
+}}}}
+
+select /*+ {hint} */ *
+from base{sort_by}
+"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._write_model(tempdir, 'opensea', 'opensea_A_evt_X', model.format(
+                config='', hint='REPARTITION(dt)', sort_by=''))
+            manifest = CodegenManifest.from_dir(tempdir)
+
+            self._write_model(tempdir, 'opensea', 'opensea_A_evt_X', model.format(
+                config="\n        options={'compression': 'zstd'},"
+                       '\n        pre_hook=["set spark.sql.shuffle.partitions=8"],'
+                       '\n        post_hook=["reset spark.sql.shuffle.partitions"],',
+                hint='REBALANCE(dt)', sort_by='\nsort by `evt_block_number`'))
+            self.assertEqual(manifest, CodegenManifest.from_dir(tempdir))
+
+            self._write_model(tempdir, 'opensea', 'opensea_A_evt_X', model.format(
+                config='', hint='REPARTITION(dt)', sort_by='\nwhere dt = 1'))
+            self.assertNotEqual(manifest, CodegenManifest.from_dir(tempdir))
+
+    def test_compare(self):
+        previous = CodegenManifest(models={i: CodegenModel(checksum=j) for i, j in [('a', '1'), ('b', '2'), ('c', '3')]})
+        current = CodegenManifest(
+            models={i: CodegenModel(checksum=j) for i, j in [('a', '1'), ('b', '4'), ('d', '5'), ('e', '6')]})
+
+        changes = CodegenChanges.compare(previous, current)
+        self.assertEqual(['d', 'e'], changes.added)
+        self.assertEqual(['b'], changes.changed)
+        self.assertEqual(['c'], changes.removed)
+        self.assertEqual(['a'], changes.unchanged)
+        self.assertEqual('b d e', changes.selectors['added_or_changed'])
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            changes_path = os.path.join(tempdir, 'codegen_changes.json')
+            changes.dump(changes_path)
+            with open(changes_path, 'r') as f:
+                self.assertEqual('d e', json.load(f)['select']['added'])
+
+    def test_compare_without_previous(self):
+        changes = CodegenChanges.compare(None, CodegenManifest(models={'a': CodegenModel(checksum='1')}))
+        self.assertEqual(['a'], changes.added)
+        self.assertEqual([], changes.unchanged)
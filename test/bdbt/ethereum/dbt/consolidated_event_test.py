@@ -0,0 +1,31 @@
+import unittest
+from typing import AnyStr
+
+import test
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEventMember, ConsolidatedEvents
+from bdbt.global_type import SizeClass
+
+RESOURCE_GROUP = 'dbt_test'
+
+
+def _read_resource(file_name: str) -> AnyStr:
+    return test.read_resource([RESOURCE_GROUP], file_name)
+
+
+class ConsolidatedEventTestCase(unittest.TestCase):
+
+    def test_consolidated_events(self):
+        events = ABITransformer().transform_abi(normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))).events
+        consolidated_events = ConsolidatedEvents('opensea', (
+            ConsolidatedEventMember('WyvernExchangeV2', None, events[0], SizeClass.SMALL),
+            ConsolidatedEventMember('WyvernExchangeV2', None, events[1], SizeClass.LARGE)
+        ))
+
+        self.assertEqual('opensea_evt_consolidated', consolidated_events.model_name)
+        self.assertEqual(SizeClass.LARGE, consolidated_events.size_class)
+        self.assertTrue(consolidated_events.contains('WyvernExchangeV2', events[1].name))
+        self.assertFalse(consolidated_events.contains('WyvernExchangeV2', events[2].name))
+        self.assertFalse(consolidated_events.contains('WyvernExchange', events[0].name))
+        self.assertEqual(consolidated_events, ConsolidatedEvents('opensea', consolidated_events.members))
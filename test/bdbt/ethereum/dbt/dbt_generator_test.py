@@ -0,0 +1,290 @@
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+from typing import AnyStr, Optional
+
+import yaml
+
+import test
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest
+from bdbt.ethereum.dbt.dbt_generator import DbtGenerator
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import ModelStats
+from bdbt.global_type import Database, SizeClass
+from bdbt.profiler import PhaseProfiler
+
+RESOURCE_GROUP = 'dbt_test'
+
+
+def _get_resource_path(file_name: str) -> AnyStr:
+    return test.get_resource_path([RESOURCE_GROUP], file_name)
+
+
+def _read_resource(file_name: str) -> AnyStr:
+    return test.read_resource([RESOURCE_GROUP], file_name)
+
+
+class DbtGeneratorTestCase(unittest.TestCase):
+    remote_workspace = 's3a://test'
+
+    @staticmethod
+    def _prepare_dbt_dir(dbt_dir: str, **options) -> None:
+        shutil.copyfile(_get_resource_path('dbt_project.yml'), os.path.join(dbt_dir, 'dbt_project.yml'))
+        pathlib.Path(os.path.join(dbt_dir, 'contracts', 'opensea')).mkdir(parents=True)
+        pathlib.Path(os.path.join(dbt_dir, 'models')).mkdir(parents=True)
+
+        contract = {
+            'name': 'WyvernExchangeV2',
+            'address': '0x7f268357a8c2552623316e2562d90e642bb538e5',
+            'materialize': 'increment',
+            'abi': json.loads(_read_resource('wyvern_exchange_v2_abi.json')),
+            **options
+        }
+        with open(os.path.join(dbt_dir, 'contracts', 'opensea', 'WyvernExchangeV2.json'), 'w') as f:
+            json.dump(contract, f)
+
+    def test_replenish_project_yml(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir)
+            generator = DbtGenerator(database=Database.SPARK, dbt_dir=tempdir, remote_dir_url=self.remote_workspace)
+
+            # the hooks should not be duplicated when generating again
+            generator._replenish_project_yml()
+            generator._replenish_project_yml()
+
+            with open(os.path.join(tempdir, 'dbt_project.yml'), 'r') as f:
+                project_conf = yaml.safe_load(f)
+
+            self.assertEqual(['{{ register_codegen_udfs() }}'], project_conf['on-run-start'])
+            self.assertEqual(
+                {'+schema': 'opensea', '+tags': ['chain_ethereum', 'level_parse', 'proj_opensea']},
+                project_conf['models']['ethereum_source']['codegen']['opensea']
+            )
+
+    def test_gen_models_and_udfs_by_project(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir)
+            profiler = PhaseProfiler()
+            generator = DbtGenerator(database=Database.SPARK, dbt_dir=tempdir, remote_dir_url=self.remote_workspace,
+                                     profiler=profiler)
+            os.mkdir(generator.codegen_dir)
+
+            udfs = generator._gen_models_and_schema(udf_workspace=os.path.join(tempdir, 'udf'))
+
+            project_path = os.path.join(generator.codegen_dir, 'opensea')
+            model_names = sorted(i[:-4] for i in os.listdir(project_path) if i.endswith('.sql'))
+            with open(os.path.join(project_path, 'schema.yml'), 'r') as f:
+                schema = yaml.safe_load(f)
+
+            self.assertEqual(2, schema['version'])
+            self.assertEqual(model_names, sorted(i['name'] for i in schema['models']))
+            self.assertEqual(model_names, sorted(generator.model_hints.keys()))
+            self.assertEqual(len(os.listdir(os.path.join(tempdir, 'udf'))), len(udfs))
+            self.assertTrue(all(i.project_name == 'opensea' and i.model_name in model_names for i in udfs))
+            self.assertEqual(
+                ['find_shared_events', 'load_contracts', 'transform_abi', 'gen_models', 'gen_udfs'],
+                [i.name for i in profiler.records]
+            )
+
+    def test_gen_shared_event_models(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir)
+            for project, name, address in [('aave', 'AToken', '0x0000000000000000000000000000000000000001'),
+                                           ('uniswap', 'UNI', '0x0000000000000000000000000000000000000002')]:
+                pathlib.Path(os.path.join(tempdir, 'contracts', project)).mkdir(parents=True)
+                with open(os.path.join(tempdir, 'contracts', project, f'{name}.json'), 'w') as f:
+                    json.dump({'name': name, 'address': address, 'materialize': 'increment',
+                               'abi': json.loads(_read_resource('erc20_abi.json'))}, f)
+
+            generator = DbtGenerator(database=Database.SPARK, dbt_dir=tempdir, remote_dir_url=self.remote_workspace,
+                                     shared_event_min_contracts=2)
+            os.mkdir(generator.codegen_dir)
+            generator._gen_models_and_schema()
+
+            shared_dir = os.path.join(generator.codegen_dir, 'shared')
+            shared_transfer = [i for i in os.listdir(shared_dir) if i.endswith('_evt_Transfer.sql')]
+            self.assertEqual(1, len(shared_transfer))
+            with open(os.path.join(shared_dir, shared_transfer[0]), 'r') as f:
+                content = f.read()
+            self.assertIn('address in (lower("0x0000000000000000000000000000000000000001"), '
+                          'lower("0x0000000000000000000000000000000000000002"))', content)
+
+            with open(os.path.join(generator.codegen_dir, 'uniswap', 'uniswap_UNI_evt_Transfer.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("materialized='view'", content)
+            self.assertIn("from {{ ref('%s') }}" % shared_transfer[0][:-4], content)
+            self.assertIn('where contract_address = lower("0x0000000000000000000000000000000000000002")', content)
+
+            with open(os.path.join(shared_dir, 'schema.yml'), 'r') as f:
+                self.assertEqual(2, len(yaml.safe_load(f)['models']))
+
+            hints = generator.model_hints
+            self.assertEqual(('view', SizeClass.MEDIUM), hints['uniswap_UNI_evt_Transfer'])
+            self.assertEqual(('increment', SizeClass.MEDIUM), hints[shared_transfer[0][:-4]])
+
+    def test_gen_consolidated_event_models(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir, consolidated_events=['OrderCancelled'])
+            generator = DbtGenerator(
+                database=Database.SPARK, dbt_dir=tempdir, remote_dir_url=self.remote_workspace,
+                consolidated_event_max_daily_bytes=1024,
+                model_daily_bytes={'opensea_WyvernExchangeV2_evt_NonceIncremented': 1024,
+                                   'opensea_WyvernExchangeV2_evt_OrdersMatched': 1025}
+            )
+            os.mkdir(generator.codegen_dir)
+            udfs = generator._gen_models_and_schema(udf_workspace=os.path.join(tempdir, 'udf'))
+
+            project_path = os.path.join(generator.codegen_dir, 'opensea')
+            with open(os.path.join(project_path, 'opensea_evt_consolidated.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("alias='evt_consolidated'", content)
+            self.assertIn("then 'OrderCancelled'", content)
+            self.assertIn("then 'NonceIncremented'", content)
+            self.assertNotIn("then 'OrdersMatched'", content)
+
+            with open(os.path.join(project_path, 'opensea_WyvernExchangeV2_evt_OrderCancelled.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("materialized='view'", content)
+            self.assertIn("from {{ ref('opensea_evt_consolidated') }}", content)
+
+            with open(os.path.join(project_path, 'schema.yml'), 'r') as f:
+                models = {i['name']: i for i in yaml.safe_load(f)['models']}
+            self.assertEqual(['evt_block_number', 'evt_block_time', 'evt_index', 'evt_tx_hash', 'contract_address',
+                              'dt', 'contract_name', 'event_name', 'payload'],
+                             [i['name'] for i in models['opensea_evt_consolidated']['columns']])
+
+            hints = generator.model_hints
+            self.assertEqual(('view', SizeClass.MEDIUM), hints['opensea_WyvernExchangeV2_evt_OrderCancelled'])
+            self.assertEqual(('view', SizeClass.MEDIUM), hints['opensea_WyvernExchangeV2_evt_NonceIncremented'])
+            self.assertEqual(('increment', SizeClass.MEDIUM), hints['opensea_WyvernExchangeV2_evt_OrdersMatched'])
+            self.assertEqual(('increment', SizeClass.MEDIUM), hints['opensea_evt_consolidated'])
+
+            # the UDFs of the consolidated events are registered with the consolidated model
+            udf_models = [i.model_name for i in udfs]
+            self.assertEqual(2, udf_models.count('opensea_evt_consolidated'))
+            self.assertNotIn('opensea_WyvernExchangeV2_evt_OrderCancelled', udf_models)
+
+    def test_gen_consolidated_event_models_unsupported(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir, consolidated_events=['OrderCancelled'])
+            generator = DbtGenerator(database=Database.DUCKDB, dbt_dir=tempdir, remote_dir_url='')
+            os.mkdir(generator.codegen_dir)
+
+            with self.assertLogs('DbtGenerator', level='WARNING') as logs:
+                generator._gen_models_and_schema()
+
+            self.assertIn('opensea has 1 events to consolidate', logs.output[0])
+            project_path = os.path.join(generator.codegen_dir, 'opensea')
+            self.assertFalse(os.path.exists(os.path.join(project_path, 'opensea_evt_consolidated.sql')))
+            self.assertEqual(('increment', SizeClass.MEDIUM),
+                             generator.model_hints['opensea_WyvernExchangeV2_evt_OrderCancelled'])
+
+    def test_gen_versioned_models(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir)
+            abi = json.loads(_read_resource('erc20_abi.json'))
+            contract_path = os.path.join(tempdir, 'contracts', 'opensea', 'Token.json')
+
+            def generate(cutover_dt: str, previous: Optional[DbtGenerator] = None) -> DbtGenerator:
+                with open(contract_path, 'w') as f:
+                    json.dump({'name': 'Token', 'address': '0x0000000000000000000000000000000000000001',
+                               'materialize': 'increment', 'versioned_models': True, 'abi': abi}, f)
+                previous_manifest = CodegenManifest.load(previous.codegen_manifest_path) if previous else None
+                new_generator = DbtGenerator(database=Database.SPARK, dbt_dir=tempdir,
+                                             remote_dir_url=self.remote_workspace, version_cutover_dt=cutover_dt)
+                shutil.rmtree(new_generator.codegen_dir, ignore_errors=True)
+                os.mkdir(new_generator.codegen_dir)
+                new_generator._gen_models_and_schema(previous_manifest=previous_manifest)
+                new_generator._gen_manifest_and_changes(previous_manifest)
+                return new_generator
+
+            generator = generate('2022-06-01')
+            project_path = os.path.join(generator.codegen_dir, 'opensea')
+            self.assertTrue(os.path.exists(os.path.join(project_path, 'opensea_Token_evt_Transfer.sql')))
+
+            transfer = [i for i in abi if i.get('name') == 'Transfer'][0]
+            transfer['inputs'].append({'indexed': False, 'name': 'memo', 'type': 'string'})
+            generator = generate('2022-07-01', generator)
+
+            with open(os.path.join(project_path, 'opensea_Token_evt_Transfer_v1.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("alias='token_evt_transfer'", content)
+            self.assertIn("% 10 and dt < '2022-07-01'", content)
+            with open(os.path.join(project_path, 'opensea_Token_evt_Transfer_v2.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("alias='token_evt_transfer_v2'", content)
+            self.assertIn("% 10 and dt >= '2022-07-01'", content)
+            with open(os.path.join(project_path, 'opensea_Token_evt_Transfer.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("alias='token_evt_transfer_all'", content)
+            self.assertIn("""    cast(null as string) as `memo`
+from {{ ref('opensea_Token_evt_Transfer_v1') }}
+union all
+""", content)
+
+            with open(os.path.join(project_path, 'schema.yml'), 'r') as f:
+                models = {i['name']: i for i in yaml.safe_load(f)['models']}
+            self.assertIn('memo', [i['name'] for i in models['opensea_Token_evt_Transfer']['columns']])
+            self.assertIn('opensea_Token_evt_Transfer_v1', models)
+
+            with open(generator.codegen_changes_path, 'r') as f:
+                changes = json.load(f)
+            # the first version keeps the table, only the new version needs to be decoded
+            self.assertEqual(['opensea_Token_evt_Transfer_v2'], changes['added'])
+            self.assertEqual(['opensea_Token_evt_Transfer'], changes['changed'])
+            self.assertIn('opensea_Token_evt_Transfer_v1', changes['unchanged'])
+            self.assertEqual(('view', SizeClass.MEDIUM), generator.model_hints['opensea_Token_evt_Transfer'])
+
+    def test_manifest_ignores_model_stats(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            self._prepare_dbt_dir(tempdir)
+
+            def generate(**codegen_options) -> CodegenManifest:
+                generator = DbtGenerator(database=Database.SPARK, dbt_dir=tempdir,
+                                         remote_dir_url=self.remote_workspace, codegen_options=codegen_options)
+                shutil.rmtree(generator.codegen_dir, ignore_errors=True)
+                os.mkdir(generator.codegen_dir)
+                generator._gen_models_and_schema()
+                return CodegenManifest.from_dir(generator.codegen_dir, generator._codegen.output_fingerprint())
+
+            model_name = 'opensea_WyvernExchangeV2_evt_OrdersMatched'
+            manifest = generate()
+            tuned_manifest = generate(session_tuning=True, model_stats={
+                model_name: ModelStats(daily_bytes=1 << 34, conf={'spark.sql.files.maxPartitionBytes': '64m'})})
+
+            with open(os.path.join(tempdir, 'models', 'codegen', 'opensea', model_name + '.sql'), 'r') as f:
+                self.assertIn('pre_hook=', f.read())
+            # the session confs only change how the tables are written, the models don't need to be backfilled
+            self.assertEqual(manifest, tuned_manifest)
+
+    def test_versioned_model_aliases(self):
+        abi = json.loads(_read_resource('erc20_abi.json'))
+        changed_abi = json.loads(_read_resource('erc20_abi.json'))
+        [i for i in changed_abi if i.get('name') == 'Transfer'][0]['inputs'].append(
+            {'indexed': False, 'name': 'memo', 'type': 'string'})
+
+        for database in [Database.SPARK, Database.DUCKDB]:
+            with self.subTest(database=database), tempfile.TemporaryDirectory() as tempdir:
+                self._prepare_dbt_dir(tempdir)
+                previous_manifest = None
+                for cutover_dt, contract_abi in [('2022-06-01', abi), ('2022-07-01', changed_abi)]:
+                    with open(os.path.join(tempdir, 'contracts', 'opensea', 'Token.json'), 'w') as f:
+                        json.dump({'name': 'Token', 'address': '0x0000000000000000000000000000000000000001',
+                                   'materialize': 'increment', 'versioned_models': True, 'abi': contract_abi}, f)
+                    generator = DbtGenerator(database=database, dbt_dir=tempdir, remote_dir_url=self.remote_workspace,
+                                             version_cutover_dt=cutover_dt)
+                    shutil.rmtree(generator.codegen_dir, ignore_errors=True)
+                    os.mkdir(generator.codegen_dir)
+                    generator._gen_models_and_schema(previous_manifest=previous_manifest)
+                    generator._gen_manifest_and_changes(previous_manifest)
+                    previous_manifest = CodegenManifest.load(generator.codegen_manifest_path)
+
+                # the first version keeps the table, the view over the versions is published as _all
+                project_path = os.path.join(generator.codegen_dir, 'opensea')
+                for model_name, alias in [('opensea_Token_evt_Transfer_v1', 'token_evt_transfer'),
+                                          ('opensea_Token_evt_Transfer_v2', 'token_evt_transfer_v2'),
+                                          ('opensea_Token_evt_Transfer', 'token_evt_transfer_all')]:
+                    with open(os.path.join(project_path, model_name + '.sql'), 'r') as f:
+                        self.assertIn(f"alias='{alias}'", f.read())
@@ -0,0 +1,69 @@
+import unittest
+
+from bdbt.ethereum.dbt.dbt_code_generator import DbtCodeGenerator
+from bdbt.ethereum.dbt.dbt_model_renderer import DbtModelRenderer
+
+model = """{{
+    config(
+        materialized='incremental',
+        alias='model'
+    )
+}}
+
+select * from {{ ref('stg_logs') }}
+where selector = "0x1"
+{% if var('dt_start', none) is not none %}
+  and dt >= '{{ var("dt_start") }}' and dt <= '{{ var("dt_end") }}'
+{% elif is_incremental() %}
+  and dt = '{{ var("dt") }}'
+{% endif %}
+"""
+
+
+class DbtModelRendererTestCase(unittest.TestCase):
+
+    def test_render_incremental(self):
+        renderer = DbtModelRenderer(refs={'stg_logs': 'db.logs'}, dbt_vars={'dt': '2022-01-01'}, incremental=True)
+        sql = renderer.render(model)
+
+        self.assertNotIn('config', sql)
+        self.assertIn('select * from db.logs', sql)
+        self.assertIn("and dt = '2022-01-01'", sql)
+
+    def test_render_dt_range(self):
+        renderer = DbtModelRenderer(dbt_vars={'dt_start': '2022-01-01', 'dt_end': '2022-01-31'}, incremental=True)
+        sql = renderer.render(model)
+
+        self.assertIn("and dt >= '2022-01-01' and dt <= '2022-01-31'", sql)
+        self.assertNotIn('and dt =', sql)
+
+    def test_render_dt_range_full(self):
+        # the first batch of a new model builds the table, it's limited to the range as well
+        renderer = DbtModelRenderer(dbt_vars={'dt_start': '2022-01-01', 'dt_end': '2022-01-31'}, incremental=False)
+        sql = renderer.render(model)
+
+        self.assertIn("and dt >= '2022-01-01' and dt <= '2022-01-31'", sql)
+        self.assertNotIn('and dt =', sql)
+
+    def test_render_dt_range_table(self):
+        table_model = DbtCodeGenerator._replace_dt_filter("""select * from {{ ref('stg_logs') }}
+where selector = "0x1"
+    {{MODEL_DT_FILTER}}
+""", 'table')
+        renderer = DbtModelRenderer(dbt_vars={'dt_start': '2022-01-01', 'dt_end': '2022-01-31'}, incremental=False)
+        sql = renderer.render(table_model)
+
+        # the table is rebuilt in full even if it's selected by a backfill
+        self.assertNotIn('dt_start', table_model)
+        self.assertNotIn('dt >=', sql)
+        self.assertNotIn('and dt =', sql)
+
+    def test_render_full(self):
+        sql = DbtModelRenderer().render(model)
+
+        self.assertIn('select * from stg_logs', sql)
+        self.assertNotIn('dt =', sql)
+
+    def test_render_missing_var(self):
+        with self.assertRaises(KeyError):
+            DbtModelRenderer(incremental=True).render(model)
@@ -0,0 +1,123 @@
+import importlib.util
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+from typing import AnyStr
+
+import test
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi
+from bdbt.ethereum.dbt.dbt_factory import DbtFactory
+from bdbt.ethereum.dbt.dbt_model_renderer import DbtModelRenderer
+from bdbt.ethereum.dbt.duckdb.duckdb_dbt_code_generator import DuckDBDbtCodeGenerator
+from bdbt.ethereum.dbt.duckdb.duckdb_udf import decode_event_json, decode_call_json, register_udfs
+from bdbt.global_type import Contract, Database, LayoutOptions, TraceFilter
+
+RESOURCE_GROUP = 'dbt_test'
+
+TOKEN = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+
+DUCKDB_AVAILABLE = importlib.util.find_spec('duckdb') is not None
+
+
+def _read_resource(file_name: str) -> AnyStr:
+    return test.read_resource([RESOURCE_GROUP], file_name)
+
+
+def word(value: int) -> bytes:
+    return (value % 2 ** 256).to_bytes(32, 'big')
+
+
+class DuckDBDbtCodeGeneratorTestCase(unittest.TestCase):
+
+    def _gen_models(self, generator: DuckDBDbtCodeGenerator, contract: Contract) -> dict:
+        abi = ABITransformer().transform_abi(contract.abi, contract.include_read_only_calls)
+        with tempfile.TemporaryDirectory() as tempdir:
+            project_path = os.path.join(tempdir, 'token')
+            pathlib.Path(project_path).mkdir()
+            generator.gen_models_for_project(tempdir, 'token', contract, '0.1.0', abi)
+            return {i: pathlib.Path(project_path, i).read_text() for i in os.listdir(project_path)}
+
+    def test_new_code_generator(self):
+        generator = DbtFactory.new_code_generator(Database.DUCKDB, '')
+        self.assertIsInstance(generator, DuckDBDbtCodeGenerator)
+        self.assertFalse(generator.need_udf)
+
+    def test_gen_event_dbt_model(self):
+        contract = Contract(
+            abi=normalize_abi(_read_resource('erc20_abi.json')), name='ERC20', materialize='increment', address=TOKEN)
+        models = self._gen_models(DuckDBDbtCodeGenerator(layout=LayoutOptions(sort_by=['evt_block_number'])), contract)
+
+        self.assertEqual(_read_resource('ERC20_evt_Transfer_duckdb_sql'), models['token_ERC20_evt_Transfer.sql'])
+
+    def test_gen_call_dbt_model(self):
+        contract = Contract(
+            abi=normalize_abi(_read_resource('full_types_function_abi.json')), name='Test', materialize='table',
+            include_read_only_calls=True, trace_filter=TraceFilter(success_only=True, call_types=['call']))
+        content = self._gen_models(DuckDBDbtCodeGenerator(), contract)['token_Test_call_AllTypeFunction.sql']
+
+        self.assertIn("materialized='table'", content)
+        self.assertIn("where selector = '0x", content)
+        self.assertIn("and status = 1 and call_type in ('call')", content)
+        # the static fields are decoded by SQL, their words start after the selector
+        self.assertIn(
+            """case when length(input_hex) >= 72 then '0x' || substr(input_hex, 33, 40) end as "addr\"""", content)
+        self.assertIn(
+            "case when length(input_hex) >= 136 then cast(case when try_cast('0x' || substr(input_hex, 135, 2) as "
+            "UBIGINT) >= 128 then cast(try_cast('0x' || substr(input_hex, 135, 2) as UBIGINT) as HUGEINT) - 256 "
+            "else try_cast('0x' || substr(input_hex, 135, 2) as UBIGINT) end as INTEGER) end as \"i8\"", content)
+        # the dynamic fields and the wide integers are decoded by the UDF
+        self.assertIn('json_transform(bdbt_decode_call(unhex_input, unhex_output, ', content)
+        self.assertIn("""data['str'] as "str\"""", content)
+
+    def test_decode_json(self):
+        abi = json.loads(_read_resource('erc20_abi.json'))
+        transfer_topics = ['0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef',
+                           '0x' + word(1).hex(), '0x' + word(2).hex()]
+
+        self.assertEqual(
+            {'from': '0x' + '00' * 19 + '01', 'to': '0x' + '00' * 19 + '02', 'value': 2 ** 200},
+            json.loads(decode_event_json(word(2 ** 200), transfer_topics, json.dumps(abi[0]))))
+        self.assertIsNone(decode_event_json(b'', transfer_topics, json.dumps(abi[0])))
+
+        transfer_input = bytes.fromhex('a9059cbb') + word(int(TOKEN, 16)) + word(10)
+        self.assertEqual(
+            {'to': TOKEN, 'amount': 10, 'output_0': None},
+            json.loads(decode_call_json(transfer_input, None, json.dumps(abi[2]))))
+
+    @unittest.skipUnless(DUCKDB_AVAILABLE, 'duckdb is required to run the models.')
+    def test_run_event_dbt_model(self):
+        import duckdb
+
+        contract = Contract(
+            abi=normalize_abi(_read_resource('erc20_abi.json')), name='ERC20', materialize='increment', address=TOKEN)
+        model = self._gen_models(DuckDBDbtCodeGenerator(), contract)['token_ERC20_evt_Transfer.sql']
+        sql = DbtModelRenderer(dbt_vars={'dt': '2022-01-01'}, incremental=True).render(model)
+
+        transfer_topic = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+        conn = duckdb.connect(':memory:')
+        register_udfs(conn)
+        conn.execute('create table stg_logs (block_number bigint, block_timestamp timestamp, log_index bigint, '
+                     'transaction_hash varchar, address varchar, unhex_data blob, topics_arr varchar[], '
+                     'selector varchar, dt date)')
+        conn.executemany('insert into stg_logs values (?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            (1, '2022-01-01 00:00:00', 0, '0x01', TOKEN, word(10),
+             [transfer_topic, '0x' + word(1).hex(), '0x' + word(2).hex()], transfer_topic, '2022-01-01'),
+            # the data is too short to be decoded
+            (1, '2022-01-01 00:00:00', 1, '0x01', TOKEN, b'',
+             [transfer_topic, '0x' + word(1).hex(), '0x' + word(2).hex()], transfer_topic, '2022-01-01'),
+            # another dt
+            (2, '2022-01-02 00:00:00', 0, '0x02', TOKEN, word(20),
+             [transfer_topic, '0x' + word(2).hex(), '0x' + word(3).hex()], transfer_topic, '2022-01-02'),
+            # another contract
+            (1, '2022-01-01 00:00:00', 2, '0x01', '0x' + '00' * 20, word(30),
+             [transfer_topic, '0x' + word(1).hex(), '0x' + word(2).hex()], transfer_topic, '2022-01-01')
+        ])
+
+        rows = conn.execute(f'select evt_index, "from", "to", "value" from ({sql}) order by evt_index').fetchall()
+        self.assertEqual([
+            (0, '0x' + '00' * 19 + '01', '0x' + '00' * 19 + '02', 10),
+            (1, '0x' + '00' * 19 + '01', '0x' + '00' * 19 + '02', None)
+        ], rows)
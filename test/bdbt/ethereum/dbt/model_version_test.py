@@ -0,0 +1,72 @@
+import unittest
+from typing import List, Dict, Any
+
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.abi_type import ABI
+from bdbt.ethereum.dbt.codegen_manifest import CodegenManifest, CodegenModel
+from bdbt.ethereum.dbt.model_version import ModelVersioner, union_fields
+
+
+def _transfer_abi(inputs: List[Dict[str, Any]]) -> ABI:
+    return ABI.from_dicts([{'anonymous': False, 'inputs': inputs, 'name': 'Transfer', 'type': 'event'}])
+
+
+class ModelVersionerTestCase(unittest.TestCase):
+    model_name = 'erc20_Token_evt_Transfer'
+    v1_inputs = [{'indexed': True, 'name': 'from', 'type': 'address'},
+                 {'indexed': True, 'name': 'to', 'type': 'address'},
+                 {'indexed': False, 'name': 'value', 'type': 'uint64'}]
+    v2_inputs = [{'indexed': True, 'name': 'from', 'type': 'address'},
+                 {'indexed': True, 'name': 'to', 'type': 'address'},
+                 {'indexed': False, 'name': 'value', 'type': 'uint256'},
+                 {'indexed': False, 'name': 'memo', 'type': 'string'}]
+
+    def setUp(self) -> None:
+        self.transformer = ABITransformer()
+
+    def _event(self, inputs: List[Dict[str, Any]]):
+        return self.transformer.transform_abi(_transfer_abi(inputs)).events[0]
+
+    def _manifest(self, versions) -> CodegenManifest:
+        return CodegenManifest(models={self.model_name: CodegenModel(checksum='', versions=versions)})
+
+    def test_first_generation(self):
+        manifest_versions, versions = ModelVersioner(None, '2022-06-01').versions(
+            self.model_name, self._event(self.v1_inputs))
+        self.assertEqual(1, len(manifest_versions))
+        self.assertIsNone(manifest_versions[0].dt_start)
+        self.assertEqual([], versions)
+
+    def test_unchanged_abi(self):
+        v1, _ = ModelVersioner(None, '2022-06-01').versions(self.model_name, self._event(self.v1_inputs))
+        manifest_versions, versions = ModelVersioner(self._manifest(v1), '2022-07-01').versions(
+            self.model_name, self._event(self.v1_inputs))
+        self.assertEqual(v1, manifest_versions)
+        self.assertEqual([], versions)
+
+    def test_changed_abi(self):
+        v1, _ = ModelVersioner(None, '2022-06-01').versions(self.model_name, self._event(self.v1_inputs))
+        manifest_versions, versions = ModelVersioner(self._manifest(v1), '2022-07-01').versions(
+            self.model_name, self._event(self.v2_inputs))
+
+        self.assertEqual([None, '2022-07-01'], [i.dt_start for i in manifest_versions])
+        self.assertEqual(['Transfer_v1', 'Transfer_v2'], [i.schema.name for i in versions])
+        self.assertEqual([(None, '2022-07-01'), ('2022-07-01', None)], [(i.dt_start, i.dt_end) for i in versions])
+        self.assertEqual(3, len(versions[0].fields))
+        self.assertEqual(['from', 'to', 'value', 'memo'], [i.name for i in union_fields(versions)])
+        # the field with the same name has the type of the latest version
+        self.assertEqual('uint256', union_fields(versions)[2].ftype.canonical_type)
+
+        # the same versions are generated again
+        self.assertEqual((manifest_versions, versions), ModelVersioner(
+            self._manifest(manifest_versions), '2022-08-01').versions(self.model_name, self._event(self.v2_inputs)))
+
+    def test_changed_again_before_cutover(self):
+        v1, _ = ModelVersioner(None, '2022-06-01').versions(self.model_name, self._event(self.v1_inputs))
+        v2, _ = ModelVersioner(self._manifest(v1), '2022-07-01').versions(
+            self.model_name, self._event(self.v2_inputs))
+        manifest_versions, versions = ModelVersioner(self._manifest(v2), '2022-07-01').versions(
+            self.model_name, self._event(self.v2_inputs[:3]))
+
+        self.assertEqual([None, '2022-07-01'], [i.dt_start for i in manifest_versions])
+        self.assertEqual(3, len(versions[1].fields))
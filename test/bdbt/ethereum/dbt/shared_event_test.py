@@ -0,0 +1,71 @@
+import json
+import unittest
+from typing import AnyStr, Dict, List
+
+import test
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.dbt.shared_event import find_shared_events
+from bdbt.global_type import Contract
+
+RESOURCE_GROUP = 'dbt_test'
+
+
+def _read_resource(file_name: str) -> AnyStr:
+    return test.read_resource([RESOURCE_GROUP], file_name)
+
+
+def _contract(name: str, address: str, abi_file: str, materialize: str = 'increment') -> Contract:
+    return Contract.from_dicts({
+        'name': name,
+        'address': address,
+        'materialize': materialize,
+        'abi': json.loads(_read_resource(abi_file))
+    })
+
+
+class SharedEventTestCase(unittest.TestCase):
+    contracts_map: Dict[str, List[Contract]] = {
+        'aave': [_contract('AToken', '0x0000000000000000000000000000000000000001', 'erc20_abi.json')],
+        'uniswap': [
+            _contract('UNI', '0x0000000000000000000000000000000000000002', 'erc20_abi.json'),
+            # the contract without address is never shared
+            _contract('AnyToken', None, 'erc20_abi.json'),
+        ],
+        'opensea': [
+            _contract('Azuki', '0x0000000000000000000000000000000000000003', 'erc721_abi.json'),
+            _contract('Parallel', '0x0000000000000000000000000000000000000004', 'erc1155_abi.json'),
+        ]
+    }
+
+    def setUp(self):
+        transformer = ABITransformer()
+        self.contract_abis = [
+            (project, contract, transformer.transform_abi(contract.abi))
+            for project, contracts in self.contracts_map.items() for contract in contracts
+        ]
+
+    def test_find_shared_events(self):
+        shared_events = find_shared_events(self.contract_abis, 2)
+
+        self.assertEqual(['Approval', 'ApprovalForAll', 'Transfer'], [i.event.name for i in shared_events])
+
+        # the Transfer of ERC721 has an indexed tokenId, it can't share the model of ERC20
+        transfer = shared_events[2]
+        self.assertEqual(
+            [('aave', 'AToken'), ('uniswap', 'UNI')],
+            [(i.project_name, i.contract_name) for i in transfer.members]
+        )
+        self.assertEqual(
+            ['0x0000000000000000000000000000000000000001', '0x0000000000000000000000000000000000000002'],
+            transfer.addresses
+        )
+
+        # ERC721 and ERC1155 have the same ApprovalForAll with different field names
+        approval_for_all = shared_events[1]
+        self.assertEqual(['Azuki', 'Parallel'], [i.contract_name for i in approval_for_all.members])
+        self.assertEqual(['owner', 'operator', 'approved'], [i.name for i in approval_for_all.event.inputs])
+        self.assertTrue(approval_for_all.contract_name.startswith('Sig'))
+
+    def test_find_shared_events_with_threshold(self):
+        self.assertEqual([], find_shared_events(self.contract_abis, 0))
+        self.assertEqual([], find_shared_events(self.contract_abis, 3))
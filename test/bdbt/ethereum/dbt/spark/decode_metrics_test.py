@@ -0,0 +1,34 @@
+import unittest
+
+from bdbt.ethereum.dbt.spark.decode_metrics import parse_decode_metrics
+
+
+def _line(udf: str, jvm: str, rows: int, failures: int = 0, nanos: int = 0) -> str:
+    return f'22/10/01 12:00:00 BDBT_DECODE_METRICS {{"udf":"{udf}","jvm":"{jvm}","rows":{rows},' \
+           f'"failures":{failures},"bytes_in":{rows * 100},"decode_nanos":{nanos}}}\n'
+
+
+class DecodeMetricsTestCase(unittest.TestCase):
+
+    def test_parse(self):
+        lines = [
+            'INFO Executor: Running task 0.0 in stage 1.0\n',
+            _line('a_evt_Transfer', '1@host@1', 200, 2, 4000),
+            # the cumulative counters of the same JVM, only the latest one is kept
+            _line('a_evt_Transfer', '1@host@1', 100, 1, 1000),
+            _line('a_evt_Transfer', '2@host@1', 100, 0, 3000),
+            _line('b_call_mint', '1@host@1', 10, 10, 100),
+            'BDBT_DECODE_METRICS {"udf":"a_evt_Tra\n'
+        ]
+        results = parse_decode_metrics(lines)
+
+        self.assertEqual(['a_evt_Transfer', 'b_call_mint'], [i.udf for i in results])
+        transfer = results[0]
+        self.assertEqual((300, 2, 30000, 7000, 2),
+                         (transfer.rows, transfer.failures, transfer.bytes_in, transfer.decode_nanos, transfer.jvms))
+        self.assertAlmostEqual(2 / 300, transfer.failure_ratio)
+        self.assertAlmostEqual(100, transfer.bytes_per_row)
+        self.assertEqual(1.0, results[1].failure_ratio)
+
+    def test_parse_empty(self):
+        self.assertEqual([], parse_decode_metrics([]))
@@ -0,0 +1,141 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyspark.sql.types import DecimalType, StructType, StructField, ArrayType, StringType
+
+import test
+from bdbt.ethereum.dbt.spark.spark_benchmark import (
+    ModelBenchmark,
+    SparkModelBenchmark,
+    UDFDecoder,
+    output_file_stats,
+    to_spark_value
+)
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator, UDFMode
+from bdbt.global_type import Contract
+from test.bdbt.ethereum.dbt.spark.spark_plan_test import requires_jvm
+
+RESOURCE_GROUP = 'dbt_test'
+
+TOKEN = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+SENDER = '0x' + '11' * 20
+RECEIVER = '0x' + '22' * 20
+
+
+def word(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def erc20_contract() -> Contract:
+    return Contract.from_dicts({
+        'name': 'ERC20',
+        'address': TOKEN,
+        'materialize': 'increment',
+        'abi': json.loads(test.read_resource([RESOURCE_GROUP], 'erc20_abi.json'))
+    })
+
+
+class SparkBenchmarkValueTestCase(unittest.TestCase):
+
+    def test_to_spark_value(self):
+        dtype = StructType([
+            StructField('value', DecimalType(38, 0)),
+            StructField('owners', ArrayType(StringType()))
+        ])
+
+        self.assertEqual((Decimal(10 ** 18), [SENDER]), to_spark_value(dtype, {'value': 10 ** 18, 'owners': [SENDER]}))
+        # the value out of the precision of the decimal is null
+        self.assertEqual((None, None), to_spark_value(dtype, {'value': 2 ** 255, 'owners': None}))
+
+    def test_output_file_stats(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathlib.Path(os.path.join(tempdir, 'dt=2022-06-01')).mkdir()
+            for name, size in [('_SUCCESS', 0), ('dt=2022-06-01/part-0.parquet', 10),
+                               ('dt=2022-06-01/.part-0.parquet.crc', 4), ('part-1.parquet', 20)]:
+                with open(os.path.join(tempdir, name), 'wb') as f:
+                    f.write(b'0' * size)
+
+            self.assertEqual((2, 30), output_file_stats(tempdir))
+
+    def test_model_benchmark(self):
+        result = ModelBenchmark(model_name='erc20_evt_transfer', rows=100, wall_seconds=2,
+                                output_files=3, output_bytes=100)
+
+        self.assertEqual(50, result.rows_per_second)
+        self.assertEqual(33, result.avg_file_bytes)
+
+    def test_python_decoder_table_udf_mode(self):
+        generator = SparkDbtCodeGenerator('s3a://test', udf_mode=UDFMode.TABLE)
+
+        with self.assertRaises(ValueError):
+            SparkModelBenchmark(None, generator, '/tmp', UDFDecoder.PYTHON)
+
+
+@requires_jvm
+class SparkBenchmarkTestCase(unittest.TestCase):
+    spark = None
+
+    @classmethod
+    def setUpClass(cls):
+        from pyspark.sql import SparkSession
+
+        cls.spark = SparkSession.builder \
+            .master('local[1]') \
+            .appName(cls.__name__) \
+            .config('spark.ui.enabled', 'false') \
+            .getOrCreate()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.spark.stop()
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write_logs(self) -> str:
+        raw_path = os.path.join(self.tempdir.name, 'raw_logs.parquet')
+        topics = [TRANSFER_TOPIC, '0x' + word(int(SENDER, 16)).hex(), '0x' + word(int(RECEIVER, 16)).hex()]
+        pq.write_table(pa.Table.from_pylist([{
+            'block_number': 100 + i,
+            'block_timestamp': datetime(2022, 6, 1),
+            'log_index': i,
+            'transaction_hash': f'0x{i:064x}',
+            'address': TOKEN,
+            'unhex_data': word(10 ** 18 * i),
+            'topics_arr': topics,
+            'selector': TRANSFER_TOPIC,
+            'dt': '2022-06-01'
+        } for i in range(3)]), raw_path)
+
+        # the bucket columns are hashed by Spark
+        logs_path = os.path.join(self.tempdir.name, 'logs')
+        self.spark.read.parquet(raw_path) \
+            .selectExpr('*', 'abs(hash(address)) % 10 as address_hash', 'abs(hash(selector)) % 10 as selector_hash') \
+            .write.parquet(logs_path)
+        return logs_path
+
+    def test_run(self):
+        output_dir = os.path.join(self.tempdir.name, 'output')
+        benchmark = SparkModelBenchmark(self.spark, SparkDbtCodeGenerator('s3a://test'), output_dir)
+        benchmark.load_sources(logs_paths=[self._write_logs()])
+        contract = erc20_contract()
+
+        results = {i.model_name: i for i in benchmark.run([('token', contract)])}
+
+        transfer = results['token_ERC20_evt_Transfer']
+        self.assertEqual(3, transfer.rows)
+        self.assertLess(0, transfer.output_files)
+        self.assertLess(0, transfer.tasks)
+        self.assertIsNotNone(transfer.task_seconds)
+        self.assertEqual(0, results['token_ERC20_evt_Approval'].rows)
@@ -1,3 +1,4 @@
+import json
 import os
 import pathlib
 import shutil
@@ -8,8 +9,9 @@ from typing import AnyStr
 import test
 from bdbt.ethereum.abi.abi_transformer import ABITransformer
 from bdbt.ethereum.abi.utils import normalize_abi
-from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator
-from bdbt.global_type import Contract
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEventMember, ConsolidatedEvents
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator, UDFJarLayout, UDFMode, ModelStats
+from bdbt.global_type import Contract, LayoutOptions, TraceFilter, SizeClass
 
 RESOURCE_GROUP = 'dbt_test'
 
@@ -39,8 +41,41 @@ class SparkDbtCodeGeneratorTestCase(unittest.TestCase):
                 version='0.1.0'
             )
 
-            self.assertEqual(2, len(os.listdir(tempdir)))
+            self.assertEqual(3, len(os.listdir(tempdir)))
             self.assertTrue('blockchain-dbt-udf-0.1.0.jar' in os.listdir(tempdir))
+            self.assertTrue('macros' in os.listdir(tempdir))
+
+    def test_generate_udf_registration(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            abi = transformer.transform_abi(abi=normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace)
+            udfs = generator.gen_udfs_for_project(
+                dbt_dir=tempdir,
+                udf_workspace=os.path.join(tempdir, 'udf'),
+                project_name='opensea',
+                contract_name_to_abi={'WyvernExchangeV2': abi}
+            )
+            self.assertEqual(len(abi.nonempty_events) + len(abi.nonempty_calls), len(os.listdir(
+                os.path.join(tempdir, 'udf'))))
+
+            for _ in range(2):
+                generator.gen_udf_registration(dbt_dir=tempdir, udfs=udfs, version='0.1.0')
+
+            with open(os.path.join(tempdir, 'macros', 'codegen', 'register_codegen_udfs.sql'), 'r') as f:
+                content = f.read()
+
+            self.assertTrue(content.startswith('{% macro register_codegen_udfs() %}'))
+            self.assertEqual(len(abi.nonempty_events) + len(abi.nonempty_calls), content.count('create or replace'))
+            self.assertIn(
+                "('opensea_WyvernExchangeV2_evt_OrderApprovedPartOne', 'create or replace function "
+                "opensea_wyvernexchangev2_orderapprovedpartone_eventdecodeudf as "
+                "\"io.iftech.sparkudf.hive.Opensea_WyvernExchangeV2_OrderApprovedPartOne_EventDecodeUDF\" "
+                "using jar \"s3a://test/blockchain-dbt-udf-0.1.0.jar\"')",
+                content
+            )
+            self.assertEqual(['{{ register_codegen_udfs() }}'], generator.on_run_start_hooks())
 
     def test_generate_call_udf(self):
         with tempfile.TemporaryDirectory() as tempdir:
@@ -86,6 +121,81 @@ class SparkDbtCodeGeneratorTestCase(unittest.TestCase):
 
             self.assertEqual(required_content, content)
 
+    def test_generate_udf_with_decode_metrics(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            abi = transformer.transform_abi(abi=normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, decode_metrics=True)
+            generator.gen_event_udf(
+                udf_workspace=tempdir,
+                project_name='opensea',
+                contract_name='WyvernExchangeV2',
+                event=[i for i in abi.events if i.name == 'OrderApprovedPartOne'][0]
+            )
+            with open(os.path.join(tempdir, os.listdir(tempdir)[0]), 'r') as f:
+                content = f.read()
+
+            # the same class with the evaluate override
+            required_content = _read_resource('Opensea_WyvernExchangeV2_OrderApprovedPartOneEventDecodeUDF.java')
+            self.assertTrue(content.startswith(required_content[:-2]))
+            self.assertIn('public Object evaluate(DeferredObject[] arguments)', content)
+            self.assertIn('CodegenDecodeMetrics.of("opensea_WyvernExchangeV2_evt_OrderApprovedPartOne")', content)
+            self.assertIn('long bytes = CodegenDecodeMetrics.bytes(arguments, 1);', content)
+            # the exceptions of the decoding are counted as failures and thrown as they are
+            self.assertIn('metrics.record(bytes, System.nanoTime() - start, true);\n            throw e;', content)
+
+            classes_dir = os.path.join(tempdir, 'classes')
+            os.mkdir(classes_dir)
+            generator.gen_decode_metrics_class(classes_dir)
+            with open(os.path.join(classes_dir, 'CodegenDecodeMetrics.java'), 'r') as f:
+                content = f.read()
+            self.assertIn('public final class CodegenDecodeMetrics {', content)
+            self.assertIn('private static final String PREFIX = "BDBT_DECODE_METRICS";', content)
+            self.assertNotIn('{{', content)
+
+            table_dir = os.path.join(tempdir, 'table')
+            os.mkdir(table_dir)
+            SparkDbtCodeGenerator(self.remote_workspace, udf_mode=UDFMode.TABLE, decode_metrics=True) \
+                .gen_table_udf_classes(table_dir)
+            with open(os.path.join(table_dir, 'CodegenCallDecodeUDF.java'), 'r') as f:
+                content = f.read()
+            self.assertIn('CodegenDecodeMetrics.of(schemaId)', content)
+            self.assertIn('CodegenDecodeMetrics.bytes(arguments, 2)', content)
+
+    def test_generate_consolidated_event_models(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = ABITransformer().transform_abi(abi=raw_abi)
+            contract = Contract(name='WyvernExchangeV2', address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                                materialize='increment', abi=raw_abi)
+            events = [i for i in abi.events if i.name in ('OrderCancelled', 'OrdersMatched')]
+            consolidated_events = ConsolidatedEvents('opensea', tuple(
+                ConsolidatedEventMember(contract.name, contract.address, i, SizeClass.SMALL) for i in events))
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, layout=LayoutOptions(sort_by=['evt_block_number']))
+            generator.gen_consolidated_event_dbt_model(project_path, '0.1.0', consolidated_events)
+            generator.gen_consolidated_event_view_dbt_model(project_path, contract, '0.1.0', events[1],
+                                                            consolidated_events)
+
+            with open(os.path.join(project_path, 'opensea_evt_consolidated.sql'), 'r') as f:
+                content = f.read()
+            self.assertEqual(2, content.count('_eventdecodeudf('))
+            self.assertIn("when contract_name = 'WyvernExchangeV2' and event_name = 'OrdersMatched' "
+                          "then to_json(opensea_wyvernexchangev2_ordersmatched_eventdecodeudf(", content)
+            self.assertIn('\n        or (address = lower("0x7f268357a8c2552623316e2562d90e642bb538e5")', content)
+            self.assertTrue(content.endswith('sort by `contract_name`, `event_name`, `evt_block_number`\n'))
+
+            with open(os.path.join(project_path, 'opensea_WyvernExchangeV2_evt_OrdersMatched.sql'), 'r') as f:
+                content = f.read()
+            self.assertIn("alias='wyvernexchangev2_evt_ordersmatched'", content)
+            self.assertIn("from_json(payload, 'struct<`buyhash`:binary,`sellhash`:binary,`maker`:string,"
+                          "`taker`:string,`price`:decimal(38,0),`metadata`:binary>') as data", content)
+            self.assertIn("where contract_name = 'WyvernExchangeV2' and event_name = 'OrdersMatched'", content)
+            self.assertIn('data.buyhash as buyHash', content)
+
     def test_generate_dbt_models(self):
         with tempfile.TemporaryDirectory() as tempdir:
             transformer = ABITransformer()
@@ -222,6 +332,41 @@ class SparkDbtCodeGeneratorTestCase(unittest.TestCase):
 
             self.assertEqual(required_content, content)
 
+    def test_generate_call_model_with_trace_filter(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = transformer.transform_abi(abi=raw_abi)
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            contract = Contract(
+                name='WyvernExchangeV2',
+                address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                materialize='increment',
+                abi=raw_abi,
+                trace_filter=TraceFilter(call_types=['call'], trace_types=['call'], decode_failed_outputs=False)
+            )
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace)
+            generator.gen_call_dbt_model(
+                project_path=project_path,
+                contract=contract,
+                version='0.1.0',
+                call=[i for i in abi.calls if i.name == 'atomicMatch_'][0]
+            )
+
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                content = f.read()
+
+            self.assertIn('% 10 and call_type in ("call") and trace_type in ("call")\n', content)
+            self.assertIn('(unhex_input, case when status = 1 then unhex_output end, ', content)
+
+            self.assertEqual(
+                ['status = 1'], generator._trace_filter_conditions(TraceFilter(success_only=True)))
+            # the failed calls are filtered already
+            self.assertEqual('unhex_output', generator._output_column(
+                TraceFilter(success_only=True, decode_failed_outputs=False)))
+
     def test_generate_evt_mode_without_contract_address(self):
         with tempfile.TemporaryDirectory() as tempdir:
             transformer = ABITransformer()
@@ -250,3 +395,249 @@ class SparkDbtCodeGeneratorTestCase(unittest.TestCase):
             required_content = _read_resource('ERC1155_call_TransferBatch_dbt_sql')
 
             self.assertEqual(required_content, content)
+
+    def test_generate_udf_registration_with_project_jar(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            abi = transformer.transform_abi(abi=normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, jar_layout=UDFJarLayout.PROJECT)
+            udfs = generator.gen_udfs_for_project(
+                dbt_dir=tempdir,
+                udf_workspace=os.path.join(tempdir, 'udf'),
+                project_name='opensea',
+                contract_name_to_abi={'WyvernExchangeV2': abi}
+            )
+            generator.gen_udf_registration(dbt_dir=tempdir, udfs=udfs, version='0.1.0')
+
+            with open(os.path.join(tempdir, 'macros', 'codegen', 'register_codegen_udfs.sql'), 'r') as f:
+                content = f.read()
+
+            self.assertIn(
+                'using jar "s3a://test/blockchain-dbt-udf-0.1.0.jar", '
+                'jar "s3a://test/blockchain-dbt-udf-0.1.0-opensea.jar"',
+                content
+            )
+
+    def test_generate_event_model_with_layout(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = transformer.transform_abi(abi=raw_abi)
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            contract = Contract(
+                name='WyvernExchangeV2',
+                address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                materialize='increment',
+                abi=raw_abi,
+                layout=LayoutOptions(sort_by=['Contract_Address', 'evt_block_number', 'tokenId'],
+                                     target_file_size=268435456)
+            )
+
+            generator = SparkDbtCodeGenerator(
+                self.remote_workspace,
+                layout=LayoutOptions(compression='zstd', row_group_size=67108864, sort_by=['dt'],
+                                     bloom_filter_columns=['contract_address', 'tokenId'])
+            )
+            generator.gen_event_dbt_model(
+                project_path=project_path,
+                contract=contract,
+                version='0.1.0',
+                event=[i for i in abi.events if i.name == 'OrderApprovedPartOne'][0]
+            )
+
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                content = f.read()
+
+            self.assertIn("""        file_format='parquet',
+        options={'compression': 'zstd', 'parquet.block.size': '67108864', \
+'parquet.bloom.filter.enabled#contract_address': 'true'},
+        pre_hook="set spark.sql.adaptive.advisoryPartitionSizeInBytes=268435456",
+        post_hook="reset spark.sql.adaptive.advisoryPartitionSizeInBytes",
+        alias='wyvernexchangev2_evt_orderapprovedpartone'""", content)
+            # the columns not in the model are ignored
+            self.assertTrue(content.endswith("""select /*+ REBALANCE(dt) */ *
+from final
+sort by `contract_address`, `evt_block_number`
+"""))
+
+    def test_generate_event_model_with_session_tuning(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = transformer.transform_abi(abi=raw_abi)
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            contract = Contract(
+                name='WyvernExchangeV2',
+                address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                materialize='increment',
+                abi=raw_abi,
+                size_class=SizeClass.SMALL,
+                layout=LayoutOptions(target_file_size=268435456)
+            )
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, session_tuning=True)
+            generator.gen_event_dbt_model(
+                project_path=project_path,
+                contract=contract,
+                version='0.1.0',
+                event=[i for i in abi.events if i.name == 'OrderApprovedPartOne'][0]
+            )
+
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                content = f.read()
+
+            # the target file size of the layout overrides the advisory size of the size class
+            self.assertIn("""        pre_hook=["set spark.sql.adaptive.advisoryPartitionSizeInBytes=268435456", \
+"set spark.sql.adaptive.coalescePartitions.enabled=true", "set spark.sql.shuffle.partitions=8"],
+        post_hook=["reset spark.sql.adaptive.advisoryPartitionSizeInBytes", \
+"reset spark.sql.adaptive.coalescePartitions.enabled", "reset spark.sql.shuffle.partitions"],
+""", content)
+
+    def test_session_conf(self):
+        generator = SparkDbtCodeGenerator(
+            self.remote_workspace,
+            session_tuning=True,
+            model_stats={
+                'opensea_A_evt_X': ModelStats(daily_bytes=10 * 1024 ** 3),
+                'opensea_A_evt_Y': ModelStats(daily_bytes=1024, conf={'spark.sql.shuffle.partitions': '4'})
+            }
+        )
+
+        self.assertEqual({}, generator._session_conf('opensea_A_evt_Z', SizeClass.MEDIUM))
+        self.assertEqual('1000', generator._session_conf('opensea_A_evt_Z', SizeClass.LARGE)[
+            'spark.sql.shuffle.partitions'])
+        # 10GB / 256MB of the large models
+        self.assertEqual('40', generator._session_conf('opensea_A_evt_X', SizeClass.LARGE)[
+            'spark.sql.shuffle.partitions'])
+        self.assertEqual({'spark.sql.shuffle.partitions': '4'},
+                         generator._session_conf('opensea_A_evt_Y', SizeClass.MEDIUM))
+        self.assertEqual({}, SparkDbtCodeGenerator(self.remote_workspace)._session_conf(
+            'opensea_A_evt_X', SizeClass.LARGE))
+
+    def test_generate_event_model_with_single_decode(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = transformer.transform_abi(abi=raw_abi)
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            contract = Contract(
+                name='WyvernExchangeV2',
+                address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                materialize='table',
+                abi=raw_abi
+            )
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, single_decode=True)
+            generator.gen_event_dbt_model(
+                project_path=project_path,
+                contract=contract,
+                version='0.1.0',
+                event=[i for i in abi.events if i.name == 'OrderApprovedPartOne'][0]
+            )
+
+            model_filepath = os.path.join(project_path, os.listdir(project_path)[0])
+            with open(model_filepath, 'r') as f:
+                content = f.read()
+
+            self.assertIn("""        dt,
+        data
+    from {{ ref('stg_logs') }}
+    lateral view explode(array(opensea_wyvernexchangev2_orderapprovedpartone_eventdecodeudf(unhex_data, """,
+                          content)
+            self.assertEqual(1, content.count('eventdecodeudf('))
+
+    def test_project_udf_workspace(self):
+        single = SparkDbtCodeGenerator(self.remote_workspace)
+        self.assertEqual('/dbt/java/src', single.project_udf_workspace('/dbt', '/dbt/java/src', 'opensea'))
+
+        per_project = SparkDbtCodeGenerator(self.remote_workspace, jar_layout=UDFJarLayout.PROJECT)
+        self.assertEqual(
+            '/dbt/java/udf/opensea/io/iftech/sparkudf/hive',
+            per_project.project_udf_workspace('/dbt', '/dbt/java/src', 'opensea')
+        )
+
+        sharded = SparkDbtCodeGenerator(self.remote_workspace, jar_layout=UDFJarLayout.SHARD, jar_shards=4)
+        shards = {sharded._jar_shard(f'project{i}') for i in range(100)}
+        self.assertEqual({'shard000', 'shard001', 'shard002', 'shard003'}, shards)
+        self.assertEqual(sharded._jar_shard('opensea'), sharded._jar_shard('opensea'))
+
+    def test_shard_fingerprint(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            abi = transformer.transform_abi(abi=normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+            generator = SparkDbtCodeGenerator(self.remote_workspace, jar_layout=UDFJarLayout.PROJECT)
+            udf_workspace = generator.project_udf_workspace(tempdir, '', 'opensea')
+            pathlib.Path(udf_workspace).mkdir(parents=True)
+            shard_path = os.path.join(tempdir, 'java', 'udf', 'opensea')
+
+            generator.gen_event_udf(udf_workspace, 'opensea', 'WyvernExchangeV2', abi.nonempty_events[0])
+            fingerprint = generator._shard_fingerprint(shard_path, '0.1.0')
+            self.assertEqual(fingerprint, generator._shard_fingerprint(shard_path, '0.1.0'))
+            self.assertNotEqual(fingerprint, generator._shard_fingerprint(shard_path, '0.2.0'))
+
+            generator.gen_event_udf(udf_workspace, 'opensea', 'WyvernExchangeV2', abi.nonempty_events[1])
+            self.assertNotEqual(fingerprint, generator._shard_fingerprint(shard_path, '0.1.0'))
+
+    def test_generate_table_udf(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            transformer = ABITransformer()
+            raw_abi = normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+            abi = transformer.transform_abi(abi=raw_abi)
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            event = [i for i in abi.events if i.name == 'OrderApprovedPartOne'][0]
+
+            generator = SparkDbtCodeGenerator(self.remote_workspace, udf_mode=UDFMode.TABLE)
+            udfs = generator.gen_udfs_for_project(
+                dbt_dir=tempdir,
+                udf_workspace=os.path.join(tempdir, 'udf'),
+                project_name='opensea',
+                contract_name_to_abi={'WyvernExchangeV2': abi}
+            )
+
+            resource_dir = os.path.join(tempdir, 'java', 'src', 'main', 'resources', 'io', 'iftech', 'sparkudf', 'hive')
+            self.assertEqual(['codegen_udf_schemas.jsonl'], os.listdir(resource_dir))
+            with open(os.path.join(resource_dir, 'codegen_udf_schemas.jsonl'), 'r') as f:
+                schemas = {i['id']: i for i in map(json.loads, f)}
+            self.assertEqual(sorted(i.model_name for i in udfs), sorted(schemas.keys()))
+            self.assertEqual(
+                {'name': 'exchange', 'type': 'string'},
+                schemas['opensea_WyvernExchangeV2_evt_OrderApprovedPartOne']['inputs'][1]
+            )
+
+            generator.gen_udf_registration(dbt_dir=tempdir, udfs=udfs, version='0.1.0')
+            with open(os.path.join(tempdir, 'macros', 'codegen', 'register_codegen_udfs.sql'), 'r') as f:
+                content = f.read()
+            self.assertEqual(2, content.count('create or replace'))
+            self.assertIn('(none, \'create or replace function codegeneventdecodeudf as '
+                          '"io.iftech.sparkudf.hive.CodegenEventDecodeUDF" '
+                          'using jar "s3a://test/blockchain-dbt-udf-0.1.0.jar"\')', content)
+
+            generator.gen_event_dbt_model(
+                project_path=project_path,
+                contract=Contract(name='WyvernExchangeV2', address='0x7f268357a8c2552623316e2562d90e642bb538e5',
+                                  materialize='table', abi=raw_abi),
+                version='0.1.0',
+                event=event
+            )
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                content = f.read()
+            self.assertIn("codegeneventdecodeudf(unhex_data, topics_arr, ", content)
+            self.assertIn("'OrderApprovedPartOne', 'opensea_WyvernExchangeV2_evt_OrderApprovedPartOne') as data",
+                          content)
+
+            classes_dir = os.path.join(tempdir, 'classes')
+            os.mkdir(classes_dir)
+            generator.gen_table_udf_classes(classes_dir)
+            self.assertEqual(['CodegenCallDecodeUDF.java', 'CodegenEventDecodeUDF.java', 'CodegenUDFSchemas.java'],
+                             sorted(os.listdir(classes_dir)))
+            with open(os.path.join(classes_dir, 'CodegenEventDecodeUDF.java'), 'r') as f:
+                self.assertNotIn('evaluate', f.read())
+
+    def test_table_udf_with_thin_jars(self):
+        with self.assertRaises(ValueError):
+            SparkDbtCodeGenerator(self.remote_workspace, jar_layout=UDFJarLayout.PROJECT, udf_mode=UDFMode.TABLE)
@@ -0,0 +1,271 @@
+import os
+import pathlib
+import re
+import shutil
+import tempfile
+import unittest
+from typing import AnyStr, List
+
+import test
+from bdbt.ethereum.abi.abi_data_type import ABIEventSchema, ABICallSchema
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.utils import normalize_abi, event_selector, call_selector
+from bdbt.ethereum.dbt.consolidated_event import ConsolidatedEventMember, ConsolidatedEvents
+from bdbt.ethereum.dbt.dbt_model_renderer import DbtModelRenderer
+from bdbt.ethereum.dbt.spark.spark_dbt_code_generator import SparkDbtCodeGenerator, UDFMode
+from bdbt.ethereum.synthetic.chain_data_generator import SyntheticChainDataGenerator, hash_bucket
+from bdbt.global_type import Contract, LayoutOptions, SizeClass
+
+RESOURCE_GROUP = 'dbt_test'
+
+JAVA_AVAILABLE = shutil.which('java') is not None or 'JAVA_HOME' in os.environ
+
+# The CI sets BDBT_REQUIRE_JVM, the Spark tests fail instead of being skipped when the JVM is missing there.
+JVM_REQUIRED = os.environ.get('BDBT_REQUIRE_JVM', '').lower() in ('1', 'true')
+
+requires_jvm = unittest.skipUnless(JAVA_AVAILABLE or JVM_REQUIRED, 'a JVM is required to run the local Spark.')
+
+STG_LOGS_SCHEMA = 'block_number long, block_timestamp timestamp, log_index long, transaction_hash string, ' \
+                  'address string, unhex_data binary, topics_arr array<string>, selector string, ' \
+                  'address_hash int, selector_hash int, dt string'
+
+STG_TRACES_SCHEMA = 'block_number long, block_timestamp timestamp, trace_address string, transaction_hash string, ' \
+                    'to_address string, unhex_input binary, unhex_output binary, status int, call_type string, ' \
+                    'trace_type string, selector string, address_hash int, selector_hash int, dt string'
+
+# The raw tables are partitioned by the columns filtered by the models.
+STG_PARTITION_COLUMNS = ['dt', 'address_hash', 'selector_hash']
+
+OPENSEA = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+PLAN_DT = '2022-01-01'
+
+
+def _read_resource(file_name: str) -> AnyStr:
+    return test.read_resource([RESOURCE_GROUP], file_name)
+
+
+def _wyvern_contract() -> Contract:
+    return Contract(
+        name='WyvernExchangeV2',
+        address=OPENSEA,
+        materialize='increment',
+        abi=normalize_abi(_read_resource('wyvern_exchange_v2_abi.json'))
+    )
+
+
+def _partition_filters(plan: str) -> List[str]:
+    return re.findall(r'PartitionFilters: \[([^\]]*)\]', plan)
+
+
+@requires_jvm
+class SparkPlanTestCase(unittest.TestCase):
+    remote_workspace = 's3a://test'
+    spark = None
+    tempdir = None
+
+    @classmethod
+    def setUpClass(cls):
+        from pyspark.sql import SparkSession
+
+        # the adaptive execution is disabled to keep the exchanges in the executed plan,
+        # and the metadata of the scans (e.g. the partition filters) are not abbreviated
+        cls.spark = SparkSession.builder \
+            .master('local[1]') \
+            .appName(cls.__name__) \
+            .config('spark.ui.enabled', 'false') \
+            .config('spark.sql.adaptive.enabled', 'false') \
+            .config('spark.sql.maxMetadataStringLength', '10000') \
+            .getOrCreate()
+
+        # a few days of the synthetic data in the partitioned tables like the raw tables
+        cls.tempdir = tempfile.TemporaryDirectory()
+        raw_path = os.path.join(cls.tempdir.name, 'raw')
+        SyntheticChainDataGenerator(
+            [('opensea', _wyvern_contract())], seed=1, noise_ratio=0.5, rows_per_block=10, start_dt='2021-12-31',
+            block_seconds=6 * 3600
+        ).write(raw_path, logs_rows=200, traces_rows=200)
+        for name, schema in [('logs', STG_LOGS_SCHEMA), ('traces', STG_TRACES_SCHEMA)]:
+            table_path = os.path.join(cls.tempdir.name, name)
+            cls.spark.read.parquet(os.path.join(raw_path, name)) \
+                .write.partitionBy(*STG_PARTITION_COLUMNS).parquet(table_path)
+            cls.spark.read.schema(schema).parquet(table_path).createOrReplaceTempView(f'stg_{name}')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.spark.stop()
+        cls.tempdir.cleanup()
+
+    def _register_udf(self, udf_name: str, schema):
+        from pyspark.sql.types import StructType, StructField
+        from bdbt.ethereum.abi.provider.spark_type_provider import SparkDataTypeProvider
+
+        provider = SparkDataTypeProvider()
+        fields = [StructField('input', StructType([
+            StructField(i.name, provider.transform(i.ftype)) for i in schema.inputs]))]
+        if isinstance(schema, ABICallSchema):
+            fields.append(StructField('output', StructType([
+                StructField(i.name, provider.transform(i.ftype)) for i in schema.outputs])))
+
+        self.spark.udf.register(udf_name, lambda *args: None, StructType(fields))
+
+    def _model_query(self, generator: SparkDbtCodeGenerator, schema):
+        contract = _wyvern_contract()
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            project_path = os.path.join(tempdir, 'opensea')
+            pathlib.Path(project_path).mkdir()
+            if isinstance(schema, ConsolidatedEvents):
+                generator.gen_consolidated_event_dbt_model(project_path, '0.1.0', schema)
+            elif isinstance(schema, ABIEventSchema):
+                generator.gen_event_dbt_model(project_path, contract, '0.1.0', schema)
+            else:
+                generator.gen_call_dbt_model(project_path, contract, '0.1.0', schema)
+
+            with open(os.path.join(project_path, os.listdir(project_path)[0]), 'r') as f:
+                sql = DbtModelRenderer(dbt_vars={'dt': PLAN_DT}, incremental=True).render(f.read())
+
+        return self.spark.sql(sql)
+
+    def _optimized_plan(self, generator: SparkDbtCodeGenerator, schema) -> str:
+        return self._model_query(generator, schema)._jdf.queryExecution().optimizedPlan().toString()
+
+    def _collapsed_plan(self, generator: SparkDbtCodeGenerator, schema) -> str:
+        """
+        The analyzed plan after the CTEs are inlined and the projections are collapsed, the UDF is inlined into
+        the projection of every field by CollapseProject unless it's decoded in a lateral view.
+
+        The python UDF registered by the test stands in for the Hive GenericUDF of the model, the optimizer
+        evaluates the identical python UDFs of a projection once (ExtractPythonUDFs), so the inlined calls are
+        only visible before that.
+        """
+        jvm = self.spark._jvm
+        plan = self._model_query(generator, schema)._jdf.queryExecution().analyzed()
+        plan = jvm.org.apache.spark.sql.catalyst.optimizer.InlineCTE.apply(plan)
+        plan = jvm.org.apache.spark.sql.catalyst.analysis.EliminateSubqueryAliases.apply(plan)
+        return jvm.org.apache.spark.sql.catalyst.optimizer.CollapseProject.apply(plan).toString()
+
+    def _physical_plan(self, generator: SparkDbtCodeGenerator, schema) -> str:
+        return self._model_query(generator, schema)._jdf.queryExecution().executedPlan().toString()
+
+    def _assert_pruned_scan(self, plan: str, selector: str) -> None:
+        """
+        The model reads one partition of the dt and the buckets of the contract and the selector in one scan.
+        """
+        self.assertEqual(1, len(re.findall(r'\bFileScan ', plan)), plan)
+        partition_filters = _partition_filters(plan)
+        self.assertEqual(1, len(partition_filters), plan)
+        for expected in [rf'\(dt#\d+ = {PLAN_DT}\)',
+                         rf'\(address_hash#\d+ = {hash_bucket(OPENSEA)}\)',
+                         rf'\(selector_hash#\d+ = {hash_bucket(selector)}\)']:
+            self.assertRegex(partition_filters[0], expected)
+
+    def _event(self, name: str) -> ABIEventSchema:
+        abi = ABITransformer().transform_abi(normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+        return [i for i in abi.events if i.name == name][0]
+
+    def _call(self, name: str) -> ABICallSchema:
+        abi = ABITransformer().transform_abi(normalize_abi(_read_resource('wyvern_exchange_v2_abi.json')))
+        return [i for i in abi.calls if i.name == name][0]
+
+    def test_single_decode_event(self):
+        event = self._event('OrderApprovedPartOne')
+        udf_name = SparkDbtCodeGenerator._event_udf_class_name('opensea', 'WyvernExchangeV2', event).lower()
+        self._register_udf(udf_name, event)
+
+        plan = self._optimized_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=True), event)
+
+        self.assertEqual(1, plan.count(udf_name + '('), plan)
+        plan = self._collapsed_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=True), event)
+        self.assertEqual(1, plan.count(udf_name + '('), plan)
+
+        # without the lateral view, the UDF is called for every field
+        plan = self._collapsed_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=False), event)
+        self.assertLess(1, len(event.inputs))
+        self.assertEqual(len(event.inputs), plan.count(udf_name + '('), plan)
+
+    def test_single_decode_call(self):
+        call = self._call('atomicMatch_')
+        udf_name = SparkDbtCodeGenerator._call_udf_class_name('opensea', 'WyvernExchangeV2', call).lower()
+        self._register_udf(udf_name, call)
+
+        plan = self._optimized_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=True), call)
+
+        self.assertEqual(1, plan.count(udf_name + '('), plan)
+        plan = self._collapsed_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=True), call)
+        self.assertEqual(1, plan.count(udf_name + '('), plan)
+
+        plan = self._collapsed_plan(SparkDbtCodeGenerator(self.remote_workspace, single_decode=False), call)
+        self.assertLess(1, plan.count(udf_name + '('), plan)
+
+    def test_event_plan(self):
+        event = self._event('OrderApprovedPartOne')
+        udf_name = SparkDbtCodeGenerator._event_udf_class_name('opensea', 'WyvernExchangeV2', event).lower()
+        self._register_udf(udf_name, event)
+
+        for layout in [LayoutOptions(), LayoutOptions(target_file_size=128 * 1024 * 1024),
+                       LayoutOptions(sort_by=['evt_block_number'])]:
+            with self.subTest(layout=layout):
+                generator = SparkDbtCodeGenerator(self.remote_workspace, single_decode=True, layout=layout)
+                # the REBALANCE hint is dropped without the adaptive execution, it's planned as it's run by the model
+                rebalance = layout.target_file_size is not None
+                self.spark.conf.set('spark.sql.adaptive.enabled', str(rebalance).lower())
+                try:
+                    plan = self._physical_plan(generator, event)
+                finally:
+                    self.spark.conf.set('spark.sql.adaptive.enabled', 'false')
+
+                self._assert_pruned_scan(plan, event_selector(event))
+                # the repartition / rebalance by dt, the rows are sorted within the partitions
+                self.assertEqual(1, len(re.findall(r'\bExchange ', plan)), plan)
+                self.assertEqual(rebalance, 'REBALANCE_PARTITIONS_BY_COL' in plan, plan)
+                self.assertEqual(1, plan.count('BatchEvalPython'), plan)
+                self.assertEqual(1, self._optimized_plan(generator, event).count(udf_name + '('))
+
+    def test_call_plan(self):
+        call = self._call('atomicMatch_')
+        udf_name = SparkDbtCodeGenerator._call_udf_class_name('opensea', 'WyvernExchangeV2', call).lower()
+        self._register_udf(udf_name, call)
+
+        generator = SparkDbtCodeGenerator(self.remote_workspace, single_decode=True)
+        plan = self._physical_plan(generator, call)
+
+        self._assert_pruned_scan(plan, call_selector(call))
+        self.assertEqual(1, len(re.findall(r'\bExchange ', plan)), plan)
+        self.assertEqual(1, plan.count('BatchEvalPython'), plan)
+
+    def test_table_udf_plan(self):
+        event = self._event('OrdersMatched')
+        # the fixed class of the table udf mode
+        self._register_udf('codegeneventdecodeudf', event)
+
+        generator = SparkDbtCodeGenerator(self.remote_workspace, single_decode=True, udf_mode=UDFMode.TABLE)
+        plan = self._physical_plan(generator, event)
+
+        self._assert_pruned_scan(plan, event_selector(event))
+        self.assertEqual(1, len(re.findall(r'\bExchange ', plan)), plan)
+        self.assertEqual(1, self._optimized_plan(generator, event).count('codegeneventdecodeudf('))
+
+    def test_consolidated_event_plan(self):
+        events = [self._event('OrderCancelled'), self._event('OrdersMatched')]
+        udf_names = [SparkDbtCodeGenerator._event_udf_class_name('opensea', 'WyvernExchangeV2', i).lower()
+                     for i in events]
+        for udf_name, event in zip(udf_names, events):
+            self._register_udf(udf_name, event)
+        consolidated_events = ConsolidatedEvents('opensea', tuple(
+            ConsolidatedEventMember('WyvernExchangeV2', OPENSEA, i, SizeClass.SMALL) for i in events))
+
+        generator = SparkDbtCodeGenerator(self.remote_workspace)
+        plan = self._physical_plan(generator, consolidated_events)
+
+        # all members are read in one scan, the buckets of the members are pruned together
+        self.assertEqual(1, len(re.findall(r'\bFileScan ', plan)), plan)
+        partition_filters = _partition_filters(plan)
+        self.assertEqual(1, len(partition_filters), plan)
+        self.assertRegex(partition_filters[0], rf'\(dt#\d+ = {PLAN_DT}\)')
+        for event in events:
+            self.assertRegex(partition_filters[0], rf'\(selector_hash#\d+ = {hash_bucket(event_selector(event))}\)')
+        self.assertEqual(1, len(re.findall(r'\bExchange ', plan)), plan)
+
+        optimized_plan = self._optimized_plan(generator, consolidated_events)
+        for udf_name in udf_names:
+            self.assertEqual(1, optimized_plan.count(udf_name + '('), optimized_plan)
@@ -0,0 +1,178 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyspark.sql.pandas.types import from_arrow_type
+
+import test
+from bdbt.ethereum.abi.abi_transformer import ABITransformer
+from bdbt.ethereum.abi.provider.spark_type_provider import SparkDataTypeProvider
+from bdbt.ethereum.abi.utils import normalize_abi, call_selector
+from bdbt.ethereum.decode.parquet_decode_job import DecodeRouter, ParquetDecodeJob, load_contracts, DataSource
+
+RESOURCE_GROUP = 'dbt_test'
+
+TOKEN = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+TRANSFER_SELECTOR = '0xa9059cbb'
+SENDER = '0x' + '11' * 20
+RECEIVER = '0x' + '22' * 20
+
+
+def word(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def address_topic(address: str) -> str:
+    return '0x' + word(int(address, 16)).hex()
+
+
+class ParquetDecodeJobTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dbt_dir = os.path.join(self.tempdir.name, 'dbt')
+        self.output_dir = os.path.join(self.tempdir.name, 'output')
+
+        contract_dir = os.path.join(self.dbt_dir, 'contracts', 'token')
+        pathlib.Path(contract_dir).mkdir(parents=True)
+        with open(os.path.join(contract_dir, 'ERC20.json'), 'w') as f:
+            json.dump({
+                'name': 'ERC20',
+                'address': TOKEN,
+                'materialize': 'increment',
+                'trace_filter': {'success_only': True},
+                'abi': json.loads(test.read_resource([RESOURCE_GROUP], 'erc20_abi.json'))
+            }, f)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write_logs(self, path: str) -> None:
+        rows = []
+        for i in range(4):
+            rows.append({
+                'block_number': 100 + i,
+                'block_timestamp': datetime(2022, 6, 1 + i // 2),
+                'log_index': i,
+                'transaction_hash': f'0x{i:064x}',
+                # the last log is emitted by another contract
+                'address': TOKEN if i < 3 else RECEIVER,
+                'unhex_data': word(10 ** 18 * i) if i != 2 else b'\x01',
+                'topics_arr': [TRANSFER_TOPIC, address_topic(SENDER), address_topic(RECEIVER)],
+                'selector': TRANSFER_TOPIC,
+                'dt': f'2022-06-0{1 + i // 2}'
+            })
+        # two row groups, two tasks
+        pq.write_table(pa.Table.from_pylist(rows), path, row_group_size=2)
+
+    def _write_traces(self, path: str) -> None:
+        pq.write_table(pa.Table.from_pylist([{
+            'block_number': 100 + i,
+            'block_timestamp': datetime(2022, 6, 1),
+            'trace_address': '',
+            'transaction_hash': f'0x{i:064x}',
+            'to_address': TOKEN,
+            'unhex_input': bytes.fromhex(TRANSFER_SELECTOR[2:]) + word(int(RECEIVER, 16)) + word(5),
+            'unhex_output': word(1),
+            'status': status,
+            'call_type': 'call',
+            'trace_type': 'call',
+            'selector': TRANSFER_SELECTOR,
+            'dt': '2022-06-01'
+        } for i, status in enumerate([1, 0])]), path)
+
+    def test_route(self):
+        router = DecodeRouter(load_contracts(self.dbt_dir))
+
+        routes = router.routes(DataSource.LOGS, TOKEN.upper().replace('0X', '0x'), TRANSFER_TOPIC)
+        self.assertEqual(['erc20_evt_transfer'], [i.model_alias for i in routes])
+        self.assertEqual([], router.routes(DataSource.LOGS, RECEIVER, TRANSFER_TOPIC))
+        self.assertEqual(['erc20_call_transfer'],
+                         [i.model_alias for i in router.routes(DataSource.TRACES, TOKEN, TRANSFER_SELECTOR)])
+        # the read only calls are skipped by default
+        self.assertEqual(3, router.models_count)
+
+    def _run(self, workers: int, exact_types: bool = False):
+        logs_path = os.path.join(self.tempdir.name, 'logs.parquet')
+        traces_path = os.path.join(self.tempdir.name, 'traces.parquet')
+        self._write_logs(logs_path)
+        self._write_traces(traces_path)
+
+        job = ParquetDecodeJob(DecodeRouter(load_contracts(self.dbt_dir)), self.output_dir, workers=workers,
+                               exact_types=exact_types)
+        self.assertEqual(3, len(job.plan([logs_path], [traces_path])))
+        return job.run([logs_path], [traces_path])
+
+    def test_run(self):
+        stats = self._run(workers=1)
+
+        self.assertEqual(6, stats.rows)
+        self.assertEqual(4, stats.decoded_rows)
+        self.assertEqual(1, stats.failed_rows)
+        self.assertEqual(3, stats.row_groups)
+
+        transfers = pq.read_table(os.path.join(self.output_dir, 'token', 'erc20_evt_transfer')).sort_by('evt_index')
+        self.assertEqual(['evt_block_number', 'evt_block_time', 'evt_index', 'evt_tx_hash', 'contract_address',
+                          'from', 'to', 'value', 'dt'], transfers.column_names)
+        self.assertEqual(pa.decimal128(38, 0), transfers.schema.field('value').type)
+        self.assertEqual([0, 10 ** 18, None], transfers.column('value').to_pylist())
+        self.assertEqual([SENDER, SENDER, None], transfers.column('from').to_pylist())
+        self.assertEqual(['2022-06-01', '2022-06-01', '2022-06-02'],
+                         [str(i) for i in transfers.column('dt').to_pylist()])
+
+        # the failed call is filtered by the trace filter
+        calls = pq.read_table(os.path.join(self.output_dir, 'token', 'erc20_call_transfer'))
+        self.assertEqual(1, calls.num_rows)
+        self.assertEqual([True], calls.column('call_success').to_pylist())
+        self.assertEqual([RECEIVER], calls.column('to').to_pylist())
+        self.assertEqual([True], calls.column('output_0').to_pylist())
+
+    def test_run_in_processes(self):
+        stats = self._run(workers=2)
+
+        self.assertEqual(4, stats.decoded_rows)
+        self.assertEqual(3, pq.read_table(os.path.join(self.output_dir, 'token', 'erc20_evt_transfer')).num_rows)
+
+    def test_run_exact_types(self):
+        self._run(workers=1, exact_types=True)
+
+        transfers = pq.read_table(os.path.join(self.output_dir, 'token', 'erc20_evt_transfer')).sort_by('evt_index')
+        self.assertEqual(pa.binary(32), transfers.schema.field('value').type)
+        self.assertEqual([word(0), word(10 ** 18), None], transfers.column('value').to_pylist())
+
+    def test_model_types(self):
+        raw_abi = test.read_resource([RESOURCE_GROUP], 'full_types_function_abi.json')
+        with open(os.path.join(self.dbt_dir, 'contracts', 'token', 'Test.json'), 'w') as f:
+            json.dump({'name': 'Test', 'materialize': 'table', 'include_read_only_calls': True,
+                       'abi': json.loads(raw_abi)}, f)
+        call = [i for i in ABITransformer().transform_abi(normalize_abi(raw_abi)).calls
+                if i.name == 'AllTypeFunction'][0]
+        traces_path = os.path.join(self.tempdir.name, 'all_types_traces.parquet')
+        # the input can't be decoded, the row is written with the null fields
+        pq.write_table(pa.Table.from_pylist([{
+            'block_number': 100, 'block_timestamp': datetime(2022, 6, 1), 'trace_address': '',
+            'transaction_hash': '0x01', 'to_address': TOKEN, 'unhex_input': bytes.fromhex(call_selector(call)[2:]),
+            'unhex_output': b'', 'status': 1, 'call_type': 'call', 'trace_type': 'call',
+            'selector': call_selector(call), 'dt': '2022-06-01'
+        }]), traces_path)
+        logs_path = os.path.join(self.tempdir.name, 'logs.parquet')
+        self._write_logs(logs_path)
+
+        job = ParquetDecodeJob(DecodeRouter(load_contracts(self.dbt_dir)), self.output_dir, workers=1)
+        job.run([logs_path], [traces_path])
+
+        provider = SparkDataTypeProvider()
+        event = [i for i in ABITransformer().transform_abi(normalize_abi(
+            test.read_resource([RESOURCE_GROUP], 'erc20_abi.json'))).events if i.name == 'Transfer'][0]
+        for model_alias, fields in [('erc20_evt_transfer', event.inputs),
+                                    ('test_call_alltypefunction', call.inputs + call.outputs)]:
+            schema = pq.read_table(os.path.join(self.output_dir, 'token', model_alias)).schema
+            for field in fields:
+                self.assertEqual(provider.transform(field.ftype), from_arrow_type(schema.field(field.name).type),
+                                 f'{model_alias}.{field.name}')
@@ -0,0 +1,98 @@
+import collections
+import json
+import os
+import tempfile
+import unittest
+
+import pyarrow.parquet as pq
+
+import test
+from bdbt.ethereum.decode.parquet_decode_job import DecodeRouter, ParquetDecodeJob
+from bdbt.ethereum.synthetic.chain_data_generator import (
+    LOGS_SCHEMA,
+    TRACES_SCHEMA,
+    SyntheticChainDataGenerator,
+    hash_bucket,
+    spark_hash
+)
+from bdbt.global_type import Contract
+
+RESOURCE_GROUP = 'dbt_test'
+
+OPENSEA = '0x7f268357a8c2552623316e2562d90e642bb538e5'
+
+
+def _contract(name: str, file_name: str, address: str = None) -> Contract:
+    return Contract.from_dicts({
+        'name': name,
+        'address': address,
+        'materialize': 'increment',
+        'abi': json.loads(test.read_resource([RESOURCE_GROUP], file_name))
+    })
+
+
+class SyntheticChainDataGeneratorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.contracts = [
+            ('opensea', _contract('WyvernExchangeV2', 'wyvern_exchange_v2_abi.json', OPENSEA)),
+            ('nft', _contract('ERC1155', 'erc1155_abi.json'))
+        ]
+
+    def test_spark_hash(self):
+        # SELECT hash('Spark'), hash('') in Spark SQL
+        self.assertEqual(228093765, spark_hash('Spark'))
+        self.assertEqual(142593372, spark_hash(''))
+        self.assertEqual(0, hash_bucket('0xa9059cbb'))
+
+    def test_generate(self):
+        generator = SyntheticChainDataGenerator(self.contracts, seed=1, rows_per_block=100)
+        logs = generator.generate_logs(100)
+        traces = generator.generate_traces(100)
+
+        self.assertEqual(LOGS_SCHEMA, logs.schema)
+        self.assertEqual(TRACES_SCHEMA, traces.schema)
+        self.assertEqual(100, logs.num_rows)
+        # the next rows continue from the previous blocks
+        self.assertEqual(1, logs.column('block_number')[0].as_py())
+        self.assertEqual(2, generator.generate_logs(1).column('block_number')[0].as_py())
+
+        for row in logs.to_pylist():
+            self.assertEqual(row['topics_arr'][0], row['selector'])
+            self.assertEqual(hash_bucket(row['address']), row['address_hash'])
+        for row in traces.to_pylist():
+            self.assertEqual('0x' + row['unhex_input'][:4].hex(), row['selector'])
+            self.assertEqual(hash_bucket(row['selector']), row['selector_hash'])
+
+    def test_deterministic(self):
+        first = SyntheticChainDataGenerator(self.contracts, seed=7).generate_logs(50)
+        second = SyntheticChainDataGenerator(self.contracts, seed=7).generate_logs(50)
+
+        self.assertTrue(first.equals(second))
+
+    def test_skew(self):
+        generator = SyntheticChainDataGenerator(self.contracts, seed=1, contract_skew=3, noise_ratio=0.2)
+        addresses = collections.Counter(generator.generate_logs(2000).column('address').to_pylist())
+
+        # 1 / 2^3 of the rows are emitted by the second contract, the others are noise
+        self.assertAlmostEqual(0.8 * 8 / 9, addresses[OPENSEA] / 2000, delta=0.05)
+        self.assertLess(addresses.most_common(2)[1][1], addresses[OPENSEA] / 4)
+
+    def test_decode(self):
+        generator = SyntheticChainDataGenerator(self.contracts, seed=1, noise_ratio=0.5)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            generator.write(tempdir, logs_rows=500, traces_rows=500, rows_per_file=200)
+            self.assertEqual(['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet'],
+                             sorted(os.listdir(os.path.join(tempdir, 'logs'))))
+            rows = sum(pq.read_metadata(os.path.join(tempdir, 'traces', i)).num_rows
+                       for i in os.listdir(os.path.join(tempdir, 'traces')))
+            self.assertEqual(500, rows)
+
+            job = ParquetDecodeJob(DecodeRouter(self.contracts), os.path.join(tempdir, 'decoded'), workers=1)
+            stats = job.run([os.path.join(tempdir, 'logs')], [os.path.join(tempdir, 'traces')])
+
+        self.assertEqual(1000, stats.rows)
+        # every encoded row is decoded, the random selectors of the noise rows match no model
+        self.assertEqual(0, stats.failed_rows)
+        self.assertAlmostEqual(500, stats.decoded_rows, delta=60)
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+from bdbt.profiler import PhaseProfiler, ProfileFormat, ProfileMode
+
+
+class PhaseProfilerTestCase(unittest.TestCase):
+
+    def test_record_phases(self):
+        profiler = PhaseProfiler()
+        for project in ['aave', 'opensea']:
+            with profiler.phase('transform_abi', project=project):
+                sum(range(1000))
+        with profiler.phase('gen_models'):
+            pass
+
+        self.assertEqual(['transform_abi', 'transform_abi', 'gen_models'], [i.name for i in profiler.records])
+        self.assertEqual({'project': 'opensea'}, profiler.records[1].args)
+        self.assertTrue(all(i.wall_time >= 0 and i.max_rss_kb > 0 for i in profiler.records))
+
+        summary = profiler.summary()
+        self.assertEqual(2, summary['transform_abi']['count'])
+        self.assertEqual(1, summary['gen_models']['count'])
+
+    def test_record_failed_phase(self):
+        profiler = PhaseProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.phase('build_udf'):
+                raise ValueError()
+        self.assertEqual(['build_udf'], [i.name for i in profiler.records])
+
+    def test_disabled_profiler(self):
+        profiler = PhaseProfiler(enabled=False)
+        with profiler.phase('gen_models'):
+            pass
+        self.assertEqual([], profiler.records)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            profiler.dump(os.path.join(tempdir, 'profile.json'))
+            self.assertEqual([], os.listdir(tempdir))
+
+    def test_dump_json_with_cprofile(self):
+        profiler = PhaseProfiler(profile_phase='gen_models')
+        with profiler.phase('gen_models', project='opensea'):
+            sorted(range(1000), reverse=True)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            profiler.dump(os.path.join(tempdir, 'profile.json'))
+            self.assertEqual(['profile.gen_models.prof', 'profile.json'], sorted(os.listdir(tempdir)))
+            with open(os.path.join(tempdir, 'profile.json'), 'r') as f:
+                content = json.load(f)
+
+        self.assertEqual('gen_models', content['phases'][0]['name'])
+        self.assertEqual({'project': 'opensea'}, content['phases'][0]['args'])
+        self.assertEqual(1, content['summary']['gen_models']['count'])
+
+    def test_dump_chrome_trace_with_tracemalloc(self):
+        profiler = PhaseProfiler(profile_phase='load_contracts', profile_mode=ProfileMode.TRACEMALLOC)
+        with profiler.phase('load_contracts', project='opensea'):
+            data = [str(i) for i in range(10000)]
+        with profiler.phase('gen_models', project='opensea'):
+            pass
+
+        self.assertGreater(profiler.records[0].traced_peak_kb, 0)
+        self.assertIsNone(profiler.records[1].traced_peak_kb)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            profiler.dump(os.path.join(tempdir, 'profile.json'), ProfileFormat.CHROME_TRACE)
+            self.assertEqual(['profile.json', 'profile.load_contracts.tracemalloc.txt'], sorted(os.listdir(tempdir)))
+            with open(os.path.join(tempdir, 'profile.json'), 'r') as f:
+                content = json.load(f)
+
+        events = content['traceEvents']
+        self.assertEqual(['load_contracts', 'gen_models'], [i['name'] for i in events])
+        self.assertTrue(all(i['ph'] == 'X' for i in events))
+        self.assertEqual('opensea', events[0]['args']['project'])
+        self.assertLessEqual(events[0]['ts'], events[1]['ts'])
+        del data
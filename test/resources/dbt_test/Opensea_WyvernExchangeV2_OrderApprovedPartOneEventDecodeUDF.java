@@ -4,6 +4,7 @@ import java.util.List;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspectorFactory;
 import org.apache.hadoop.hive.serde2.objectinspector.primitive.PrimitiveObjectInspectorFactory;
+import org.apache.hadoop.hive.serde2.typeinfo.TypeInfoFactory;
 import org.sparkproject.guava.collect.ImmutableList;
 
 public class Opensea_WyvernExchangeV2_OrderApprovedPartOne_EventDecodeUDF extends DecodeContractEventHiveUDF {
@@ -19,14 +20,14 @@ public class Opensea_WyvernExchangeV2_OrderApprovedPartOne_EventDecodeUDF extend
 PrimitiveObjectInspectorFactory.writableStringObjectInspector,
 PrimitiveObjectInspectorFactory.writableStringObjectInspector,
 PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
 PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
 PrimitiveObjectInspectorFactory.writableStringObjectInspector);
     }
 }
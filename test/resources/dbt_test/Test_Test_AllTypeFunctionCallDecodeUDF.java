@@ -4,6 +4,7 @@ import java.util.List;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspector;
 import org.apache.hadoop.hive.serde2.objectinspector.ObjectInspectorFactory;
 import org.apache.hadoop.hive.serde2.objectinspector.primitive.PrimitiveObjectInspectorFactory;
+import org.apache.hadoop.hive.serde2.typeinfo.TypeInfoFactory;
 import org.sparkproject.guava.collect.ImmutableList;
 
 public class Test_Test_AllTypeFunction_CallDecodeUDF extends DecodeContractFunctionHiveUDF {
@@ -16,26 +17,26 @@ public class Test_Test_AllTypeFunction_CallDecodeUDF extends DecodeContractFunct
     @Override
     public List<ObjectInspector> getInputDataFieldsOIs() {
         return ImmutableList.of(PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableLongObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableLongObjectInspector,
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
 PrimitiveObjectInspectorFactory.writableBooleanObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 20)),
+PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 20)),
 PrimitiveObjectInspectorFactory.writableBinaryObjectInspector,
 PrimitiveObjectInspectorFactory.writableBinaryObjectInspector,
 PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableStringObjectInspector),
+ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableIntObjectInspector),
 ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableBinaryObjectInspector),
 ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableBooleanObjectInspector),
 ObjectInspectorFactory.getStandardStructObjectInspector(
             ImmutableList.of("value","key"),
-            ImmutableList.of(PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+            ImmutableList.of(PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0)),
 PrimitiveObjectInspectorFactory.writableStringObjectInspector)
         )
         );
@@ -49,11 +50,11 @@ PrimitiveObjectInspectorFactory.writableStringObjectInspector)
     @Override
     public List<ObjectInspector> getOutputDataFieldsOIs() {
         return ImmutableList.of(ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableStringObjectInspector),
-ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.writableStringObjectInspector),
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
-PrimitiveObjectInspectorFactory.writableStringObjectInspector,
+ObjectInspectorFactory.getStandardListObjectInspector(PrimitiveObjectInspectorFactory.getPrimitiveWritableObjectInspector(TypeInfoFactory.getDecimalTypeInfo(38, 0))),
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
+PrimitiveObjectInspectorFactory.writableIntObjectInspector,
 PrimitiveObjectInspectorFactory.writableBinaryObjectInspector,
 PrimitiveObjectInspectorFactory.writableBinaryObjectInspector,
 PrimitiveObjectInspectorFactory.writableBinaryObjectInspector);